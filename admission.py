@@ -0,0 +1,115 @@
+"""Объединение одинаковых расчетов (singleflight) и ограничение одновременных расчетов в процессе.
+
+Во время всплесков нагрузки много одинаковых запросов приходит одновременно. SingleFlight
+пропускает к расчету только первый запрос с данным ключом (ведущий), остальные ждут его
+результат и получают тот же ответ (или ту же ошибку), не занимая процессор.
+
+AdmissionLimiter ограничивает число одновременных расчетов процесса. Запрос сверх предела ждет
+в очереди; если очередь уже заполнена или ожидание дольше queue_timeout, запрос сразу получает
+отказ (503 с Retry-After), а не висит до таймаута воркера.
+
+Оба механизма действуют между потоками одного процесса, поэтому приложение запускается с воркерами
+gthread (gunicorn.conf.py), а пределы по умолчанию выводятся из числа потоков WEB_THREADS.
+"""
+import threading  # Для ожидания результата и места в очереди
+from typing import Callable, Hashable, Optional
+
+
+class Overloaded(Exception):
+    """Отказ в расчете из-за перегрузки (очередь заполнена или ожидание слишком долгое)."""
+
+    def __init__(self, reason: str):
+        super().__init__("Сервер перегружен, повторите запрос позже")
+        self.reason = reason  # queue_full или timeout
+
+
+class _Call:
+    """Выполняющийся расчет и его результат для ожидающих запросов."""
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Объединяет одновременные вызовы с одинаковым ключом в один."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # Ключ -> выполняющийся расчет
+
+    def do(self, key: Hashable, fn: Callable[[], object]) -> tuple:
+        """Выполняет fn() или дожидается уже выполняющегося вызова с тем же ключом.
+
+        Возвращает (результат, объединен ли вызов с чужим); исключение ведущего вызова
+        получают все ожидающие.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+        try:
+            call.value = fn()
+            return call.value, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+class AdmissionLimiter:
+    """Не больше max_in_flight одновременных расчетов и не больше max_queue ожидающих."""
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+
+    def acquire(self) -> bool:
+        """Занимает место для расчета; True, если пришлось ждать в очереди. При отказе - Overloaded."""
+        with self._condition:
+            if self.in_flight < self.max_in_flight:
+                self.in_flight += 1
+                return False
+            if self.waiting >= self.max_queue:
+                raise Overloaded("queue_full")
+            self.waiting += 1
+            try:
+                admitted = self._condition.wait_for(lambda: self.in_flight < self.max_in_flight, self.queue_timeout)
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                raise Overloaded("timeout")
+            self.in_flight += 1
+            return True
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def run(self, fn: Callable[[], object], on_queued: Optional[Callable[[], None]] = None):
+        """Выполняет fn() с занятым местом; on_queued вызывается, если запрос ждал в очереди."""
+        if self.acquire() and on_queued is not None:
+            on_queued()
+        try:
+            return fn()
+        finally:
+            self.release()
@@ -1,9 +1,32 @@
-from flask import Flask, request, jsonify, render_template  # Импортируем Flask для создания веб-приложения
+from flask import Flask, g, request, jsonify, redirect, render_template, stream_with_context  # Импортируем Flask для создания веб-приложения
+from flask.logging import default_handler  # Стандартный обработчик логов Flask (вывод в stderr)
 from flask_cors import CORS  # Импортируем CORS для управления доступом из других доменов
-import logging  # Импортируем модуль для логирования (записи событий)
-from logging.handlers import RotatingFileHandler  # Для создания логов с ограниченным размером
+import io  # Для подмены потока загруженного файла
+import json  # Для строк ошибок в потоковых ответах
 import os  # Для работы с файловой системой
+import random  # Для выборочного логирования запросов
+import time  # Для измерения времени обработки запросов
 from config import get_config  # Импортируем настройки приложения из файла config.py
+from log_pipeline import setup_logging, truncate_payload  # Асинхронное структурированное логирование
+from metrics import Metrics, SlowRequestProfiler  # Метрики Prometheus и профилирование медленных запросов
+from batch import calculate_metal_batch, calculate_metal_batch_json, tune_allocator  # Векторизованный пакетный расчет
+from cache import ResultCache  # Кэш сериализованных результатов расчета
+from admission import AdmissionLimiter, Overloaded, SingleFlight  # Объединение запросов и ограничение нагрузки
+from params import (MATERIALS, canonical_query, config_fingerprint, describe_parse_error, parse_params, params_key,
+                    query_etag, query_params)  # Разбор параметров расчета из запроса
+from price_grid import load_grid, summarize  # Предрасчитанная сетка цен
+from geometry import STAIR_MODELS, stair_glb  # Геометрия лестницы в формате GLB
+from bulk import csv_rows, iter_lines, ndjson_rows, stream_csv, stream_ndjson  # Потоковый расчет файлов
+from formats import MIMETYPES, encode, negotiate  # Форматы ответа /api/calculate
+from cutting import Piece, pieces_from_result, plan_cuts  # План раскроя профиля по хлыстам
+from materials import material_plans  # Скомпилированные планы расчета материалов
+from structure import structure_result  # Проверка прочности каркаса
+from optimize import optimize  # Подбор конфигурации лестницы
+from live import LiveHub, event  # Канал живого пересчета (Server-Sent Events)
+from export import gzip_stream, stream_bom_csv, stream_bom_xlsx  # Выгрузка спецификации материалов
+from quotes import QuoteStore, decode_cursor, parse_time  # История расчетов в SQLite
+from preview import FORMATS, PreviewCache, available_formats, preview_key, render  # Превью лестницы
+from assets import Assets, send_asset  # Собранные статические ресурсы с хэшами в именах
 
 # Определяем базовую директорию, где находится текущий файл
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -15,38 +38,81 @@ def create_app():
     app = Flask(__name__, template_folder=TEMPLATE_DIR)  # Указываем папку с шаблонами
     app.config.from_object(get_config())  # Загружаем настройки из config.py
     
-    # Настраиваем логирование (запись событий в файл)
-    if not os.path.exists('logs'):  # Если папка для логов не существует
-        os.makedirs('logs')  # Создаем папку для логов
-    
-    # Создаем обработчик логов, который будет записывать их в файл
-    file_handler = RotatingFileHandler(
-        'logs/app.log',  # Имя файла для логов
-        maxBytes=10240,  # Максимальный размер файла логов (10 КБ)
-        backupCount=10  # Количество резервных копий логов
-    )
-    # Форматируем логи: время, уровень, сообщение, путь к файлу и номер строки
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'  # Исправлен формат строки
-    ))
-    file_handler.setLevel(logging.INFO)  # Устанавливаем уровень логирования (информационные сообщения)
-    app.logger.addHandler(file_handler)  # Добавляем обработчик логов в приложение
-    app.logger.setLevel(logging.INFO)  # Устанавливаем общий уровень логирования
-    
-    # Логирование запросов (запись информации о каждом запросе)
+    # Настраиваем логирование: запись в файл выполняет фоновый поток, запрос только ставит запись в очередь
+    setup_logging(app)
+    if not app.config['DEBUG']:
+        app.logger.removeHandler(default_handler)  # Синхронный вывод в stderr нужен только при отладке
+
+    # Компилируем планы расчета материалов (см. materials.py)
+    material_plans(app.config)
+    # Временные массивы пакетного расчета остаются в памяти процесса между запросами
+    tune_allocator(app.config['BATCH_MALLOC_TRIM_BYTES'])
+
+    # Метрики (счетчики и гистограммы времени этапов, см. metrics.py)
+    metrics = Metrics(app.config['METRICS_DIR'], app.config['METRICS_FLUSH_INTERVAL'])
+    app.extensions['metrics'] = metrics
+    # Профилирование медленных запросов (включается порогом PROFILE_SLOW_MS)
+    profiler = None
+    if app.config['PROFILE_SLOW_MS'] > 0:
+        profiler = SlowRequestProfiler(app.config['PROFILE_DIR'], app.config['PROFILE_SLOW_MS'],
+                                       app.config['PROFILE_SAMPLE_RATE'])
+
     @app.before_request
-    def log_request_info():
-        # Логируем метод запроса (GET, POST и т.д.), URL и данные запроса
+    def start_request_timer():
+        # Запоминаем время начала обработки запроса
+        g.request_started = time.perf_counter()
+        if profiler is not None:
+            g.profile = profiler.start()
+
+    @app.after_request
+    def record_request_metrics(response):
+        # Выполняется последним (после логирования), поэтому время запроса включает запись лога
+        seconds = time.perf_counter() - g.get('request_started', time.perf_counter())
+        endpoint = request.endpoint or 'unknown'
+        metrics.observe('dpk_request_seconds', seconds, endpoint=endpoint)
+        metrics.inc('dpk_requests_total', endpoint=endpoint, status=response.status_code)
+        profile = g.get('profile')
+        if profile is not None:
+            path = profiler.finish(profile, seconds, endpoint)
+            if path is not None:
+                metrics.inc('dpk_slow_profiles_total', endpoint=endpoint)
+                app.logger.warning(f"Медленный запрос {request.path}: {seconds * 1000:.1f} мс, профиль {path}")
+        metrics.maybe_flush()
+        return response
+
+    # Логирование запросов (запись информации о каждом запросе)
+
+    @app.after_request
+    def log_request_info(response):
+        # Ошибочные ответы логируем всегда, успешные - с вероятностью LOG_REQUEST_SAMPLE_RATE
+        if response.status_code < 400 and random.random() >= app.config['LOG_REQUEST_SAMPLE_RATE']:
+            return response
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - g.get('request_started', time.perf_counter())) * 1000, 3),
+        }
         if request.is_json:
-            app.logger.info(f"Получен запрос: {request.method} {request.url} с данными {request.json}")
-        else:
-            app.logger.info(f"Получен запрос: {request.method} {request.url} без JSON данных")
+            # Пишем исходное тело запроса (обрезанное), не сериализуя разобранный JSON заново
+            fields["payload"] = truncate_payload(request.get_data(as_text=True), app.config['LOG_PAYLOAD_MAX_CHARS'])
+        started = time.perf_counter()
+        app.logger.info("Запрос обработан", extra={"fields": fields})
+        metrics.observe('dpk_stage_seconds', time.perf_counter() - started, stage='logging')
+        return response
+
+    # Собранные статические ресурсы и функции для шаблонов
+    assets = Assets(app.config['ASSETS_DIR'])
+    app.extensions['assets'] = assets
+    app.jinja_env.globals.update(asset_url=assets.url, optional_asset_url=assets.optional_url,
+                                 page_scripts=assets.page_scripts, vendor_url=assets.vendor_url)
 
     # Глобальная обработка ошибок (если что-то пошло не так)
     @app.errorhandler(Exception)
     def handle_exception(e):
         # Логируем ошибку и возвращаем пользователю сообщение об ошибке
         app.logger.error(f"Ошибка: {e}")
+        metrics.inc('dpk_errors_total', endpoint=request.endpoint or 'unknown', type=type(e).__name__)
         return jsonify({"error": str(e)}), 500
 
     # Настраиваем CORS (разрешаем доступ к API из других доменов, если это включено в настройках)
@@ -59,6 +125,45 @@ def create_app():
 
 # Создаем экземпляр приложения
 app = create_app()
+metrics = app.extensions['metrics']  # Метрики текущего процесса
+
+# Кэш готовых JSON-ответов /api/calculate (свой в каждом процессе)
+result_cache = ResultCache(app.config['CACHE_MAX_SIZE'], app.config['CACHE_TTL'])
+# Кэш GLB-моделей /api/model
+model_cache = ResultCache(app.config['MODEL_CACHE_MAX_SIZE'], app.config['CACHE_TTL'])
+
+# Объединение одинаковых одновременных расчетов и ограничение расчетов процесса (/api/calculate)
+calculations = SingleFlight()
+admission = AdmissionLimiter(app.config['ADMISSION_MAX_IN_FLIGHT'], app.config['ADMISSION_MAX_QUEUE'],
+                             app.config['ADMISSION_QUEUE_TIMEOUT'])
+
+# Сессии живого пересчета /api/live (свои в каждом процессе, изменения пересылаются владельцу)
+live_hub = LiveHub(app.config['LIVE_SOCKET_DIR'], app.config['LIVE_MAX_SESSIONS'], metrics)
+
+# История расчетов: запрос только ставит котировку в очередь, запись выполняет фоновый поток
+quote_store = QuoteStore(
+    app.config['QUOTES_DB_PATH'], app.config, app.config['QUOTES_BATCH_SIZE'],
+    app.config['QUOTES_FLUSH_INTERVAL'], app.config['QUOTES_QUEUE_SIZE'], metrics, app.logger
+) if app.config['QUOTES_ENABLED'] else None
+
+# Дисковый кэш превью (общий для всех процессов)
+preview_cache = PreviewCache(app.config['PREVIEW_DIR'], app.config['PREVIEW_CACHE_MAX_BYTES'])
+
+# Сетка цен, отображенная в память (None, если файла нет или он устарел)
+price_grid = load_grid(app.config, app.logger) if app.config['PRICE_GRID_ENABLED'] else None
+
+def cache_key(cache, params):
+    """Возвращает ключ кэша для набора параметров или None, если кэш не используется."""
+    if not app.config['CACHE_ENABLED']:
+        return None
+    # При изменении констант расчета старые результаты становятся недействительными
+    cache.check_fingerprint(config_fingerprint(app.config))
+    key = params_key(params)
+    try:
+        hash(key)
+    except TypeError:  # Например, цвет каркаса передан списком
+        return None
+    return key
 
 # Функция для проверки входных данных (ширина, высота, количество ступеней)
 def validate_input(width: float, height: float, steps: int) -> None:
@@ -96,46 +201,37 @@ def calculate_metal(
 ) -> dict:
     """Выполняет расчеты металлоконструкций."""
     try:
+        started = time.perf_counter()
         validate_input(width, height, steps)
+        validated = time.perf_counter()
+        metrics.observe('dpk_stage_seconds', validated - started, stage='validate')
         
-        # Используем константы из конфигурации
+        # План расчета материала (см. materials.py): константы из конфигурации уже подставлены
+        plan = material_plans(app.config).get(material) if isinstance(material, str) else None
+        if plan is None:
+            return None
         profile_thickness = app.config['PROFILE_THICKNESS']  # 20 мм
-        dpk_depth = app.config['DPK_DEPTH']  # 305 мм
         pvl_depth = app.config['PVL_DEPTH']  # 300 мм
-        dpk_reduction = app.config['DPK_REDUCTION']  # 25 мм
-
-        # Определяем глубину ступени в зависимости от материала
-        if material == "ПВЛ":
-            step_depth = pvl_depth
-        elif material == "ДПК":
-            step_depth = dpk_depth
-        elif material == "ДПК+1 ПВЛ":
-            step_depth = dpk_depth  # Все ступени будут глубиной 305, кроме первой
-        else:
-            return None
+        step_depth = plan.step_depth  # Глубина ступени материала
 
         # Расчёты
         step_height = height / steps
         
-        # Расчет высоты каркаса с учетом материала
-        if material == "ДПК":
-            frame_height = height - app.config['DPK_REDUCTION']  # 170 - 25 = 145 мм
-            step_frame_height = step_height - app.config['DPK_REDUCTION']  # для 2 ступеней: 85 - 25 = 60 мм
-            board_elevation = 10  # Подъем доски на 10мм для ДПК
-        elif material == "ДПК+1 ПВЛ":
-            if steps == 1:
-                frame_height = height  # Для одной ступени используем ПВЛ
-                step_frame_height = step_height
-                board_elevation = 0
-            else:
-                # Для первой ступени - полная высота (ПВЛ), для остальных - уменьшенная (ДПК)
-                frame_height = height - (app.config['DPK_REDUCTION'] * (steps - 1) / steps)
-                step_frame_height = step_height - app.config['DPK_REDUCTION']
-                board_elevation = 10  # Подъем доски на 10мм для ДПК ступеней (кроме первой)
+        # Расчет высоты каркаса с учетом занижения под покрытие
+        if plan.split_first and steps > 1:
+            # Первая ступень со своим покрытием, остальные занижены на reduction
+            frame_height = height - ((plan.reduction * (steps - 1) + plan.first_reduction) / steps)
+            step_frame_height = step_height - plan.reduction
+            board_elevation = plan.board_elevation
+        elif plan.split_first:
+            # Одна ступень - только покрытие первой ступени
+            frame_height = height - plan.first_reduction
+            step_frame_height = step_height - plan.first_reduction
+            board_elevation = plan.first_board_elevation
         else:
-            frame_height = height
-            step_frame_height = step_height
-            board_elevation = 0
+            frame_height = height - plan.reduction  # Для ДПК: 170 - 25 = 145 мм
+            step_frame_height = step_height - plan.reduction  # для 2 ступеней ДПК: 85 - 25 = 60 мм
+            board_elevation = plan.board_elevation  # Подъем доски на 10мм для ДПК
 
         # 1. Основание (прямоугольник)
         # Основание = 2*ширина + (2*глубина*количество_ступеней - 4*толщина профиля)
@@ -165,14 +261,8 @@ def calculate_metal(
         else:
             # Для нескольких ступеней
             for i in range(steps):
-                # Базовая высота для текущей ступени
-                current_height = step_height * (i + 1)
-                if material == "ДПК":
-                    current_height -= app.config['DPK_REDUCTION']
-                elif material == "ДПК+1 ПВЛ":
-                    # Для первой ступени ПВЛ не вычитаем, для остальных вычитаем
-                    if i > 0:
-                        current_height -= app.config['DPK_REDUCTION']
+                # Базовая высота для текущей ступени с учетом занижения под ее покрытие
+                current_height = step_height * (i + 1) - plan.step_reduction(i)
                 
                 # Вычитаем толщину профиля сверху и снизу
                 stand_height = current_height - 2 * profile_thickness
@@ -192,7 +282,7 @@ def calculate_metal(
         reinforcements_length += reinforcements_count * front_reinforcement
 
         # 4.2 Задние усиления (для последней ступени)
-        back_reinforcement = (step_height * steps - (material == "ДПК" and app.config['DPK_REDUCTION'])) - 2 * profile_thickness
+        back_reinforcement = (step_height * steps - plan.back_reduction) - 2 * profile_thickness
         
         # 4.3 Внутренние усиления (170мм на каждое усиление между ступенями)
         internal_reinforcement = 170  # Фиксированная длина внутреннего усиления
@@ -204,12 +294,15 @@ def calculate_metal(
         for i in range(steps):
             current_depth = platform_depth if (i == steps - 1 and has_platform) else step_depth
             useful_depth = current_depth - 2 * profile_thickness
-            if material != "ПВЛ" and not (material == "ДПК+1 ПВЛ" and i == 0):
+            if plan.step_boards(i):  # Усиления глубины нужны под досками
                 depth_reinforcements += reinforcements_count * useful_depth
 
         # Общая длина всех усилений
         total_reinforcements = (front_reinforcement + back_reinforcement + total_internal_reinforcement) * reinforcements_count + depth_reinforcements
 
+        geometry_done = time.perf_counter()
+        metrics.observe('dpk_stage_seconds', geometry_done - validated, stage='geometry')
+
         # Расчет количества и длины полосок для проушин
         strip_length = 160  # мм
         strip_width = 40    # мм
@@ -227,11 +320,10 @@ def calculate_metal(
 
         # Расчет площади покраски ПВЛ (если используется)
         pvl_paint_area = 0
-        if material in ["ПВЛ", "ДПК+1 ПВЛ"]:
-            if material == "ПВЛ":
-                pvl_paint_area = (width * pvl_depth * steps / 1000000) * 2  # Учитываем обе стороны ПВЛ
-            else:  # ДПК+1 ПВЛ
-                pvl_paint_area = (width * pvl_depth / 1000000) * 2  # Только первая ступень, обе стороны
+        if plan.painted_all:
+            pvl_paint_area = (width * pvl_depth * steps / 1000000) * 2  # Учитываем обе стороны ПВЛ
+        elif plan.painted_first:
+            pvl_paint_area = (width * pvl_depth / 1000000) * 2  # Только первая ступень, обе стороны
 
         # Общая площадь покраски и вес краски
         total_paint_area = frame_paint_area + pvl_paint_area
@@ -242,15 +334,10 @@ def calculate_metal(
         # Расчет метража доски ДПК (если используется)
         dpk_length = 0
         dpk_boards_count = 0
-        if material in ["ДПК", "ДПК+1 ПВЛ"]:
-            # На каждую ступень идет 2 доски
-            boards_per_step = 2  # Всегда 2 доски на ступень
-            if material == "ДПК":
-                dpk_boards_count = boards_per_step * steps
-                dpk_length = width * steps * boards_per_step  # Общая длина в мм (ширина * кол-во ступеней * 2 доски)
-            else:  # ДПК+1 ПВЛ
-                dpk_boards_count = boards_per_step * (steps - 1)  # Первая ступень ПВЛ
-                dpk_length = width * (steps - 1) * boards_per_step  # Общая длина в мм
+        if plan.has_boards:
+            board_steps = steps - plan.bare_steps  # Ступени с досками (у ДПК+1 ПВЛ первая ступень - лист)
+            dpk_boards_count = plan.boards_per_step * board_steps
+            dpk_length = width * board_steps * plan.boards_per_step  # Общая длина в мм (ширина * кол-во ступеней * 2 доски)
 
         # Определяем цвет доски ДПК в зависимости от цвета каркаса
         dpk_color_mapping = {
@@ -261,12 +348,15 @@ def calculate_metal(
         dpk_color = dpk_color_mapping.get(frame_color, 'Венге')  # По умолчанию Венге
 
         # Расчет количества болтов и гаек (4 болта и 4 гайки на ступень)
-        bolts_per_step = 4  # 4 болта на ступень (2 доски * 2 болта)
-        if material == "ДПК":
-            bolts_count = bolts_per_step * steps
-        else:  # ДПК+1 ПВЛ
-            bolts_count = bolts_per_step * (steps - 1)
+        bolts_count = plan.bolts_per_step * (steps - plan.unbolted_steps)
         nuts_count = bolts_count  # Количество гаек равно количеству болтов
+        materials_done = time.perf_counter()
+        metrics.observe('dpk_stage_seconds', materials_done - geometry_done, stage='materials')
+
+        # Проверка прочности и прогиба (structure.py) теми же формулами, что и в пакетном движке
+        last_depth = platform_depth if has_platform else step_depth
+        structure = structure_result(width, height, steps, step_depth, last_depth, reinforcements_count, app.config)
+        metrics.observe('dpk_stage_seconds', time.perf_counter() - materials_done, stage='structure')
 
         return {
             "base_frame": {
@@ -297,7 +387,7 @@ def calculate_metal(
             "additional_materials": {
                 "dpk_length": round(dpk_length / 1000, 2),
                 "dpk_boards": dpk_boards_count,
-                "dpk_color": dpk_color if material in ["ДПК", "ДПК+1 ПВЛ"] else None,
+                "dpk_color": dpk_color if plan.has_boards else None,
                 "bolts_count": bolts_count,
                 "nuts_count": nuts_count,
                 "mounting_strips": {
@@ -329,57 +419,436 @@ def calculate_metal(
                 "material": material,
                 "board_elevation": board_elevation,
                 "frame_color": frame_color
-            }
+            },
+            "structure": structure
         }
     except ValueError as e:
         app.logger.error(f"Ошибка валидации: {e}")
         return None
 
+def render_page(template: str):
+    """HTML-страница с ETag: браузер перепроверяет ее при каждом заходе и получает 304 без изменений."""
+    response = app.response_class(render_template(template), mimetype='text/html')
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
 @app.route('/')
 def index():
     # Отображаем главную страницу с выбором вариантов
-    return render_template('index_choose.html')
+    return render_page('index_choose.html')
 
 @app.route('/eco.html')
 def eco():
     # Отображаем страницу с вариантом "Эко"
-    return render_template('eco.html')
+    return render_page('eco.html')
     
 @app.route('/optima.html')
 def optima():
     # Отображаем страницу с вариантом "Оптима"
-    return render_template('optima.html')
+    return render_page('optima.html')
     
 @app.route('/komfort.html')
 def komfort():
     # Отображаем страницу с вариантом "Комфорт"
-    return render_template('komfort.html')
+    return render_page('komfort.html')
     
-@app.route('/api/calculate', methods=['POST'])   
+@app.route('/assets/<path:filename>')
+def assets(filename):
+    """Собранный ресурс с хэшем в имени; кэшируется браузером без перепроверки."""
+    response = send_asset(app.extensions['assets'].dist_dir, filename, request)
+    if response is None:
+        return jsonify({"error": "Файл не найден"}), 404
+    return response
+
+def flight_key(params, fmt: str):
+    """Ключ объединения одинаковых запросов /api/calculate или None, если параметры нехешируемые."""
+    key = (*params_key(params), fmt)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+def http_cached(response, etag: str = None):
+    """Заголовки кэширования ответа GET /api/calculate для браузера и прокси (nginx, varnish, CDN)."""
+    response.headers['Cache-Control'] = (f"public, max-age={app.config['CALCULATE_GET_MAX_AGE']}, "
+                                         f"s-maxage={app.config['CALCULATE_GET_SHARED_MAX_AGE']}")
+    response.vary.add('Accept')
+    if etag is not None:
+        response.set_etag(etag)
+    return response
+
+def formatted_response(body: bytes, fmt: str, etag: str = None):
+    """Ответ /api/calculate в выбранном формате; Vary сообщает кэшам, что ответ зависит от Accept.
+
+    С etag (запрос GET по канонической ссылке) ответ получает заголовки кэширования.
+    """
+    response = app.response_class(body, mimetype=MIMETYPES[fmt])
+    response.vary.add('Accept')
+    return http_cached(response, etag) if etag is not None else response
+
+@app.route('/api/calculate', methods=['GET', 'POST'])
 def calculate():
-    """API-метод для расчета металлоконструкций."""
+    """API-метод для расчета металлоконструкций.
+
+    POST принимает параметры в теле JSON. GET принимает их в строке запроса: неканоническая запись
+    перенаправляется (301) на каноническую ссылку, ответ по ней получает сильный ETag и Cache-Control,
+    а запрос с совпадающим If-None-Match - ответ 304 без расчета.
+    """
+    try:
+        if request.method == 'POST' and not request.is_json:
+            raise ValueError("Content-Type должен быть 'application/json'")
+        # Формат ответа: параметр format или заголовок Accept (по умолчанию - прежний JSON)
+        fmt = negotiate(request.args.get('format'), request.accept_mimetypes)
+        if fmt is None:
+            return jsonify({"error": "Формат недоступен: не установлен нужный пакет"}), 406
+        started = time.perf_counter()
+        # Извлекаем параметры из запроса
+        params = parse_params(request.get_json() if request.method == 'POST' else query_params(request.args))
+        metrics.observe('dpk_stage_seconds', time.perf_counter() - started, stage='parse')
+
+        etag = None
+        if request.method == 'GET':
+            validate_input(params.width, params.height, params.steps)
+            canonical = canonical_query(params, fmt)
+            if request.query_string.decode('utf-8', 'replace') != canonical:
+                return http_cached(redirect(f"{request.path}?{canonical}", 301))
+            etag = query_etag(canonical, app.config)
+            # If-None-Match сравнивается слабо (RFC 9110): nginx ослабляет ETag при сжатии ответа
+            if request.if_none_match.contains_weak(etag):
+                return http_cached(app.response_class(status=304), etag)
+
+        metrics.inc('dpk_calculations_total', material=params.material if params.material in MATERIALS else 'other')
+
+        # Повторный запрос с теми же параметрами отдаем из кэша без расчета и сериализации
+        key = cache_key(result_cache, params)
+        if key is not None and fmt != 'json':
+            key += (fmt,)  # Каждый формат кэшируется отдельно
+        if key is not None:
+            body = result_cache.get(key)
+            if body is not None:
+                if quote_store is not None:
+                    quote_store.record(params)
+                return formatted_response(body, fmt, etag)
+
+        def render():
+            # Выполняем расчет металлоконструкции (None - неверный материал)
+            result = calculate_metal(*params)
+            if result is None:
+                return None
+            started = time.perf_counter()
+            if fmt == 'json':
+                body = jsonify(result).get_data()  # Прежний формат ответа для страниц калькулятора
+            else:
+                body = encode(result, fmt)
+            metrics.observe('dpk_stage_seconds', time.perf_counter() - started, stage='serialize')
+            if key is not None:
+                result_cache.put(key, body)
+            return body
+
+        def admitted_render():
+            # Расчеты процесса ограничены по числу; сверх предела запрос ждет в очереди или получает отказ
+            return admission.run(render, lambda: metrics.inc('dpk_admission_total', outcome='queued'))
+
+        # Одновременные запросы с одинаковыми параметрами ждут один общий расчет
+        flight = flight_key(params, fmt) if app.config['SINGLEFLIGHT_ENABLED'] else None
+        if flight is None:
+            body = admitted_render()
+        else:
+            body, merged = calculations.do(flight, admitted_render)
+            if merged:
+                metrics.inc('dpk_admission_total', outcome='merged')
+        if body is None:
+            # Если расчет не удался, возвращаем ошибку
+            metrics.inc('dpk_errors_total', endpoint='calculate', type='CalculationError')
+            return jsonify({"error": "Неверный материал"}), 400
+        if quote_store is not None:
+            quote_store.record(params)
+        return formatted_response(body, fmt, etag)
+    except Overloaded as e:
+        metrics.inc('dpk_admission_total', outcome='shed', reason=e.reason)
+        response = jsonify({"error": str(e)})
+        response.headers['Retry-After'] = str(app.config['ADMISSION_RETRY_AFTER'])
+        return response, 503
+    except KeyError as e:
+        app.logger.error(f"Ошибка обработки запроса: отсутствует ключ {e}")
+        metrics.inc('dpk_errors_total', endpoint='calculate', type='KeyError')
+        return jsonify({"error": f"Отсутствует обязательный параметр: {e}"}), 400
+    except ValueError as e:
+        app.logger.error(f"Ошибка валидации: {e}")
+        metrics.inc('dpk_errors_total', endpoint='calculate', type='ValueError')
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Неизвестная ошибка: {e}")
+        metrics.inc('dpk_errors_total', endpoint='calculate', type=type(e).__name__)
+        return jsonify({"error": "Внутренняя ошибка сервера"}), 500
+
+@app.route('/api/calculate/batch', methods=['POST'])
+def calculate_batch():
+    """API-метод для пакетного расчета металлоконструкций (массив наборов параметров)."""
     try:
         if not request.is_json:
             raise ValueError("Content-Type должен быть 'application/json'")
         data = request.get_json()
-        # Извлекаем параметры из запроса
-        width = float(data['width'])  # Ширина конструкции
-        height = float(data['height'])  # Высота конструкции
-        steps = int(data['steps'])  # Количество ступеней
-        material = data['material']  # Материал ступеней
-        has_platform = data['has_platform']  # Наличие платформы
-        platform_depth = float(data['platform_depth']) if has_platform else 0  # Глубина платформы (если есть)
-        reinforcements_count = int(data.get('reinforcements_count', 1))  # Количество усилений (по умолчанию 1)
-        paint_consumption = float(data.get('paint_consumption', 110))  # Расход краски (г/м²)
-        frame_color = data.get('frame_color', 'RAL9005')  # Цвет каркаса (по умолчанию черный)
-
-        # Выполняем расчет металлоконструкции
-        result = calculate_metal(width, height, steps, material, has_platform, platform_depth, reinforcements_count, paint_consumption, frame_color)
+        # Принимаем как массив, так и объект вида {"items": [...]}
+        items = data.get('items') if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            raise ValueError("Ожидается массив наборов параметров или объект с ключом 'items'")
+        max_items = app.config['BATCH_MAX_ITEMS']
+        if len(items) > max_items:
+            raise ValueError(f"Слишком много наборов параметров: {len(items)} (максимум {max_items})")
+
+        # Ошибки отдельных наборов возвращаются внутри ответа, не прерывая весь пакет
+        body = calculate_metal_batch_json(items, app.config)
+        return app.response_class(body, mimetype='application/json')
+    except ValueError as e:
+        app.logger.error(f"Ошибка валидации пакета: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Неизвестная ошибка пакетного расчета: {e}")
+        return jsonify({"error": "Внутренняя ошибка сервера"}), 500
+
+def upload_rows():
+    """Строки файла с наборами параметров из тела запроса (CSV или NDJSON) или из формы.
+
+    Возвращает (строки (номер, набор, ошибка), поток файла); заголовок CSV читается сразу.
+    """
+    # Определяем формат входного файла: тело запроса или файл из формы
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        if upload is None:
+            raise ValueError("Ожидается файл в поле 'file'")
+        # Забираем поток файла себе: иначе он закрывается вместе с запросом до окончания ответа
+        stream, upload.stream = upload.stream, io.BytesIO()
+        input_format = 'csv' if (upload.filename or '').lower().endswith('.csv') else 'ndjson'
+    elif request.mimetype in ('text/csv', 'application/csv'):
+        stream, input_format = request.stream, 'csv'
+    elif request.mimetype in ('application/x-ndjson', 'application/jsonl', 'application/json-lines'):
+        stream, input_format = request.stream, 'ndjson'
+    else:
+        raise ValueError("Content-Type должен быть 'text/csv', 'application/x-ndjson' или 'multipart/form-data'")
+
+    lines = iter_lines(stream, app.config['BULK_MAX_LINE_BYTES'])
+    return (csv_rows(lines) if input_format == 'csv' else ndjson_rows(lines)), stream
+
+@app.route('/api/calculate/stream', methods=['POST'])
+def calculate_stream():
+    """API-метод для потокового расчета файла CSV или NDJSON (результаты отправляются по мере расчета)."""
+    try:
+        rows, stream = upload_rows()  # Заголовок CSV читается сразу
+
+        # Формат ответа: параметр format или заголовок Accept (по умолчанию NDJSON)
+        output_format = request.args.get('format') or (
+            'csv' if request.accept_mimetypes.best_match(['application/x-ndjson', 'text/csv']) == 'text/csv'
+            else 'ndjson')
+        if output_format not in ('csv', 'ndjson'):
+            raise ValueError("Параметр format должен быть 'csv' или 'ndjson'")
+
+        chunk_size = app.config['BULK_CHUNK_SIZE']
+        if output_format == 'csv':
+            body, mimetype = stream_csv(rows, app.config, chunk_size), 'text/csv'
+        else:
+            body, mimetype = stream_ndjson(rows, app.config, chunk_size), 'application/x-ndjson'
+
+        def generate():
+            # Статус ответа уже отправлен, поэтому сбой посреди файла сообщаем последней строкой
+            try:
+                yield from body
+            except Exception as e:
+                app.logger.error(f"Ошибка потокового расчета: {e}")
+                yield ('error,Внутренняя ошибка сервера\n' if output_format == 'csv'
+                       else json.dumps({"error": "Внутренняя ошибка сервера"}) + '\n')
+            finally:
+                if stream is not request.stream:
+                    stream.close()
+
+        response = app.response_class(stream_with_context(generate()), mimetype=mimetype)
+        response.headers['X-Accel-Buffering'] = 'no'  # Прокси не должен буферизовать поток
+        return response
+    except ValueError as e:
+        app.logger.error(f"Ошибка валидации файла: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Неизвестная ошибка потокового расчета: {e}")
+        return jsonify({"error": "Внутренняя ошибка сервера"}), 500
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+def json_export_rows(data):
+    """Строки выгрузки из JSON: массив наборов параметров, {"items": [...]} или {"quotes": [номера]}."""
+    if isinstance(data, dict) and 'quotes' in data:
+        ids = data['quotes']
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            raise ValueError("Поле 'quotes' должно быть массивом номеров котировок")
+        if quote_store is None:
+            raise ValueError("История расчетов отключена")
+        if len(ids) > app.config['EXPORT_MAX_ITEMS']:
+            raise ValueError(f"Слишком много котировок: максимум {app.config['EXPORT_MAX_ITEMS']}")
+        # Номер строки выгрузки - номер котировки
+        return ((quote_id, params, None if params is not None else "Котировка не найдена")
+                for quote_id, params in quote_store.params(ids))
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        raise ValueError("Ожидается массив наборов параметров, {'items': [...]} или {'quotes': [...]}")
+    if len(items) > app.config['EXPORT_MAX_ITEMS']:
+        raise ValueError(f"Слишком много наборов: максимум {app.config['EXPORT_MAX_ITEMS']}")
+    return ((row, item, None) if isinstance(item, dict) else (row, None, "Ожидается объект с параметрами")
+            for row, item in enumerate(items, 1))
+
+@app.route('/api/export', methods=['POST'])
+def export_bom():
+    """Спецификация материалов для множества лестниц: XLSX (по умолчанию) или CSV, строки отправляются по мере расчета."""
+    try:
+        output_format = request.args.get('format') or (
+            'csv' if request.accept_mimetypes.best_match([XLSX_MIMETYPE, 'text/csv']) == 'text/csv' else 'xlsx')
+        if output_format not in ('xlsx', 'csv'):
+            raise ValueError("Параметр format должен быть 'xlsx' или 'csv'")
+        if request.is_json:
+            rows, stream = json_export_rows(request.get_json()), None
+        else:
+            rows, stream = upload_rows()
+
+        chunk_size = app.config['BULK_CHUNK_SIZE']
+        if output_format == 'csv':
+            body, mimetype = stream_bom_csv(rows, app.config, chunk_size), 'text/csv'
+        else:
+            body, mimetype = stream_bom_xlsx(rows, app.config, chunk_size), XLSX_MIMETYPE
+        # XLSX уже сжат (архив zip), поэтому gzip применяется только к CSV
+        compress = output_format == 'csv' and request.accept_encodings['gzip'] > 0
+
+        def generate():
+            try:
+                yield from body
+            except Exception as e:
+                # Статус уже отправлен: CSV получает строку ошибки, XLSX обрывается (архив без оглавления не откроется)
+                app.logger.error(f"Ошибка выгрузки спецификации: {e}")
+                if output_format == 'csv':
+                    yield 'error,Внутренняя ошибка сервера\n'
+            finally:
+                if stream is not None and stream is not request.stream:
+                    stream.close()
+
+        chunks = gzip_stream(generate()) if compress else generate()
+        response = app.response_class(stream_with_context(chunks), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="bom.{output_format}"'
+        response.headers['X-Accel-Buffering'] = 'no'
+        response.vary.add('Accept-Encoding')
+        if compress:
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
+    except ValueError as e:
+        app.logger.error(f"Ошибка валидации выгрузки: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Неизвестная ошибка выгрузки: {e}")
+        return jsonify({"error": "Внутренняя ошибка сервера"}), 500
+
+@app.route('/api/price', methods=['POST'])
+def price():
+    """API-метод для быстрого получения ключевых величин расчета (из сетки цен или расчетом)."""
+    try:
+        if not request.is_json:
+            raise ValueError("Content-Type должен быть 'application/json'")
+        params = parse_params(request.get_json())
+
+        # Набор на узле сетки обслуживаем чтением строки из файла, остальные - расчетом
+        if price_grid is not None and price_grid.is_current(app.config):
+            summary = price_grid.lookup(params)
+            if summary is not None:
+                return jsonify(dict(summary, source="grid"))
+
+        result = calculate_metal(*params)
         if result is None:
-            # Если расчет не удался, возвращаем ошибку
             return jsonify({"error": "Неверный материал"}), 400
+        return jsonify(dict(summarize(result), source="live"))
+    except KeyError as e:
+        app.logger.error(f"Ошибка обработки запроса: отсутствует ключ {e}")
+        return jsonify({"error": f"Отсутствует обязательный параметр: {e}"}), 400
+    except ValueError as e:
+        app.logger.error(f"Ошибка валидации: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Неизвестная ошибка: {e}")
+        return jsonify({"error": "Внутренняя ошибка сервера"}), 500
 
-        return jsonify(result)  # Возвращаем результат в формате JSON
+@app.route('/api/model', methods=['POST'])
+def model():
+    """API-метод, возвращающий 3D-модель лестницы одним GLB-файлом с инстансингом деталей."""
+    try:
+        if not request.is_json:
+            raise ValueError("Content-Type должен быть 'application/json'")
+        data = request.get_json()
+        params = parse_params(data)
+        stair_model = data.get('model', 'eco')  # Модель лестницы: от нее зависит каркас
+        if stair_model not in STAIR_MODELS:
+            raise ValueError(f"Неизвестная модель лестницы: {stair_model}")
+
+        key = cache_key(model_cache, params)
+        if key is not None:
+            key = (stair_model, *key)
+        body = model_cache.get(key) if key is not None else None
+        if body is None:
+            result = calculate_metal(*params)
+            if result is None:
+                return jsonify({"error": "Неверный материал"}), 400
+            body = stair_glb(result, stair_model)
+            if key is not None:
+                model_cache.put(key, body)
+        return app.response_class(body, mimetype='model/gltf-binary')
+    except KeyError as e:
+        app.logger.error(f"Ошибка обработки запроса: отсутствует ключ {e}")
+        return jsonify({"error": f"Отсутствует обязательный параметр: {e}"}), 400
+    except ValueError as e:
+        app.logger.error(f"Ошибка валидации: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Неизвестная ошибка: {e}")
+        return jsonify({"error": "Внутренняя ошибка сервера"}), 500
+
+def preview_response(params):
+    """Превью лестницы из дискового кэша или отрисованное заново (format, width, height из строки запроса).
+
+    ETag - адрес превью в кэше, поэтому повторный запрос с If-None-Match получает 304.
+    """
+    fmt = request.args.get('format', 'png')
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат превью: {fmt}")
+    if fmt not in available_formats():
+        return jsonify({"error": f"Формат {fmt} недоступен на сервере"}), 406
+    width = optional_number('width', int)
+    height = optional_number('height', int)
+    width = app.config['PREVIEW_WIDTH'] if width is None else width
+    height = app.config['PREVIEW_HEIGHT'] if height is None else height
+    limit = app.config['PREVIEW_MAX_SIZE']
+    if not (16 <= width <= limit and 16 <= height <= limit):
+        raise ValueError(f"Размеры превью должны быть от 16 до {limit} пикселей")
+
+    result = calculate_metal(*params)
+    if result is None:
+        return jsonify({"error": "Неверный материал"}), 400
+    dimensions = result['dimensions']
+    key = preview_key(dimensions, width, height, fmt)
+    mimetype, encoder = FORMATS[fmt]
+    body = preview_cache.get(key, fmt)
+    if body is None:
+        body = encoder(render(dimensions, width, height))
+        preview_cache.put(key, fmt, body)
+        metrics.inc('dpk_previews_total', outcome='rendered')
+    else:
+        metrics.inc('dpk_previews_total', outcome='hit')
+    response = app.response_class(body, mimetype=mimetype)
+    response.set_etag(key)
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response.make_conditional(request)
+
+@app.route('/api/preview', methods=['POST'])
+def preview():
+    """API-метод, возвращающий превью лестницы в PNG или WebP."""
+    try:
+        if not request.is_json:
+            raise ValueError("Content-Type должен быть 'application/json'")
+        return preview_response(parse_params(request.get_json()))
     except KeyError as e:
         app.logger.error(f"Ошибка обработки запроса: отсутствует ключ {e}")
         return jsonify({"error": f"Отсутствует обязательный параметр: {e}"}), 400
@@ -390,6 +859,203 @@ def calculate():
         app.logger.error(f"Неизвестная ошибка: {e}")
         return jsonify({"error": "Внутренняя ошибка сервера"}), 500
 
+@app.route('/api/cutplan', methods=['POST'])
+def cutplan():
+    """API-метод для плана раскроя профиля по хлыстам для набора заказов и/или отдельных отрезков."""
+    try:
+        if not request.is_json:
+            raise ValueError("Content-Type должен быть 'application/json'")
+        data = request.get_json()
+        if not isinstance(data, dict):
+            raise ValueError("Ожидается объект с ключами 'orders' и/или 'pieces'")
+        orders = data.get('orders', [])  # Наборы параметров calculate_metal
+        extra = data.get('pieces', [])  # Отдельные отрезки: {"length": мм, "count": N, "part": "..."}
+        if not isinstance(orders, list) or not isinstance(extra, list):
+            raise ValueError("Ключи 'orders' и 'pieces' должны быть массивами")
+        max_items = app.config['BATCH_MAX_ITEMS']
+        if len(orders) > max_items:
+            raise ValueError(f"Слишком много заказов: {len(orders)} (максимум {max_items})")
+        stock_length = float(data.get('stock_length', app.config['CUT_STOCK_LENGTH']))  # Длина хлыста
+        kerf = float(data.get('kerf', app.config['CUT_KERF']))  # Ширина реза
+        if not 0 < stock_length < float('inf') or not 0 <= kerf < stock_length:
+            raise ValueError("Некорректная длина хлыста или ширина реза")
+
+        # Заказы считаются пакетным движком; некорректные возвращаются в errors
+        pieces, errors = [], []
+        for order, result in enumerate(calculate_metal_batch(orders, app.config)):
+            if 'error' in result:
+                errors.append({"order": order, "error": result['error']})
+            else:
+                pieces.extend(pieces_from_result(result, app.config, order))
+        max_pieces = app.config['CUT_MAX_PIECES']
+        for item in extra:
+            count = int(item.get('count', 1))
+            if count < 0:
+                raise ValueError("Количество отрезков не может быть отрицательным")
+            if len(pieces) + count > max_pieces:
+                raise ValueError(f"Слишком много отрезков (максимум {max_pieces})")
+            # Отдельные отрезки помечаются номером заказа -1
+            pieces.extend([Piece(float(item['length']), str(item.get('part', 'custom')), -1)] * count)
+        if len(pieces) > max_pieces:
+            raise ValueError(f"Слишком много отрезков (максимум {max_pieces})")
+
+        plan = plan_cuts(pieces, stock_length, kerf)
+        plan['errors'] = errors
+        return jsonify(plan)
+    except KeyError as e:
+        app.logger.error(f"Ошибка обработки запроса: отсутствует ключ {e}")
+        return jsonify({"error": f"Отсутствует обязательный параметр: {e}"}), 400
+    except (ValueError, TypeError, AttributeError) as e:
+        app.logger.error(f"Ошибка валидации плана раскроя: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Неизвестная ошибка плана раскроя: {e}")
+        return jsonify({"error": "Внутренняя ошибка сервера"}), 500
+
+@app.route('/api/optimize', methods=['POST'])
+def optimize_endpoint():
+    """API-метод подбора конфигураций лестницы (ступени, материал, платформа, усиления) с минимальными затратами."""
+    try:
+        if not request.is_json:
+            raise ValueError("Content-Type должен быть 'application/json'")
+        return jsonify(optimize(request.get_json(), app.config))
+    except (ValueError, TypeError) as e:
+        app.logger.error(f"Ошибка валидации подбора: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Неизвестная ошибка подбора: {e}")
+        return jsonify({"error": "Внутренняя ошибка сервера"}), 500
+
+def live_event(seq: int, data, coalesced: int) -> str:
+    """Событие потока живого пересчета для последнего изменения формы (result или calc-error)."""
+    try:
+        params = parse_params(data)
+        validate_input(params.width, params.height, params.steps)
+        # Тот же кэш, что у /api/calculate?format=fastjson
+        key = cache_key(result_cache, params)
+        if key is not None:
+            key += ('fastjson',)
+        body = result_cache.get(key) if key is not None else None
+        if body is None:
+            result = calculate_metal(*params)
+            if result is None:
+                return event("calc-error", json.dumps({"seq": seq, "error": "Неверный материал"}))
+            body = encode(result, 'fastjson')
+            if key is not None:
+                result_cache.put(key, body)
+        # Результат содержит блок dimensions, по которому страница строит 3D-модель
+        return event("result", f'{{"seq":{seq},"coalesced":{coalesced},"result":{body.decode()}}}')
+    except (KeyError, ValueError, TypeError) as e:
+        return event("calc-error", json.dumps({"seq": seq, "error": describe_parse_error(e)}))
+
+@app.route('/api/live')
+def live_stream():
+    """Поток Server-Sent Events живого пересчета: session, затем result/calc-error на изменения формы."""
+    try:
+        session = live_hub.open()
+    except OverflowError as e:
+        return jsonify({"error": str(e)}), 503
+    events = live_hub.stream(session, live_event, app.config['LIVE_HEARTBEAT'], app.config['LIVE_IDLE_TIMEOUT'])
+    response = app.response_class(events, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Отключаем буферизацию ответа в nginx
+    response.call_on_close(lambda: live_hub.close(session))  # Соединение закрыто до начала потока
+    return response
+
+@app.route('/api/live/<session_id>', methods=['POST'])
+def live_update(session_id):
+    """Изменение формы для сессии живого пересчета: {"seq": N, "params": {...}}.
+
+    Отвечает сразу (202); результат приходит в поток сессии. Изменения с номером не больше уже
+    принятого отбрасываются (stale), необработанное изменение заменяется новым (coalesced).
+    """
+    try:
+        if (request.content_length or 0) > app.config['LIVE_MAX_BODY']:
+            return jsonify({"error": "Слишком большое изменение"}), 413
+        data = request.get_json(silent=True)
+        seq = data.get('seq') if isinstance(data, dict) else None
+        if not isinstance(seq, int) or isinstance(seq, bool) or not isinstance(data.get('params'), dict):
+            raise ValueError("Ожидается объект {\"seq\": число, \"params\": {...}}")
+        outcome = live_hub.deliver(session_id, seq, data['params'])
+        if outcome is None:
+            return jsonify({"error": "Сессия не найдена"}), 404
+        return jsonify({"status": outcome}), 202
+    except ValueError as e:
+        app.logger.error(f"Ошибка валидации живого пересчета: {e}")
+        return jsonify({"error": str(e)}), 400
+
+def optional_number(name: str, cast=float):
+    """Необязательный числовой параметр строки запроса."""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise ValueError(f"Некорректное значение параметра {name}: {value}")
+
+@app.route('/api/quotes')
+def quotes_history():
+    """История расчетов от новых к старым с фильтрами from/to, material, width_min/width_max.
+
+    Страница продолжается параметром before со значением next из предыдущей страницы.
+    """
+    if quote_store is None:
+        return jsonify({"error": "История расчетов отключена"}), 404
+    try:
+        args = request.args
+        limit = optional_number('limit', int)
+        if limit is None:
+            limit = app.config['QUOTES_PAGE_SIZE']
+        if not 1 <= limit <= app.config['QUOTES_MAX_PAGE_SIZE']:
+            raise ValueError(f"limit должен быть от 1 до {app.config['QUOTES_MAX_PAGE_SIZE']}")
+        page = quote_store.history(
+            since=parse_time(args['from']) if args.get('from') else None,
+            until=parse_time(args['to']) if args.get('to') else None,
+            material=args.get('material') or None,
+            width_min=optional_number('width_min'),
+            width_max=optional_number('width_max'),
+            limit=limit,
+            before=decode_cursor(args['before']) if args.get('before') else None,
+        )
+        return jsonify(page)
+    except ValueError as e:
+        app.logger.error(f"Ошибка валидации истории: {e}")
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/api/quotes/<int:quote_id>')
+def quote_detail(quote_id):
+    """Котировка с полным результатом расчета в поле result."""
+    quote = quote_store.get(quote_id) if quote_store is not None else None
+    if quote is None:
+        return jsonify({"error": "Котировка не найдена"}), 404
+    result = quote.pop('result')
+    # Сохраненный JSON результата подставляется без повторного разбора
+    body = json.dumps(quote, ensure_ascii=False)[:-1].encode() + b',"result":' + result + b'}'
+    return app.response_class(body, mimetype='application/json')
+
+@app.route('/api/quotes/<int:quote_id>/preview')
+def quote_preview(quote_id):
+    """Превью лестницы котировки: постоянная ссылка GET для писем и коммерческих предложений."""
+    params = next(quote_store.params([quote_id]))[1] if quote_store is not None else None
+    if params is None:
+        return jsonify({"error": "Котировка не найдена"}), 404
+    try:
+        return preview_response(parse_params(params))
+    except ValueError as e:
+        app.logger.error(f"Ошибка валидации превью: {e}")
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Метрики всех процессов приложения в текстовом формате Prometheus."""
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    """Возвращает счетчики кэшей текущего процесса."""
+    return jsonify({"results": result_cache.stats(), "models": model_cache.stats()})
+
 if __name__ == '__main__':
     # Запускаем приложение на локальном сервере
     debug = app.config['DEBUG']  # Проверяем, включен ли режим отладки
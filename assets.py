@@ -0,0 +1,465 @@
+"""Сборка и раздача статических ресурсов страниц калькулятора.
+
+Сборка (python assets.py build):
+- функции, одинаковые во всех скриптах страниц (eco.js, optima.js, komfort.js), выносятся в общий common.js;
+- скрипты минифицируются (удаление комментариев и отступов с сохранением переводов строк);
+- каждому файлу дается имя с хэшем содержимого, рядом кладутся сжатые копии .gz и .br;
+- для превью страниц строятся уменьшенные копии WebP;
+- библиотеки с CDN (Bootstrap, Three.js, OrbitControls) берутся из static/vendor,
+  куда их скачивает python assets.py vendor (хэши фиксируются в static/vendor/vendor.lock.json).
+
+Результат и manifest.json лежат в static/dist; приложение раздает их по /assets/ с заголовком
+Cache-Control: immutable, поддержкой ETag/304 и выбором сжатой копии по Accept-Encoding.
+Без сборки шаблоны ссылаются на исходные файлы в /static и на CDN.
+"""
+import argparse  # Для разбора аргументов командной строки
+import gzip  # Для предварительного сжатия
+import hashlib  # Для хэшей содержимого
+import json  # Для манифеста и файла фиксации хэшей
+import mimetypes  # Для типа содержимого раздаваемых файлов
+import os  # Для работы с файловой системой
+import shutil  # Для очистки каталога сборки
+import urllib.request  # Для загрузки библиотек с CDN
+
+try:
+    import brotli  # Сжатие Brotli (необязательная зависимость)
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image  # Построение превью WebP (необязательная зависимость)
+except ImportError:
+    Image = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+VENDOR_DIR = os.path.join(STATIC_DIR, 'vendor')
+VENDOR_LOCK = os.path.join(VENDOR_DIR, 'vendor.lock.json')
+MANIFEST = 'manifest.json'
+
+PAGES = ("eco", "optima", "komfort")  # Скрипты страниц, из которых выделяется общий код
+SCRIPTS = ("js/stair_model.js", "js/live.js")  # Остальные скрипты (без разделения)
+# Библиотеки, которые страницы раньше загружали с CDN
+VENDOR = {
+    "bootstrap.min.css": "https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css",
+    "bootstrap.bundle.min.js": "https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js",
+    "three.min.js": "https://cdnjs.cloudflare.com/ajax/libs/three.js/r128/three.min.js",
+    "OrbitControls.js": "https://cdn.jsdelivr.net/npm/three@0.128.0/examples/js/controls/OrbitControls.js",
+}
+THUMB_HEIGHT = 400  # Высота превью WebP (вдвое больше высоты карточки на странице выбора)
+HASH_LENGTH = 10
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Ключевые слова, после которых "/" начинает регулярное выражение, а не деление
+_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw",
+                   "instanceof", "yield", "await"}
+_PUNCT = set("{}()[];,<>+-*/%&|^!~?:=.")
+
+
+def tokenize(source: str) -> list:
+    """Разбивает JavaScript на лексемы (вид, текст): ws, comment, str, regex, word, punct."""
+    tokens = []
+    i, n = 0, len(source)
+    last = None  # Последняя значимая лексема (для различения деления и регулярного выражения)
+    while i < n:
+        c = source[i]
+        if c.isspace():
+            j = i
+            while j < n and source[j].isspace():
+                j += 1
+            tokens.append(("ws", source[i:j]))
+        elif source.startswith('//', i):
+            j = source.find('\n', i)
+            j = n if j < 0 else j
+            tokens.append(("comment", source[i:j]))
+        elif source.startswith('/*', i):
+            j = source.find('*/', i + 2)
+            j = n if j < 0 else j + 2
+            tokens.append(("comment", source[i:j]))
+        elif c in '"\'':
+            j = _skip_string(source, i)
+            tokens.append(("str", source[i:j]))
+        elif c == '`':
+            j = _skip_template(source, i)
+            tokens.append(("str", source[i:j]))
+        elif c == '/' and (last is None or (last[0] == "punct" and last[1] not in ')]}')
+                           or (last[0] == "word" and last[1] in _REGEX_KEYWORDS)):
+            j = _skip_regex(source, i)
+            tokens.append(("regex", source[i:j]))
+        elif c.isalnum() or c in '_$' or ord(c) > 127:
+            j = i
+            while j < n and (source[j].isalnum() or source[j] in '_$' or ord(source[j]) > 127
+                             or (source[j] == '.' and source[i].isdigit())):
+                j += 1
+            tokens.append(("word", source[i:j]))
+        else:
+            j = i + 1
+            tokens.append(("punct", c))
+        if tokens[-1][0] not in ("ws", "comment"):
+            last = tokens[-1]
+        i = j
+    return tokens
+
+
+def _skip_string(source: str, i: int) -> int:
+    quote, j = source[i], i + 1
+    while j < len(source) and source[j] != quote:
+        j += 2 if source[j] == '\\' else 1
+    return j + 1
+
+
+def _skip_template(source: str, i: int) -> int:
+    j = i + 1
+    while j < len(source) and source[j] != '`':
+        if source[j] == '\\':
+            j += 2
+        elif source.startswith('${', j):
+            depth, j = 1, j + 2
+            while j < len(source) and depth:
+                if source[j] in '"\'':
+                    j = _skip_string(source, j)
+                    continue
+                if source[j] == '`':
+                    j = _skip_template(source, j)
+                    continue
+                depth += {'{': 1, '}': -1}.get(source[j], 0)
+                j += 1
+        else:
+            j += 1
+    return j + 1
+
+
+def _skip_regex(source: str, i: int) -> int:
+    j, in_class = i + 1, False
+    while j < len(source) and source[j] != '\n':
+        c = source[j]
+        if c == '\\':
+            j += 2
+            continue
+        if c == '[':
+            in_class = True
+        elif c == ']':
+            in_class = False
+        elif c == '/' and not in_class:
+            j += 1
+            while j < len(source) and source[j].isalpha():
+                j += 1  # Флаги
+            return j
+        j += 1
+    return j
+
+
+def minify_tokens(tokens: list) -> str:
+    """Склеивает лексемы без комментариев и отступов.
+
+    Переводы строк сохраняются (по одному), поэтому автоматическая вставка точек с запятой
+    работает так же, как в исходном коде; пробелы внутри строки остаются только между словами
+    и там, где без них изменился бы смысл (a + +b, a / /re/).
+    """
+    significant = [t for t in tokens if t[0] != "comment"]
+    out = []
+    for k, (kind, text) in enumerate(significant):
+        if kind != "ws":
+            out.append(text)
+            continue
+        if not out or out[-1] == '\n':
+            continue
+        if '\n' in text:
+            out.append('\n')
+            continue
+        following = next((t for t in significant[k + 1:] if t[0] != "ws"), None)
+        if following is None:
+            continue
+        prev_char, next_char = out[-1][-1], following[1][0]
+        if (_is_word_char(prev_char) and _is_word_char(next_char)) or \
+                (prev_char == next_char and prev_char in '+-/'):
+            out.append(' ')
+    return "".join(out).strip() + "\n"
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c in '_$\'"`' or ord(c) > 127
+
+
+def minify_js(source: str) -> str:
+    """Минифицирует скрипт."""
+    return minify_tokens(tokenize(source))
+
+
+def top_level_functions(tokens: list) -> dict:
+    """Объявления функций верхнего уровня: имя -> (начало, конец) в списке лексем."""
+    functions = {}
+    depth = 0
+    k = 0
+    while k < len(tokens):
+        kind, text = tokens[k]
+        if kind == "punct" and text in '{([':
+            depth += 1
+        elif kind == "punct" and text in '})]':
+            depth -= 1
+        elif depth == 0 and kind == "word" and text == "function":
+            start = k
+            prev = _previous_significant(tokens, k)
+            if prev is not None and tokens[prev] == ("word", "async"):
+                start = prev
+            elif prev is not None and not (tokens[prev][0] == "punct" and tokens[prev][1] in ';}'):
+                k += 1
+                continue  # Функциональное выражение, а не объявление
+            name_index = _next_significant(tokens, k)
+            if name_index is None or tokens[name_index][0] != "word":
+                k += 1
+                continue
+            body = _find(tokens, name_index, "{")
+            end = _matching(tokens, body)
+            functions[tokens[name_index][1]] = (start, end + 1)
+            k = end + 1
+            continue
+        k += 1
+    return functions
+
+
+def _previous_significant(tokens: list, k: int):
+    k -= 1
+    while k >= 0 and tokens[k][0] in ("ws", "comment"):
+        k -= 1
+    return k if k >= 0 else None
+
+
+def _next_significant(tokens: list, k: int):
+    k += 1
+    while k < len(tokens) and tokens[k][0] in ("ws", "comment"):
+        k += 1
+    return k if k < len(tokens) else None
+
+
+def _find(tokens: list, k: int, text: str) -> int:
+    # Первая открывающая скобка тела после списка параметров
+    paren = _find_punct(tokens, k, "(")
+    k = _matching(tokens, paren) + 1
+    return _find_punct(tokens, k, text)
+
+
+def _find_punct(tokens: list, k: int, text: str) -> int:
+    while tokens[k] != ("punct", text):
+        k += 1
+    return k
+
+
+def _matching(tokens: list, k: int) -> int:
+    """Индекс закрывающей скобки для открывающей скобки с индексом k."""
+    depth = 0
+    for j in range(k, len(tokens)):
+        kind, text = tokens[j]
+        if kind == "punct" and text in '{([':
+            depth += 1
+        elif kind == "punct" and text in '})]':
+            depth -= 1
+            if depth == 0:
+                return j
+    raise ValueError("Несбалансированные скобки в скрипте")
+
+
+def split_shared(sources: dict) -> tuple:
+    """Выделяет функции верхнего уровня, одинаковые во всех скриптах.
+
+    Возвращает (общий код, {имя скрипта: код без общих функций}). Скрипты страниц классические
+    (не модули), поэтому функции из общего скрипта, подключенного первым, видны им глобально.
+    """
+    tokens = {name: tokenize(source) for name, source in sources.items()}
+    functions = {name: top_level_functions(t) for name, t in tokens.items()}
+    first = next(iter(sources))
+
+    def text(name, span):
+        return minify_tokens(tokens[name][span[0]:span[1]])
+
+    shared = [fn for fn in functions[first]
+              if all(fn in functions[name] and text(name, functions[name][fn]) == text(first, functions[first][fn])
+                     for name in sources)]
+    common = "\n".join(minify_tokens(tokens[first][slice(*functions[first][fn])]) for fn in shared)
+    pages = {}
+    for name in sources:
+        removed = sorted((functions[name][fn] for fn in shared), reverse=True)
+        page_tokens = list(tokens[name])
+        for start, end in removed:
+            del page_tokens[start:end]
+        pages[name] = minify_tokens(page_tokens)
+    return common, pages
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def write_asset(dist_dir: str, name: str, data: bytes, manifest: dict) -> str:
+    """Записывает файл с хэшем в имени и сжатые копии; добавляет запись в манифест."""
+    base, ext = os.path.splitext(name)
+    hashed = f"{base}.{content_hash(data)}{ext}"
+    path = os.path.join(dist_dir, hashed)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    if ext in ('.js', '.css', '.svg', '.json'):
+        # Сжатая копия сохраняется, только если она меньше исходной
+        variants = [('.gz', gzip.compress(data, 9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(data, quality=11)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(data):
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+    manifest[name] = hashed
+    return hashed
+
+
+def webp_thumbnail(path: str) -> bytes:
+    """Уменьшенная копия изображения в WebP."""
+    import io
+    with Image.open(path) as image:
+        image.thumbnail((THUMB_HEIGHT * 4, THUMB_HEIGHT))
+        buffer = io.BytesIO()
+        image.save(buffer, 'WEBP', quality=80, method=6)
+        return buffer.getvalue()
+
+
+def build(static_dir: str = STATIC_DIR, dist_dir: str = None, clean: bool = False) -> dict:
+    """Собирает ресурсы в dist_dir и возвращает манифест (исходное имя -> имя с хэшем)."""
+    dist_dir = dist_dir or os.path.join(static_dir, 'dist')
+    if clean and os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    manifest = {}
+
+    def read(name):
+        with open(os.path.join(static_dir, name), 'rb') as f:
+            return f.read()
+
+    # Скрипты страниц: общий код отдельно, остальное - по странице
+    sources = {page: read(f"js/{page}.js").decode('utf-8') for page in PAGES}
+    common, pages = split_shared(sources)
+    write_asset(dist_dir, "js/common.js", common.encode(), manifest)
+    for page, code in pages.items():
+        write_asset(dist_dir, f"js/{page}.js", code.encode(), manifest)
+    for name in SCRIPTS:
+        write_asset(dist_dir, name, minify_js(read(name).decode('utf-8')).encode(), manifest)
+
+    # Библиотеки: только скачанные командой vendor
+    for name in VENDOR:
+        if os.path.exists(os.path.join(static_dir, 'vendor', name)):
+            write_asset(dist_dir, f"vendor/{name}", read(f"vendor/{name}"), manifest)
+
+    # Изображения: исходные файлы и превью WebP
+    images_dir = os.path.join(static_dir, 'images')
+    for filename in sorted(os.listdir(images_dir)) if os.path.isdir(images_dir) else ():
+        name = f"images/{filename}"
+        write_asset(dist_dir, name, read(name), manifest)
+        if Image is not None and filename.lower().endswith(('.png', '.jpg', '.jpeg')):
+            write_asset(dist_dir, f"{os.path.splitext(name)[0]}.webp", webp_thumbnail(os.path.join(static_dir, name)),
+                        manifest)
+
+    with open(os.path.join(dist_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return manifest
+
+
+def vendor(vendor_dir: str = VENDOR_DIR, lock_path: str = VENDOR_LOCK) -> dict:
+    """Скачивает библиотеки с CDN в vendor_dir и сверяет их хэши с файлом фиксации.
+
+    При первой загрузке хэши записываются в файл фиксации; при следующих несовпадение - ошибка.
+    """
+    os.makedirs(vendor_dir, exist_ok=True)
+    lock = {}
+    if os.path.exists(lock_path):
+        with open(lock_path, encoding='utf-8') as f:
+            lock = json.load(f)
+    for name, url in VENDOR.items():
+        with urllib.request.urlopen(url, timeout=30) as response:
+            data = response.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if name in lock and lock[name]['sha256'] != digest:
+            raise ValueError(f"Хэш {name} не совпадает с {lock_path}: {digest}")
+        lock[name] = {"url": url, "sha256": digest}
+        with open(os.path.join(vendor_dir, name), 'wb') as f:
+            f.write(data)
+    with open(lock_path, 'w', encoding='utf-8') as f:
+        json.dump(lock, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return lock
+
+
+class Assets:
+    """Манифест сборки и функции для шаблонов (asset_url, page_scripts, vendor_url)."""
+
+    def __init__(self, dist_dir: str):
+        self.dist_dir = dist_dir
+        self.manifest = {}
+        path = os.path.join(dist_dir, MANIFEST)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+
+    def url(self, name: str):
+        """Адрес ресурса: собранный файл, если он есть в манифесте, иначе исходный из /static."""
+        from flask import url_for
+        if name in self.manifest:
+            return url_for('assets', filename=self.manifest[name])
+        return url_for('static', filename=name)
+
+    def optional_url(self, name: str):
+        """Адрес ресурса, который существует только после сборки (например, превью WebP), или None."""
+        from flask import url_for
+        return url_for('assets', filename=self.manifest[name]) if name in self.manifest else None
+
+    def page_scripts(self, page: str) -> list:
+        """Скрипты страницы: общий код и код страницы после сборки или исходный файл без нее."""
+        names = ["js/common.js", f"js/{page}.js"] if "js/common.js" in self.manifest else [f"js/{page}.js"]
+        return [self.url(name) for name in names]
+
+    def vendor_url(self, name: str) -> str:
+        """Адрес библиотеки: собранная или скачанная копия, иначе CDN."""
+        from flask import url_for
+        if f"vendor/{name}" in self.manifest:
+            return self.url(f"vendor/{name}")
+        if os.path.exists(os.path.join(VENDOR_DIR, name)):
+            return url_for('static', filename=f"vendor/{name}")
+        return VENDOR[name]
+
+
+def send_asset(dist_dir: str, filename: str, request):
+    """Раздает собранный файл: сжатая копия по Accept-Encoding, ETag из хэша, Cache-Control: immutable."""
+    from flask import send_file
+    from werkzeug.security import safe_join
+    path = safe_join(dist_dir, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    parts = os.path.basename(filename).rsplit('.', 2)
+    etag = parts[1] if len(parts) == 3 else content_hash(filename.encode())
+    encoding = None
+    for name, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[name] and os.path.isfile(path + suffix):
+            encoding, path = name, path + suffix
+            break
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_file(path, mimetype=mimetype, conditional=True,
+                         etag=f"{etag}-{encoding or 'identity'}", max_age=31536000)
+    response.headers['Cache-Control'] = IMMUTABLE
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сборка статических ресурсов")
+    parser.add_argument('command', choices=('build', 'vendor'), help="build - сборка, vendor - загрузка библиотек")
+    parser.add_argument('--clean', action='store_true', help="Удалить предыдущую сборку")
+    args = parser.parse_args()
+    if args.command == 'vendor':
+        for name, entry in vendor().items():
+            print(f"{name}: {entry['sha256']}")
+        return
+    manifest = build(clean=args.clean)
+    print(f"Собрано файлов: {len(manifest)}")
+    for name, hashed in sorted(manifest.items()):
+        print(f"{name} -> {hashed}")
+
+
+if __name__ == '__main__':
+    main()
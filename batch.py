@@ -0,0 +1,836 @@
+"""Векторизованный (NumPy) расчет металлоконструкций для множества наборов параметров.
+
+Движок повторяет все ветви app.calculate_metal, включая порядок операций с плавающей
+точкой, поэтому результаты совпадают с поштучным расчетом.
+"""
+import ctypes  # Для настройки malloc
+import ctypes.util  # Для поиска библиотеки C
+import json  # Для сериализации результатов
+import math  # Для проверки конечности чисел
+from itertools import repeat  # Для построения наборов параметров по столбцам
+from operator import itemgetter  # Для выборки обязательных параметров
+from typing import Iterable, Optional, Sequence  # Для аннотаций типов
+
+import numpy as np  # Для векторных вычислений
+
+from materials import MATERIAL_CODES, MaterialPlan, material_plans
+from params import CalcParams, describe_parse_error, parse_params
+from structure import COLUMNS as STRUCTURE_COLUMNS, evaluate as evaluate_structure, layout as structure_layout
+
+# Полоски для проушин (те же константы, что и в calculate_metal)
+STRIP_LENGTH = 160  # мм
+STRIP_WIDTH = 40  # мм
+STRIP_THICKNESS = 4  # мм
+STRIPS_COUNT = 2  # 2 проушины на изделие
+STRIP_PAINT_AREA = ((STRIP_WIDTH * 2 + STRIP_THICKNESS * 2) * STRIP_LENGTH * STRIPS_COUNT) / 1000000
+PROFILE_PERIMETER = 20 * 4  # 20мм - сторона профиля, 4 стороны
+INTERNAL_REINFORCEMENT = 170  # Фиксированная длина внутреннего усиления
+
+# Наибольшее количество ступеней и усилений в пакете: целые столбцы движка - int64, и произведения
+# с константами расчета не должны переполняться
+MAX_COUNT = 2 ** 31 - 1
+
+DPK_COLORS = {
+    'RAL9005': 'Венге',
+    'RAL8017': 'Коричневый',
+    'RAL7024': 'Серый'
+}
+
+
+def round2(values: np.ndarray) -> np.ndarray:
+    """Округляет массив до 2 знаков точно так же, как встроенный round(x, 2).
+
+    round() округляет точное значение x * 100 (ровно половину - к четному). Произведение в float64
+    отличается от точного, только если попало ровно на половину: тогда направление выбирается по
+    знаку погрешности произведения (разбиение Векампа-Деккера, без вызова round на значение).
+    """
+    scaled = values * 100
+    rounded = np.rint(scaled)
+    tie = (np.rint(scaled * 2) == scaled * 2) & (rounded != scaled)
+    if tie.any():
+        x = values[tie].astype(np.float64)
+        split = x * 134217729.0  # 2 ** 27 + 1
+        high = split - (split - x)
+        a, b = high * 100, (x - high) * 100  # Оба произведения точные
+        total = a + b
+        error = (a - (total - (total - a))) + (b - (total - a))
+        lower = np.floor(scaled[tie])
+        rounded[tie] = np.where(error > 0, lower + 1, np.where(error < 0, lower, rounded[tie]))
+    return rounded / 100
+
+
+# Параметры mallopt из malloc.h (glibc)
+_M_TRIM_THRESHOLD = -1
+_M_MMAP_THRESHOLD = -3
+_MMAP_THRESHOLD_MAX = 32 * 1024 * 1024  # Наибольший порог mmap, который glibc принимает на 64-битных системах
+
+
+def tune_allocator(trim_bytes: int) -> bool:
+    """Оставляет процессу до trim_bytes освобожденной памяти malloc (glibc).
+
+    Временные массивы пакета - сотни килобайт; по умолчанию glibc выделяет такие блоки через mmap
+    или обрезает кучу после освобождения, и следующий пакет заново получает каждую страницу от ядра
+    (page fault). Возвращает False, если настройка выключена (0) или malloc не из glibc.
+    """
+    if trim_bytes <= 0:
+        return False
+    try:
+        mallopt = ctypes.CDLL(ctypes.util.find_library('c')).mallopt
+    except (OSError, AttributeError, TypeError):
+        return False
+    return (bool(mallopt(_M_MMAP_THRESHOLD, min(trim_bytes, _MMAP_THRESHOLD_MAX)))
+            and bool(mallopt(_M_TRIM_THRESHOLD, trim_bytes)))
+
+
+def _validation_error(p: CalcParams, config) -> Optional[str]:
+    """Проверяет набор параметров по правилам validate_input; возвращает текст ошибки или None."""
+    if not isinstance(p.width, (int, float)):
+        return "Ширина должна быть числом"
+    if not config['MIN_WIDTH'] <= p.width <= config['MAX_WIDTH']:
+        return (f"Ширина {p.width} мм вне допустимого диапазона: "
+                f"{config['MIN_WIDTH']}..{config['MAX_WIDTH']} мм")
+    if not isinstance(p.height, (int, float)):
+        return "Высота должна быть числом"
+    if not config['MIN_HEIGHT'] <= p.height <= config['MAX_HEIGHT']:
+        return (f"Высота {p.height} мм вне допустимого диапазона: "
+                f"{config['MIN_HEIGHT']}..{config['MAX_HEIGHT']} мм")
+    if not isinstance(p.steps, int) or p.steps < 1:
+        return "Количество ступеней должно быть целым числом ≥ 1"
+    if p.steps > MAX_COUNT:
+        return f"Количество ступеней {p.steps} больше допустимого: {MAX_COUNT}"
+    if not isinstance(p.reinforcements_count, int) or abs(p.reinforcements_count) > MAX_COUNT:
+        return f"Количество усилений {p.reinforcements_count} вне допустимого диапазона: ±{MAX_COUNT}"
+    if not isinstance(p.material, str) or p.material not in MATERIAL_CODES:
+        return "Неверный материал"
+    # Бесконечные значения в исходной функции приводят к ошибке округления
+    if not (math.isfinite(p.platform_depth) and math.isfinite(p.paint_consumption)):
+        return "Некорректное числовое значение параметра"
+    return None
+
+
+def compute_columns(params: Sequence[CalcParams], config) -> dict:
+    """Считает все величины calculate_metal для корректных наборов параметров.
+
+    Возвращает словарь массивов без округления (по одному элементу на набор).
+    """
+    a = _param_arrays(params)
+    columns = compute_arrays(a['width'], a['height'], a['steps'], a['code'], a['has_platform'], a['platform_depth'],
+                             a['reinforcements_count'], a['paint_consumption'], config)
+    # Проверка прочности каркаса (structure.py) - столбцы structure_*
+    last_depth = np.where(a['has_platform'], a['platform_depth'], columns["step_depth"])
+    structure = evaluate_structure(a['width'], a['height'], a['steps'], columns["step_depth"], last_depth,
+                                   a['reinforcements_count'], config)
+    columns.update((f"structure_{name}", values) for name, values in structure.items())
+    return columns
+
+
+class _ParsedParams(list):
+    """Наборы CalcParams, разобранные по столбцам (_simple_params), вместе с готовыми столбцами,
+    чтобы _transpose и _param_arrays не собирали их заново."""
+
+    def __init__(self, params: Iterable, columns: dict, arrays: dict):
+        super().__init__(params)
+        self.columns = columns
+        self.arrays = arrays
+
+
+def _transpose(params: Sequence[CalcParams]) -> dict:
+    """Наборы параметров по столбцам: имя поля -> последовательность значений."""
+    if isinstance(params, _ParsedParams):
+        return params.columns
+    return dict(zip(CalcParams._fields, zip(*params))) if params else {name: () for name in CalcParams._fields}
+
+
+# Числовые параметры и типы их массивов
+_PARAM_DTYPES = (("width", np.float64), ("height", np.float64), ("steps", np.int64), ("platform_depth", np.float64),
+                 ("reinforcements_count", np.int64), ("paint_consumption", np.float64))
+
+
+def _param_arrays(params: Sequence[CalcParams]) -> dict:
+    """Параметры наборов в виде массивов: числовые, code (коды материалов MATERIAL_CODES) и has_platform."""
+    if isinstance(params, _ParsedParams):
+        return params.arrays
+    p = _transpose(params)
+    arrays = {name: np.array(p[name], dtype=dtype) for name, dtype in _PARAM_DTYPES}
+    arrays["code"] = np.fromiter(map(MATERIAL_CODES.__getitem__, p['material']), dtype=np.intp, count=len(params))
+    arrays["has_platform"] = np.fromiter(map(bool, p['has_platform']), dtype=bool, count=len(params))
+    return arrays
+
+
+def plan_columns(config) -> dict:
+    """Поля планов материалов (materials.py) в виде массивов, индексируемых кодом материала."""
+    plans = list(material_plans(config).values())
+    return {name: np.array([getattr(plan, name) for plan in plans]) for name in MaterialPlan.__slots__
+            if name not in ("name", "code")}
+
+
+def compute_arrays(width, height, steps, code, has_platform, platform_depth,
+                   reinforcements, paint_consumption, config) -> dict:
+    """Векторная версия calculate_metal над массивами параметров (code - коды материалов MATERIAL_CODES)."""
+    profile_thickness = config['PROFILE_THICKNESS']
+    pvl_depth = config['PVL_DEPTH']
+    # Поля плана материала для каждого набора
+    plan = {name: column[code] for name, column in plan_columns(config).items()}
+    single = steps == 1
+    first_only = plan['split_first'] & single  # Одна ступень с особым покрытием первой ступени
+
+    # Глубина ступени в зависимости от материала
+    step_depth = plan['step_depth']
+    step_height = height / steps
+
+    # Высота каркаса с учетом занижения под покрытие
+    frame_height = np.where(first_only, height - plan['first_reduction'], height - plan['reduction'])
+    frame_height = np.where(plan['split_first'] & ~single,
+                            height - ((plan['reduction'] * (steps - 1) + plan['first_reduction']) / steps),
+                            frame_height)
+    step_frame_height = step_height - np.where(first_only, plan['first_reduction'], plan['reduction'])
+    board_elevation = np.where(first_only, plan['first_board_elevation'], plan['board_elevation'])
+
+    # 1. Основание
+    base_length = 2 * width + (2 * step_depth * steps - 4 * profile_thickness)
+
+    # 2. Профили для ступеней: все рамы одинаковые, кроме последней при наличии платформы
+    frame_standard = 2 * width + (2 * step_depth - 4 * profile_thickness)
+    last_depth = np.where(has_platform, platform_depth, step_depth)
+    frame_last = 2 * width + (2 * last_depth - 4 * profile_thickness)
+
+    # 4.1-4.3 Усиления
+    front = step_frame_height - 2 * profile_thickness
+    back = (step_height * steps - plan['back_reduction']) - 2 * profile_thickness
+    internal = INTERNAL_REINFORCEMENT * (steps - 1)
+
+    # Пошаговые суммы (стойки, рамы, усиления глубины) считаются последовательным сложением, как в
+    # исходных циклах, по группам наборов с числом ступеней до одной степени двойки
+    per_step = {
+        "reduction": plan['reduction'], "first_reduction": plan['first_reduction'],
+        "boards": plan['boards'], "first_boards": plan['first_boards'], "reinforcements": reinforcements, "has_platform": has_platform,
+        "platform_depth": platform_depth, "step_height": step_height, "step_depth": step_depth,
+        "step_frame_height": step_frame_height, "frame_standard": frame_standard, "frame_last": frame_last, "steps": steps,
+    }
+    sums = {name: np.zeros(len(steps)) for name in ("steps_total", "stands", "depth")}
+    groups = {}
+    for s in np.unique(steps).tolist():
+        groups.setdefault(1 << (s - 1).bit_length(), []).append(s)
+    for size, counts in groups.items():
+        _accumulate_steps(np.flatnonzero(np.isin(steps, counts)), size, per_step, sums, profile_thickness)
+    steps_total, stands, depth_total = sums["steps_total"], sums["stands"], sums["depth"]
+
+    total_reinforcements = (front + back + internal) * reinforcements + depth_total
+    total_length = base_length + steps_total + stands + total_reinforcements + STRIP_LENGTH * STRIPS_COUNT
+
+    # Покраска
+    frame_paint_area = (PROFILE_PERIMETER * (base_length + steps_total + stands + total_reinforcements)) / 1000000
+    frame_paint_area = frame_paint_area + STRIP_PAINT_AREA
+    pvl_paint_area = np.where(plan['painted_first'], (width * pvl_depth / 1000000) * 2, 0.0)
+    pvl_paint_area = np.where(plan['painted_all'], (width * pvl_depth * steps / 1000000) * 2, pvl_paint_area)
+    frame_paint_weight = frame_paint_area * paint_consumption
+    pvl_paint_weight = pvl_paint_area * paint_consumption
+
+    # Доска ДПК и крепеж
+    board_steps = np.where(plan['has_boards'], steps - plan['bare_steps'], 0)
+    dpk_length = np.where(plan['has_boards'], width * board_steps * plan['boards_per_step'], 0.0)
+    bolts = plan['bolts_per_step'] * (steps - plan['unbolted_steps'])
+
+    return {
+        "step_depth": step_depth,
+        "step_height": step_height,
+        "frame_height": frame_height,
+        "step_frame_height": step_frame_height,
+        "board_elevation": board_elevation,
+        "base_length": base_length,
+        "frame_standard": frame_standard,
+        "frame_last": frame_last,
+        "steps_total": steps_total,
+        "stands": stands,
+        "front": front * reinforcements,
+        "back": back * reinforcements,
+        "internal": internal * reinforcements,
+        "depth": depth_total,
+        "reinforcements_total": total_reinforcements,
+        "total_length": total_length,
+        "frame_paint_area": frame_paint_area,
+        "frame_paint_weight": frame_paint_weight,
+        "pvl_paint_area": pvl_paint_area,
+        "pvl_paint_weight": pvl_paint_weight,
+        "total_paint_area": frame_paint_area + pvl_paint_area,
+        "total_paint_weight": frame_paint_weight + pvl_paint_weight,
+        "dpk_length": dpk_length,
+        "dpk_boards": plan['boards_per_step'] * board_steps,
+        "bolts": bolts,
+    }
+
+
+def _accumulate_steps(idx: np.ndarray, size: int, ns: dict, sums: dict, profile_thickness: float) -> None:
+    """Заполняет пошаговые суммы для наборов idx, у которых не больше size ступеней.
+
+    Строки дополняются до size слагаемыми -0.0: прибавление -0.0 не меняет сумму, поэтому
+    результат совпадает с последовательным сложением по ступеням набора.
+    """
+    steps = ns['steps'][idx][:, None]
+    column = np.arange(size)
+    first = column == 0
+    last = column == steps - 1
+    inside = column < steps
+    reinforcements = ns['reinforcements'][idx][:, None]
+    has_platform = ns['has_platform'][idx][:, None]
+    step_height = ns['step_height'][idx][:, None]
+    step_depth = ns['step_depth'][idx][:, None]
+
+    # Рамы ступеней
+    frames = np.where(last & has_platform, ns['frame_last'][idx][:, None], ns['frame_standard'][idx][:, None])
+    sums['steps_total'][idx] = np.cumsum(np.where(inside, frames, -0.0), axis=1)[:, -1]
+
+    # Вертикальные стойки
+    current_height = step_height * (column + 1)
+    # Занижение под покрытие: у первой ступени свое (у ДПК+1 ПВЛ - без занижения)
+    current_height = current_height - np.where(first, ns['first_reduction'][idx][:, None],
+                                               ns['reduction'][idx][:, None])
+    stand_height = current_height - 2 * profile_thickness
+    stands = np.where(last, 4 * stand_height, 2 * stand_height)
+    stands = np.cumsum(np.where(inside, stands, -0.0), axis=1)[:, -1]
+    # Одна ступень: стойки по высоте рамы ступени
+    sums['stands'][idx] = np.where(steps[:, 0] == 1, 4 * (ns['step_frame_height'][idx] - 2 * profile_thickness), stands)
+
+    # Усиления глубины
+    current_depth = np.where(last & has_platform, ns['platform_depth'][idx][:, None], step_depth)
+    useful_depth = current_depth - 2 * profile_thickness
+    needed = np.where(first, ns['first_boards'][idx][:, None], ns['boards'][idx][:, None])  # Под досками
+    depth = np.where(needed, reinforcements * useful_depth, 0.0)
+    sums['depth'][idx] = np.cumsum(np.where(inside, depth, -0.0), axis=1)[:, -1]
+
+
+def _layout(v: dict) -> dict:
+    """Раскладывает значения одного расчета по схеме ответа calculate_metal."""
+    return {
+        "base_frame": {"mm": v['base_mm'], "m": v['base_m']},
+        "steps_frames": {
+            "mm": v['frames_mm'],
+            "m": v['frames_m'],
+            "total_mm": v['steps_total_mm'],
+            "total_m": v['steps_total_m']
+        },
+        "vertical_stands": {"mm": v['stands_mm'], "m": v['stands_m']},
+        "reinforcements": {
+            "front": {"mm": v['front_mm'], "m": v['front_m']},
+            "back": {"mm": v['back_mm'], "m": v['back_m']},
+            "internal": {"mm": v['internal_mm'], "m": v['internal_m']},
+            "depth": {"mm": v['depth_mm'], "m": v['depth_m']},
+            "total": {"mm": v['reinforcements_total_mm'], "m": v['reinforcements_total_m']}
+        },
+        "total_length": {"mm": v['total_length_mm'], "m": v['total_length_m']},
+        "additional_materials": {
+            "dpk_length": v['dpk_length'],
+            "dpk_boards": v['dpk_boards'],
+            "dpk_color": v['dpk_color'],
+            "bolts_count": v['bolts'],
+            "nuts_count": v['bolts'],
+            "mounting_strips": {
+                "count": STRIPS_COUNT,
+                "size": f"{STRIP_LENGTH}x{STRIP_WIDTH}x{STRIP_THICKNESS}",
+                "total_length": STRIP_LENGTH * STRIPS_COUNT
+            }
+        },
+        "paint": {
+            "frame_area": v['frame_paint_area'],
+            "frame_weight": v['frame_paint_weight'],
+            "pvl_area": v['pvl_paint_area'],
+            "pvl_weight": v['pvl_paint_weight'],
+            "total_area": v['total_paint_area'],
+            "total_weight": v['total_paint_weight'],
+            "consumption": v['paint_consumption']
+        },
+        "dimensions": {
+            "width": v['width'],
+            "height": v['height'],
+            "step_height": v['step_height'],
+            "frame_height": v['frame_height'],
+            "step_frame_height": v['step_frame_height'],
+            "step_depth": v['step_depth'],
+            "profile_thickness": v['profile_thickness'],
+            "has_platform": v['has_platform'],
+            "platform_depth": v['platform_depth'],
+            "reinforcements_count": v['reinforcements_count'],
+            "material": v['material'],
+            "board_elevation": v['board_elevation'],
+            "frame_color": v['frame_color']
+        },
+        "structure": structure_layout(v)
+    }
+
+
+# Величины, которые в ответе представлены парой {"mm": round(x), "m": round(x / 1000, 2)}
+_LENGTHS = ("base_length", "frame_standard", "frame_last", "steps_total", "stands", "front",
+            "back", "internal", "depth", "reinforcements_total", "total_length")
+_LENGTH_NAMES = {"base_length": "base"}
+# Величины, округляемые до 2 знаков
+_PAINT = ("frame_paint_area", "frame_paint_weight", "pvl_paint_area", "pvl_paint_weight",
+          "total_paint_area", "total_paint_weight")
+# Величины, которые попадают в ответ без округления
+_RAW = ("step_height", "frame_height", "step_frame_height", "step_depth", "board_elevation",
+        "dpk_boards", "bolts")
+# Исходные параметры, которые повторяются в ответе как есть
+_ECHO = ("width", "height", "has_platform", "platform_depth", "reinforcements_count",
+         "paint_consumption", "material", "frame_color")
+
+
+def _rounded(columns: dict) -> dict:
+    """Округляет массивы по правилам ответа calculate_metal и переводит их в списки Python."""
+    out = {}
+    for name in _LENGTHS:
+        values = columns[name].astype(np.float64)
+        key = _LENGTH_NAMES.get(name, name)
+        out[key + "_mm"] = np.rint(values).astype(np.int64).tolist()
+        out[key + "_m"] = round2(values / 1000).tolist()
+    for name in _PAINT:
+        out[name] = round2(columns[name]).tolist()
+    for name in _RAW:
+        out[name] = columns[name].tolist()
+    out["dpk_length"] = round2(columns["dpk_length"] / 1000).tolist()
+    for name in (*STRUCTURE_COLUMNS, "utilization"):
+        out[f"structure_{name}"] = round2(columns[f"structure_{name}"].astype(np.float64)).tolist()
+    out["structure_ok"] = (columns["structure_utilization"] <= 1).tolist()
+    out["structure_reinforcements_required"] = [required or None for required in
+                                                columns["structure_reinforcements_required"].tolist()]
+    return out
+
+
+def _item_values(params: Sequence[CalcParams], columns: dict, config) -> dict:
+    """Готовит по одному списку значений (объектов Python) на каждое поле ответа."""
+    v = _rounded(columns)
+    p = _transpose(params)
+    for name in _ECHO:
+        v[name] = list(p[name])
+    v['profile_thickness'] = [config['PROFILE_THICKNESS']] * len(params)
+    plans = material_plans(config)
+    v['dpk_color'] = [DPK_COLORS.get(color, 'Венге') if plans[material].has_boards else None
+                      for material, color in zip(p['material'], p['frame_color'])]
+    # Без окрашиваемого покрытия площадь ПВЛ в исходной функции остается целым нулем
+    v['pvl_paint_area'] = [area if plans[material].has_painted else 0
+                           for material, area in zip(p['material'], v['pvl_paint_area'])]
+    v['frames_mm'] = [[a] * (s - 1) + [b] for s, a, b in zip(p['steps'], v['frame_standard_mm'], v['frame_last_mm'])]
+    v['frames_m'] = [[a] * (s - 1) + [b] for s, a, b in zip(p['steps'], v['frame_standard_m'], v['frame_last_m'])]
+    return v
+
+
+def build_results(params: Sequence[CalcParams], columns: dict, config) -> list:
+    """Собирает словари результатов в той же схеме, что и calculate_metal."""
+    v = _item_values(params, columns, config)
+    names = list(v)
+    return [_layout(dict(zip(names, row))) for row in zip(*(v[name] for name in names))]
+
+
+def _json_template() -> tuple:
+    """Шаблон компактного JSON одного результата (ключи отсортированы, как в jsonify).
+
+    Возвращает постоянные куски текста и имена полей между ними: len(pieces) == len(names) + 1.
+    """
+    sentinel = "@@{}@@"
+    names = []
+    skeleton = _layout(_SentinelValues(sentinel))
+    text = json.dumps(skeleton, sort_keys=True, separators=(',', ':'))
+    # Разрезаем текст по меткам в порядке их появления
+    parts = text.split('"@@')
+    pieces = [parts[0]]
+    for part in parts[1:]:
+        name, rest = part.split('@@"', 1)
+        names.append(name)
+        pieces.append(rest)
+    return tuple(pieces), tuple(names)
+
+
+class _SentinelValues(dict):
+    """Подставляет вместо каждого поля метку с его именем."""
+
+    def __init__(self, sentinel: str):
+        super().__init__()
+        self.sentinel = sentinel
+
+    def __missing__(self, key):
+        return self.sentinel.format(key)
+
+
+_TEMPLATE_PIECES, _TEMPLATE_FIELDS = _json_template()
+
+# JSON-запись по столбцам: значения одного поля всех наборов - строки матрицы байтов (набор, ширина),
+# выровненные влево и дополненные нулевыми байтами. Матрицы полей записываются в текст между кусками
+# шаблона, и одна операция отбрасывает нулевые байты (в JSON их нет) - получается текст всех
+# результатов без строки Python и форматирования числа на каждое значение.
+_GROUP = 10 ** 4
+# Четырехбайтовые записи групп цифр 0..9999: без ведущих нулей и выровненная вправо (старшая группа),
+# с ведущими нулями (остальные группы) и пустая (группы левее старшей). Цифры числа прижаты к концу
+# записи, поэтому столбец обрезается слева по самому длинному числу
+_WORDS = np.array([str(k).encode().rjust(4, b'\0') for k in range(_GROUP)] + [b'%04d' % k for k in range(_GROUP)]
+                  + [b''], dtype='S4').view(np.uint32)
+_EMPTY_WORD = 2 * _GROUP
+# Дробные части чисел, кратных сотой, в записи repr: .0, .01, ..., .1, ..., .99
+_HUNDREDTHS = np.array([b'.0'] + [('.%02d' % k).rstrip('0').encode() for k in range(1, 100)], dtype='S4').view(np.uint32)
+_TEMPLATE_BYTES = [np.frombuffer(piece.encode(), dtype=np.uint8) for piece in _TEMPLATE_PIECES]
+_OPEN_LIST, _CLOSE_LIST = np.frombuffer(b'[', dtype=np.uint8), np.frombuffer(b']', dtype=np.uint8)
+_RENDER_BYTES = 2 ** 19  # Размер порции текста при склейке
+_FRAMES_MAX_STEPS = 100  # Наборы с большим числом ступеней (длинный список рам) записываются через json.dumps
+
+
+def _bytes_matrix(texts: list) -> np.ndarray:
+    """Матрица байтов для списка строк ASCII."""
+    array = np.array([text.encode() for text in texts], dtype=bytes)
+    return array.view(np.uint8).reshape(len(texts), array.itemsize)
+
+
+def _write_digits(k: np.ndarray, words: np.ndarray) -> None:
+    """Пишет десятичную запись неотрицательных целых k без ведущих нулей в words (форма k.shape + (группы,))."""
+    levels = words.shape[-1]
+    high = k
+    for level in range(levels):
+        value = high
+        if level + 1 < levels:
+            high = value // _GROUP
+            # Под старшей группой пишется с ведущими нулями
+            index = value - high * _GROUP + (high > 0) * _GROUP
+        else:
+            index = value
+        if level:
+            index = np.where(value > 0, index, _EMPTY_WORD)
+        words[..., levels - 1 - level] = _WORDS[index]
+
+
+def _number_cells(ints: list, floats: list) -> list:
+    """Записи столбцов целых (ints) и дробных (floats) чисел, совпадающие с repr(), за один проход.
+
+    Числа, равные k / 100 (округленные до сотых величины, целые и почти все исходные параметры),
+    собираются из знака, групп цифр целой части и готовой дробной части; остальные записываются
+    через repr(), по одному вызову на каждое различное значение. Для каждого столбца возвращает
+    список матриц, которые пишутся подряд: запись и, если в столбце есть неточные значения, их запись repr.
+    """
+    n = len((ints or floats)[0])
+    count = len(ints)
+    values = np.array(floats, dtype=np.float64).reshape(len(floats), n)
+    scaled = np.rint(values * 100)
+    exact = (scaled / 100 == values) & (np.abs(scaled) < 1e15)  # Дальше repr может перейти к записи с порядком
+    hundredths = np.where(exact, np.abs(scaled), 0).astype(np.int64)
+    whole = np.empty((count + len(floats), n), dtype=np.int64)
+    negative = np.empty(whole.shape, dtype=bool)
+    numbers = np.array(ints, dtype=np.int64).reshape(count, n)
+    np.abs(numbers, out=whole[:count])
+    np.less(numbers, 0, out=negative[:count])
+    np.floor_divide(hundredths, 100, out=whole[count:])
+    np.logical_and(exact, np.signbit(values), out=negative[count:])
+    fractions = _HUNDREDTHS[hundredths - whole[count:] * 100]
+    # Ширина дробной части столбца: .d или .dd
+    fraction_widths = (2 + (hundredths % 10 != 0).any(axis=1)).tolist()
+    digits = [len(str(high)) for high in whole.max(axis=1, initial=0).tolist()]
+    minus = negative.any(axis=1).tolist()
+    sizes = [(size + 3) // 4 for size in digits]
+    out, written = [None] * len(digits), [None] * len(digits)
+    # Столбцы с одинаковым числом групп цифр записываются вместе: слова записи - пустое (для знака),
+    # группы цифр, дробная часть
+    for levels in sorted(set(sizes)):
+        rows = [j for j, size in enumerate(sizes) if size == levels]
+        split = sum(j < count for j in rows)
+        cells = np.empty((len(rows), n, levels + 2), dtype=np.uint32)
+        cells[..., 0] = 0
+        _write_digits(whole if len(rows) == len(digits) else whole[rows], cells[..., 1:levels + 1])
+        cells[split:, :, -1] = fractions if len(rows) == len(digits) else fractions[[j - count for j in rows[split:]]]
+        text = cells.view(np.uint8)
+        end = 4 * (levels + 1)
+        for i, j in enumerate(rows):
+            # Столбец обрезается по самому длинному числу; знак пишется в байт перед цифрами
+            start = end - digits[j] - minus[j]
+            if minus[j]:
+                text[i, :, start] = negative[j] * ord('-')
+            written[j] = text[i]
+            out[j] = [text[i, :, start:end if j < count else end + fraction_widths[j - count]]]
+    for j in np.flatnonzero(~exact.all(axis=1)).tolist():
+        inexact = ~exact[j]
+        written[count + j][inexact] = 0
+        distinct, inverse = np.unique(values[j][inexact].view(np.int64), return_inverse=True)
+        texts = _bytes_matrix([repr(value) for value in distinct.view(np.float64).tolist()])
+        other = np.zeros((n, texts.shape[1]), dtype=np.uint8)
+        other[inexact] = texts[inverse.reshape(-1)]
+        out[count + j].append(other)
+    return out
+
+
+def _encoded_codes(values: Sequence) -> tuple:
+    """Коды значений и различные значения в порядке кодов (True и 1 - разные значения).
+
+    Для нехешируемых значений вместо кодов возвращается None, а значения - все по порядку.
+    """
+    if _is_type(values, frozenset((bool,))) is True:
+        return np.array(values, dtype=np.intp), [False, True]
+    keys = values if _is_type(values, frozenset((str,))) is True else list(zip(map(type, values), values))
+    try:
+        index = dict.fromkeys(keys)
+    except TypeError:
+        return None, list(values)
+    distinct = list(index)
+    index.update(zip(distinct, range(len(distinct))))
+    codes = np.fromiter(map(index.__getitem__, keys), dtype=np.intp, count=len(keys))
+    return codes, distinct if keys is values else [value for _, value in distinct]
+
+
+def _encoded_matrix(codes: Optional[np.ndarray], distinct: list, encode=json.dumps) -> np.ndarray:
+    """Запись значений по результату _encoded_codes; encode вызывается один раз на каждое различное значение."""
+    texts = _bytes_matrix([encode(value) for value in distinct])
+    return texts if codes is None else texts[codes]
+
+
+def _replace_rows(blocks: list, rows: np.ndarray, text: str) -> list:
+    """Заменяет запись значения в строках rows на text (в этих строках значение записано первой матрицей)."""
+    if not rows.any():
+        return blocks
+    matrix = blocks[0]
+    result = np.zeros((len(matrix), max(matrix.shape[1], len(text))), dtype=np.uint8)
+    result[:, :matrix.shape[1]] = matrix
+    result[rows] = 0
+    result[rows, :len(text)] = np.frombuffer(text.encode(), dtype=np.uint8)
+    return [result, *blocks[1:]]
+
+
+def _frames_blocks(steps: np.ndarray, standard: list, last: list) -> list:
+    """Запись списков рам: steps - 1 раз standard и last."""
+    n = len(steps)
+    repeat = int(steps.max(initial=1)) - 1
+    item = np.hstack([*standard, np.full((n, 1), ord(','), dtype=np.uint8)])
+    frames = np.tile(item, (1, repeat))
+    # Лишние повторы обнуляются умножением на маску
+    frames *= np.arange(frames.shape[1]) < ((steps - 1) * item.shape[1])[:, None]
+    return [_OPEN_LIST, frames, *last, _CLOSE_LIST]
+
+
+def _json_matrices(params: Sequence[CalcParams], columns: dict, config) -> dict:
+    """Матрицы JSON-записи каждого поля ответа (по правилам округления _rounded): поле -> список матриц."""
+    n = len(params)
+    p = _transpose(params)
+    ints, floats, rounded = {}, {}, {}
+    for name in _LENGTHS:
+        values = columns[name].astype(np.float64)
+        key = _LENGTH_NAMES.get(name, name)
+        ints[key + "_mm"] = np.rint(values)
+        rounded[key + "_m"] = values / 1000
+    for name in _PAINT:
+        rounded[name] = columns[name]
+    for name in _RAW:
+        values = columns[name]
+        (ints if values.dtype.kind in 'iu' else floats)[name] = values
+    rounded["dpk_length"] = columns["dpk_length"] / 1000
+    for name in (*STRUCTURE_COLUMNS, "utilization"):
+        rounded[f"structure_{name}"] = columns[f"structure_{name}"]
+    # Все округляемые величины - одним вызовом
+    floats.update(zip(rounded, round2(np.array(list(rounded.values()), dtype=np.float64))))
+    required = columns["structure_reinforcements_required"]
+    ints["structure_reinforcements_required"] = required
+    a = _param_arrays(params)
+    ints["reinforcements_count"] = a['reinforcements_count']
+    for name in ("width", "height", "paint_consumption", "platform_depth"):
+        floats[name] = a[name]
+    out = dict(zip([*ints, *floats], _number_cells(list(ints.values()), list(floats.values()))))
+
+    out["structure_ok"] = [_bytes_matrix(["false", "true"])[(columns["structure_utilization"] <= 1).astype(np.intp)]]
+    out["structure_reinforcements_required"] = _replace_rows(out["structure_reinforcements_required"], required == 0, "null")
+    steps = a['steps']
+    out["frames_mm"] = _frames_blocks(steps, out["frame_standard_mm"], out["frame_last_mm"])
+    out["frames_m"] = _frames_blocks(steps, out["frame_standard_m"], out["frame_last_m"])
+    code = a['code']
+    plan = plan_columns(config)
+    # Без окрашиваемого покрытия площадь ПВЛ в исходной функции остается целым нулем
+    out["pvl_paint_area"] = _replace_rows(out["pvl_paint_area"], ~plan['has_painted'][code], "0")
+    # Без платформы глубина повторяется целым нулем
+    out["platform_depth"] = _replace_rows(out["platform_depth"], np.fromiter(
+        (type(depth) is int for depth in p['platform_depth']), dtype=bool, count=n), "0")
+    thickness = str(config['PROFILE_THICKNESS'])
+    out["profile_thickness"] = [np.frombuffer(thickness.encode(), dtype=np.uint8)]
+    out["has_platform"] = [_encoded_matrix(*_encoded_codes(p['has_platform']))]
+    out["material"] = [_encoded_matrix(code, list(MATERIAL_CODES))]
+    colors = _encoded_codes(p['frame_color'])
+    out["frame_color"] = [_encoded_matrix(*colors)]
+    out["dpk_color"] = _replace_rows([_encoded_matrix(*colors, lambda color: json.dumps(DPK_COLORS.get(color, 'Венге')))],
+                                     ~plan['has_boards'][code], "null")
+    return out
+
+
+def _render_parts(params: Sequence[CalcParams], columns: dict, config, separator: bytes) -> list:
+    """JSON-записи результатов, разделенные separator, частями текста (наборы не длиннее _FRAMES_MAX_STEPS)."""
+    v = _json_matrices(params, columns, config)
+    blocks = []
+    for piece, name in zip(_TEMPLATE_BYTES, _TEMPLATE_FIELDS):
+        blocks += [piece, *v[name]]
+    blocks += [_TEMPLATE_BYTES[-1], np.frombuffer(separator, dtype=np.uint8)]
+    widths = [block.shape[-1] for block in blocks]
+    # Текст собирается порциями, которые помещаются в кэш процессора
+    rows = max(1, _RENDER_BYTES // sum(widths))
+    starts = np.cumsum([0, *widths]).tolist()
+    # Куски шаблона одинаковы во всех строках и порциях: строка шаблона копируется в порцию один раз
+    template = np.zeros(sum(widths), dtype=np.uint8)
+    for block, start, end in zip(blocks, starts, starts[1:]):
+        if block.ndim == 1:
+            template[start:end] = block
+    text = np.empty((min(rows, len(params)), sum(widths)), dtype=np.uint8)
+    text[:] = template
+    parts = []
+    for first in range(0, len(params), rows):
+        chunk = text[:len(params) - first]
+        for block, start, end in zip(blocks, starts, starts[1:]):
+            if block.ndim == 2:
+                chunk[:, start:end] = block[first:first + rows]
+        parts.append(chunk.tobytes().translate(None, b'\0'))
+    parts[-1] = parts[-1][:-len(separator)]  # После последнего результата разделителя нет
+    return parts
+
+
+def render_results_json(params: Sequence[CalcParams], columns: dict, config) -> list:
+    """Сериализует результаты в JSON напрямую из массивов, минуя построение словарей.
+
+    Текст совпадает с json.dumps(..., sort_keys=True, separators=(',', ':')) результата calculate_metal.
+    Поля записываются по столбцам (_json_matrices) между кусками шаблона; результаты
+    разделены переводом строки, которого нет в компактном JSON.
+    """
+    n = len(params)
+    steps = np.array(_transpose(params)['steps'], dtype=np.int64)
+    long = steps > _FRAMES_MAX_STEPS
+    if long.any():
+        # Длинные списки рам раздули бы матрицу всего пакета: такие наборы записываются по одному
+        texts = [None] * n
+        for rows, render in ((np.flatnonzero(~long), render_results_json), (np.flatnonzero(long), _dumps_results)):
+            subset = [params[i] for i in rows.tolist()]
+            for i, text in zip(rows.tolist(), render(subset, {name: values[rows] for name, values in columns.items()}, config)):
+                texts[i] = text
+        return texts
+    if not n:
+        return []
+    return b''.join(_render_parts(params, columns, config, b'\n')).decode().split('\n')
+
+
+def _dumps_results(params: Sequence[CalcParams], columns: dict, config) -> list:
+    return [json.dumps(result, sort_keys=True, separators=(',', ':')) for result in build_results(params, columns, config)]
+
+
+# Обязательные параметры набора и типы значений JSON, которые разбираются по столбцам
+_REQUIRED = itemgetter('width', 'height', 'steps', 'material', 'has_platform')
+_NUMBER_TYPES = frozenset((int, float))
+
+
+def _is_type(values: Sequence, types: frozenset):
+    """Маска значений, тип которых входит в types (True, если подходят все значения)."""
+    if types.issuperset(map(type, values)):
+        return True
+    return np.fromiter(map(types.__contains__, map(type, values)), dtype=bool, count=len(values))
+
+
+def _simple_params(items: list, config) -> Optional[list]:
+    """Разбирает и проверяет наборы по столбцам: наборы, в которых все значения - числа, строки
+    и флаги JSON нужных типов, а проверки validate_input проходят.
+
+    Для каждого набора возвращает CalcParams (тот же, что дал бы parse_params) или None, если
+    набор нужно разобрать по одному (другие типы значений или ошибка); None вместо списка -
+    если по одному нужно разобрать весь пакет (не словарь или нет обязательного параметра).
+    """
+    try:
+        width, height, steps, material, has_platform = zip(*map(_REQUIRED, items))
+    except (KeyError, TypeError, ValueError):
+        return None
+    n = len(items)
+    depth = [item.get('platform_depth') for item in items]
+    reinforcements = [item.get('reinforcements_count', 1) for item in items]
+    paint = [item.get('paint_consumption', 110) for item in items]
+    color = [item.get('frame_color', 'RAL9005') for item in items]
+    flags = _is_type(has_platform, frozenset((bool,)))
+    simple = np.ones(n, dtype=bool)
+    # Отсутствующая глубина (None) допустима для наборов без платформы, для остальных ее отсекает isfinite
+    for values, types in ((width, _NUMBER_TYPES), (height, _NUMBER_TYPES), (paint, _NUMBER_TYPES),
+                          (depth, _NUMBER_TYPES | {type(None)}), (steps, frozenset((int,))),
+                          (reinforcements, frozenset((int,))), (material, frozenset((str,)))):
+        simple &= _is_type(values, types)
+    simple &= flags
+    if flags is True:
+        platform = np.array(has_platform, dtype=bool)
+    else:
+        platform = np.zeros(n, dtype=bool)
+        platform[flags] = np.array(has_platform, dtype=object)[flags].astype(bool)
+    try:
+        # Значения наборов, которые разбираются по одному, заменяются нулями
+        columns = [np.array(values if simple.all() else [value if ok else 0 for value, ok in zip(values, simple.tolist())],
+                            dtype=dtype)
+                   for values, dtype in ((width, np.float64), (height, np.float64), (steps, np.int64),
+                                         (reinforcements, np.int64), (paint, np.float64), (depth, np.float64))]
+    except OverflowError:  # Числа вне диапазона float64 и int64
+        return None
+    w, h, s, r, c, d = columns
+    valid = (simple & (config['MIN_WIDTH'] <= w) & (w <= config['MAX_WIDTH'])
+             & (config['MIN_HEIGHT'] <= h) & (h <= config['MAX_HEIGHT']) & (s >= 1) & (s <= MAX_COUNT)
+             & (np.abs(r) <= MAX_COUNT) & (~platform | np.isfinite(d)) & np.isfinite(c)
+             & np.fromiter(map(MATERIAL_CODES.__contains__, material), dtype=bool, count=n))
+    # Без платформы глубина - целый ноль, как в parse_params
+    depth = [value if flag else 0 for value, flag in zip(d.tolist(), platform.tolist())]
+    values = (w.tolist(), h.tolist(), steps, material, has_platform, depth, reinforcements, c.tolist(), color)
+    params = map(tuple.__new__, repeat(CalcParams), zip(*values))
+    if valid.all():
+        arrays = {"width": w, "height": h, "steps": s, "platform_depth": np.where(platform, d, 0.0),
+                  "reinforcements_count": r, "paint_consumption": c, "has_platform": platform,
+                  "code": np.fromiter(map(MATERIAL_CODES.__getitem__, material), dtype=np.intp, count=n)}
+        return _ParsedParams(params, dict(zip(CalcParams._fields, values)), arrays)
+    return [p if ok else None for p, ok in zip(params, valid.tolist())]
+
+
+def _parse_item(item, config) -> tuple:
+    """Разбирает и проверяет один набор; возвращает (ошибка или None, CalcParams или None)."""
+    try:
+        if not isinstance(item, dict):
+            raise ValueError("Набор параметров должен быть объектом")
+        p = parse_params(item)
+    except (KeyError, ValueError, TypeError) as e:
+        return describe_parse_error(e), None
+    error = _validation_error(p, config)
+    return error, p if error is None else None
+
+
+def _parse_items(items: Iterable, config) -> tuple:
+    """Разбирает и проверяет наборы параметров.
+
+    Возвращает список ошибок (None для корректных наборов) и список корректных параметров.
+    """
+    items = list(items)
+    simple = _simple_params(items, config)
+    if simple is None:
+        simple = [None] * len(items)
+    elif None not in simple:
+        return [None] * len(items), simple
+    errors = []
+    valid = []
+    for item, p in zip(items, simple):
+        error = None
+        if p is None:
+            error, p = _parse_item(item, config)
+        errors.append(error)
+        if p is not None:
+            valid.append(p)
+    return errors, valid
+
+
+def calculate_metal_batch(items: Iterable, config) -> list:
+    """Рассчитывает список наборов параметров за один проход.
+
+    Каждый элемент результата - словарь в схеме calculate_metal
+    или {"error": "..."} для некорректного набора.
+    """
+    errors, valid = _parse_items(items, config)
+    computed = iter(build_results(valid, compute_columns(valid, config), config) if valid else ())
+    return [next(computed) if error is None else {"error": error} for error in errors]
+
+
+def calculate_items_json(items: Iterable, config) -> list:
+    """Для каждого набора возвращает пару (ошибка, JSON результата); одно из значений - None."""
+    errors, valid = _parse_items(items, config)
+    computed = iter(render_results_json(valid, compute_columns(valid, config), config) if valid else ())
+    return [(None, next(computed)) if error is None else (error, None) for error in errors]
+
+
+def calculate_metal_batch_json(items: Iterable, config) -> bytes:
+    """То же, что calculate_metal_batch, но сразу возвращает тело ответа API в JSON."""
+    errors, valid = _parse_items(items, config)
+    columns = compute_columns(valid, config) if valid else None
+    if valid and len(valid) == len(errors) and _param_arrays(valid)['steps'].max() <= _FRAMES_MAX_STEPS:
+        # Все наборы корректны: результаты сразу записываются через запятую, без разбиения на строки
+        return b''.join([b'{"errors":0,"results":[', *_render_parts(valid, columns, config, b','), b']}'])
+    computed = iter(render_results_json(valid, columns, config) if valid else ())
+    parts = [next(computed) if error is None else json.dumps({"error": error}) for error in errors]
+    return f'{{"errors":{len(errors) - len(valid)},"results":[{",".join(parts)}]}}'.encode()
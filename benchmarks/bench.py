@@ -0,0 +1,169 @@
+"""Бенчмарки calculate_metal, пакетного движка и API через тестовый клиент Flask.
+
+Запуск из корня проекта:
+    python benchmarks/bench.py                                  # вывод результатов
+    python benchmarks/bench.py --save benchmarks/baseline.json  # сохранить базовую линию
+    python benchmarks/bench.py --compare benchmarks/baseline.json --threshold 0.2
+
+При сравнении бенчмарк, ставший медленнее базовой линии больше чем на threshold,
+считается регрессией, и скрипт завершается с кодом 1.
+"""
+import argparse  # Для разбора аргументов командной строки
+import json  # Для сохранения и чтения базовых линий
+import os  # Для работы с путями
+import platform  # Для описания окружения
+import statistics  # Для медианы
+import sys  # Для кода завершения и пути импорта
+import time  # Для измерения времени
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Запросы бенчмарка не должны попадать в историю расчетов
+os.environ.setdefault('QUOTES_ENABLED', '0')
+
+MATERIALS = ("ПВЛ", "ДПК", "ДПК+1 ПВЛ")
+STEPS = (1, 5, 10, 20)
+
+
+def measure(func, number: int, repeat: int) -> dict:
+    """Время одного вызова func в микросекундах: минимум и медиана по repeat сериям из number вызовов."""
+    func()  # Прогрев
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - started) / number * 1e6)
+    return {"value": min(rounds), "median": statistics.median(rounds), "unit": "us", "better": "lower"}
+
+
+def micro_benchmarks(number: int, repeat: int) -> dict:
+    """calculate_metal по материалам и количеству ступеней и пакетный движок."""
+    from app import app, calculate_metal
+    from batch import calculate_metal_batch_json
+
+    results = {}
+    for material in MATERIALS:
+        for steps in STEPS:
+            height = min(170 * steps, app.config['MAX_HEIGHT'])
+            results[f"calc/{material}/steps={steps}"] = measure(
+                lambda: calculate_metal(1000, height, steps, material, True, 900, 2), number, repeat)
+
+    items = [{"width": 600 + i, "height": 1700, "steps": 1 + i % 20, "material": MATERIALS[i % 3],
+              "has_platform": i % 2 == 0, "platform_depth": 900} for i in range(1000)]
+    batch = measure(lambda: calculate_metal_batch_json(items, app.config), max(1, number // 100), repeat)
+    results["batch/per_item"] = dict(batch, value=batch["value"] / len(items), median=batch["median"] / len(items))
+    return results
+
+
+def request_benchmarks(number: int, repeat: int) -> dict:
+    """Полный цикл запроса через тестовый клиент Flask (разбор, расчет, сериализация, хуки)."""
+    from app import app
+
+    client = app.test_client()
+    payload = {"width": 1000, "height": 1700, "steps": 10, "material": "ДПК", "has_platform": True,
+               "platform_depth": 900, "reinforcements_count": 2}
+    results = {}
+
+    enabled = app.config['CACHE_ENABLED']
+    app.config['CACHE_ENABLED'] = False
+    try:
+        results["http/calculate/uncached"] = measure(
+            lambda: client.post('/api/calculate', json=payload), number, repeat)
+    finally:
+        app.config['CACHE_ENABLED'] = enabled
+    results["http/calculate/cached"] = measure(lambda: client.post('/api/calculate', json=payload), number, repeat)
+    results["http/price"] = measure(lambda: client.post('/api/price', json=payload), number, repeat)
+    items = [dict(payload, width=600 + i) for i in range(100)]
+    results["http/calculate_batch/100"] = measure(
+        lambda: client.post('/api/calculate/batch', json=items), max(1, number // 10), repeat)
+    return results
+
+
+def environment() -> dict:
+    """Описание окружения, в котором получены результаты."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Сравнивает результаты с базовой линией; возвращает список регрессий (имя, базовое, текущее, отношение)."""
+    regressions = []
+    for name, result in sorted(current.items()):
+        base = baseline.get(name)
+        if base is None or not base["value"] or not result["value"]:
+            continue
+        if result.get("better", "lower") == "lower":
+            ratio = result["value"] / base["value"]
+        else:
+            ratio = base["value"] / result["value"]
+        if ratio > 1 + threshold:
+            regressions.append((name, base["value"], result["value"], ratio))
+    return regressions
+
+
+def report(results: dict, baseline: dict = None) -> None:
+    """Печатает таблицу результатов (и отношение к базовой линии, если она задана)."""
+    for name, result in sorted(results.items()):
+        line = f"{name:40} {result['value']:12.2f} {result['unit']}"
+        if baseline and name in baseline and baseline[name]["value"]:
+            line += f"  x{result['value'] / baseline[name]['value']:.2f} от базовой линии"
+        print(line)
+
+
+def load_results(path: str) -> dict:
+    """Читает файл результатов."""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)["results"]
+
+
+def save_results(path: str, results: dict) -> None:
+    """Сохраняет результаты вместе с описанием окружения."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"environment": environment(), "results": results}, f, ensure_ascii=False, indent=2)
+
+
+def finish(results: dict, args) -> int:
+    """Общая часть bench.py и load.py: вывод, сохранение и сравнение с базовой линией."""
+    baseline = load_results(args.compare) if args.compare else None
+    report(results, baseline)
+    if args.save:
+        save_results(args.save, results)
+        print(f"Результаты сохранены в {args.save}")
+    if baseline is None:
+        return 0
+    regressions = compare(results, baseline, args.threshold)
+    for name, base, value, ratio in regressions:
+        print(f"РЕГРЕССИЯ {name}: {base:.2f} -> {value:.2f} (x{ratio:.2f})")
+    return 1 if regressions else 0
+
+
+def add_common_arguments(parser: argparse.ArgumentParser) -> None:
+    """Аргументы сохранения и сравнения результатов."""
+    parser.add_argument('--save', help="Сохранить результаты в JSON-файл")
+    parser.add_argument('--compare', help="Сравнить с базовой линией из JSON-файла")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Допустимое замедление (0.2 = 20%%)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки calculate_metal и API")
+    parser.add_argument('--number', type=int, default=200, help="Вызовов в одной серии")
+    parser.add_argument('--repeat', type=int, default=5, help="Количество серий")
+    parser.add_argument('--only', choices=('micro', 'http'), help="Запустить только одну группу")
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    results = {}
+    if args.only in (None, 'micro'):
+        results.update(micro_benchmarks(args.number, args.repeat))
+    if args.only in (None, 'http'):
+        results.update(request_benchmarks(args.number, args.repeat))
+    return finish(results, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""Нагрузочный тест API под gunicorn.
+
+Запуск из корня проекта:
+    python benchmarks/load.py --workers 4 --concurrency 16 --duration 20
+    python benchmarks/load.py --url http://127.0.0.1:5000 --concurrency 8   # уже запущенный сервер
+    python benchmarks/load.py --save benchmarks/load_baseline.json
+    python benchmarks/load.py --compare benchmarks/load_baseline.json
+
+Наборы параметров генерируются из --seed, поэтому нагрузка воспроизводима. Доля повторяющихся
+наборов (--repeat-share) задает, сколько запросов может обслуживаться кэшем.
+"""
+import argparse  # Для разбора аргументов командной строки
+import http.client  # HTTP-клиент без сторонних зависимостей
+import json  # Для тел запросов
+import os  # Для работы с путями
+import random  # Для воспроизводимой генерации параметров
+import socket  # Для ожидания запуска сервера
+import subprocess  # Для запуска gunicorn
+import sys  # Для кода завершения и пути импорта
+import threading  # Для параллельных клиентов
+import time  # Для измерения времени
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench import add_common_arguments, finish  # Общая работа с базовыми линиями
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MATERIALS = ("ПВЛ", "ДПК", "ДПК+1 ПВЛ")
+
+
+def make_payloads(count: int, seed: int, repeat_share: float) -> list:
+    """Воспроизводимый набор тел запросов /api/calculate."""
+    rng = random.Random(seed)
+    hot = [None] * 20  # Популярные наборы, которые повторяются
+    payloads = []
+    for i in range(count):
+        if rng.random() < repeat_share and hot[i % len(hot)] is not None:
+            payloads.append(hot[i % len(hot)])
+            continue
+        steps = rng.randint(1, 15)
+        has_platform = rng.random() < 0.3
+        body = json.dumps({
+            "width": rng.randrange(600, 2000, 10),
+            "height": rng.randrange(max(110 * steps, 200), min(300 * steps, 3400) + 1, 10),
+            "steps": steps,
+            "material": rng.choice(MATERIALS),
+            "has_platform": has_platform,
+            "platform_depth": rng.choice((600, 900, 1200)) if has_platform else 0,
+            "reinforcements_count": rng.randint(1, 3),
+        }).encode()
+        hot[i % len(hot)] = body
+        payloads.append(body)
+    return payloads
+
+
+def start_gunicorn(port: int, workers: int) -> subprocess.Popen:
+    """Запускает приложение под gunicorn и ждет, пока порт начнет принимать соединения."""
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', 'app:app'],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env=dict(os.environ, QUOTES_ENABLED='0'))  # Нагрузка не попадает в историю расчетов
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn завершился при запуске (установлен ли он?)")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("gunicorn не начал принимать соединения за 30 секунд")
+
+
+def client(host: str, port: int, path: str, payloads: list, offset: int, stop_at: float,
+           latencies: list, errors: list) -> None:
+    """Один клиент: отправляет запросы по очереди до истечения времени."""
+    connection = None
+    i = offset
+    while time.monotonic() < stop_at:
+        body = payloads[i % len(payloads)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            if connection is None:
+                connection = http.client.HTTPConnection(host, port, timeout=10)
+            connection.request('POST', path, body, {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+            if response.getheader('Connection', '').lower() == 'close':
+                connection.close()
+                connection = None
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            connection = None
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+def percentile(values: list, share: float) -> float:
+    """Перцентиль отсортированного списка."""
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+def run_load(url: str, path: str, concurrency: int, duration: float, payloads: list) -> dict:
+    """Нагружает сервер concurrency клиентами в течение duration секунд."""
+    parts = urlsplit(url)
+    latencies, errors = [], []
+    stop_at = time.monotonic() + duration
+    threads = [threading.Thread(target=client, args=(parts.hostname, parts.port or 80, path, payloads,
+                                                     n * 7919, stop_at, latencies, errors))
+               for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    if not latencies:
+        raise RuntimeError(f"Нет успешных запросов, ошибки: {errors[:5]}")
+
+    def ms(value):
+        return {"value": value * 1000, "unit": "ms", "better": "lower"}
+
+    return {
+        "load/throughput": {"value": len(latencies) / elapsed, "unit": "req/s", "better": "higher"},
+        "load/p50": ms(percentile(latencies, 0.50)),
+        "load/p90": ms(percentile(latencies, 0.90)),
+        "load/p99": ms(percentile(latencies, 0.99)),
+        "load/errors": {"value": len(errors), "unit": "count", "better": "lower"},
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест API")
+    parser.add_argument('--url', help="Адрес уже запущенного сервера (по умолчанию запускается gunicorn)")
+    parser.add_argument('--workers', type=int, default=2, help="Воркеров gunicorn")
+    parser.add_argument('--port', type=int, default=5055, help="Порт для gunicorn")
+    parser.add_argument('--path', default='/api/calculate', help="Нагружаемый метод API")
+    parser.add_argument('--concurrency', type=int, default=8, help="Параллельных клиентов")
+    parser.add_argument('--duration', type=float, default=10, help="Длительность, секунды")
+    parser.add_argument('--seed', type=int, default=1, help="Начальное значение генератора параметров")
+    parser.add_argument('--repeat-share', type=float, default=0.5, help="Доля повторяющихся наборов (0..1)")
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    payloads = make_payloads(5000, args.seed, args.repeat_share)
+    process = None
+    url = args.url
+    if url is None:
+        process = start_gunicorn(args.port, args.workers)
+        url = f'http://127.0.0.1:{args.port}'
+    try:
+        results = run_load(url, args.path, args.concurrency, args.duration, payloads)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    return finish(results, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""Потоковый расчет файлов с наборами параметров (CSV или NDJSON).
+
+Конвейер из генераторов: построчное чтение -> разбор строки -> проверка и расчет небольшими
+порциями (пакетный движок, правила validate_input) -> сериализация. В памяти одновременно
+находится только текущая порция, поэтому потребление памяти не зависит от размера файла,
+а первые результаты отправляются сразу после расчета первой порции. Ошибка в строке
+возвращается в ответе для этой строки и не прерывает обработку файла.
+"""
+import csv  # Для разбора и формирования CSV
+import io  # Для формирования CSV в памяти
+import json  # Для разбора NDJSON и ошибок
+from typing import Iterable, Iterator, Optional
+
+from batch import calculate_items_json, calculate_metal_batch
+from params import parse_flag
+from price_grid import summarize
+
+FIRST_CHUNK = 16  # Первая порция маленькая, чтобы первые результаты пришли быстрее
+TOO_LONG = "Строка слишком длинная"
+CALCULATION_FAILED = "Ошибка расчета строки"
+
+NUMERIC_FIELDS = {"width", "height", "steps", "platform_depth", "reinforcements_count", "paint_consumption"}
+REQUIRED_FIELDS = ("width", "height", "steps", "material")
+
+# Столбцы CSV-ответа: номер строки, ошибка и ключевые величины расчета (как в /api/price)
+CSV_COLUMNS = (
+    "row", "error", "total_mm", "base_frame_mm", "steps_frames_mm", "vertical_stands_mm", "reinforcements_mm",
+    "frame_paint_area", "pvl_paint_area", "total_paint_area", "frame_paint_weight", "pvl_paint_weight",
+    "total_paint_weight", "dpk_length_m", "dpk_boards", "bolts_count",
+)
+
+
+def iter_lines(stream, max_length: int) -> Iterator[Optional[str]]:
+    """Читает двоичный поток построчно; вместо строки длиннее max_length байт выдает None."""
+    first = True
+    while True:
+        raw = stream.readline(max_length + 1)
+        if not raw:
+            return
+        if len(raw) > max_length and not raw.endswith(b'\n'):
+            # Пропускаем остаток слишком длинной строки, не загружая его в память
+            while raw and not raw.endswith(b'\n'):
+                raw = stream.readline(max_length + 1)
+            yield None
+            continue
+        text = raw.decode('utf-8-sig' if first else 'utf-8', errors='replace')
+        first = False
+        yield text.rstrip('\r\n')
+
+
+def ndjson_rows(lines: Iterable[Optional[str]]) -> Iterator[tuple]:
+    """Строки NDJSON -> (номер строки, набор параметров, ошибка). Пустые строки пропускаются."""
+    row = 0
+    for line in lines:
+        if line is not None and not line.strip():
+            continue
+        row += 1
+        if line is None:
+            yield row, None, TOO_LONG
+            continue
+        try:
+            yield row, json.loads(line), None
+        except ValueError:
+            yield row, None, "Некорректная строка JSON"
+
+
+def csv_rows(lines: Iterable[Optional[str]]) -> Iterator[tuple]:
+    """Строки CSV -> (номер строки, набор параметров, ошибка).
+
+    Заголовок читается сразу, поэтому ошибка в нем (ValueError) возникает до начала ответа.
+    Разделитель (запятая или точка с запятой) определяется по заголовку; при точке с запятой
+    в числах допускается десятичная запятая.
+    """
+    lines = iter(lines)
+    header = next((line for line in lines if line is None or line.strip()), None)
+    if header is None:
+        raise ValueError("Файл CSV пуст")
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    names = [name.strip().lower() for name in next(csv.reader([header], delimiter=delimiter))]
+    missing = [name for name in REQUIRED_FIELDS if name not in names]
+    if missing:
+        raise ValueError(f"В заголовке CSV нет столбцов: {', '.join(missing)}")
+    return _csv_items(lines, names, delimiter)
+
+
+def _csv_items(lines: Iterator[Optional[str]], names: list, delimiter: str) -> Iterator[tuple]:
+    row = 0
+    for line in lines:
+        if line is not None and not line.strip():
+            continue
+        row += 1
+        if line is None:
+            yield row, None, TOO_LONG
+            continue
+        values = next(csv.reader([line], delimiter=delimiter))
+        if len(values) > len(names):
+            yield row, None, "Значений больше, чем столбцов в заголовке"
+            continue
+        item, error = {}, None
+        for name, value in zip(names, values):
+            value = value.strip()
+            if not value:
+                continue  # Пустое значение - используется значение по умолчанию
+            if name == "has_platform":
+                try:
+                    item[name] = parse_flag(value)
+                except ValueError as e:
+                    error = str(e)
+                    break
+            elif name in NUMERIC_FIELDS and delimiter == ';':
+                item[name] = value.replace(',', '.')
+            else:
+                item[name] = value
+        item.setdefault("has_platform", False)
+        yield (row, None, error) if error else (row, item, None)
+
+
+def chunk_rows(rows: Iterable[tuple], chunk_size: int) -> Iterator[list]:
+    """Группирует строки в порции; размер порции растет от FIRST_CHUNK до chunk_size."""
+    chunk, limit = [], min(FIRST_CHUNK, chunk_size)
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= limit:
+            yield chunk
+            chunk, limit = [], min(limit * 2, chunk_size)
+    if chunk:
+        yield chunk
+
+
+def compute_chunk(calculate, chunk: list, config, failed) -> Iterator:
+    """Результаты calculate (calculate_items_json или calculate_metal_batch) для корректных строк порции.
+
+    Если пакетный движок не справился с порцией, она пересчитывается по одной строке: сбой одного
+    набора становится ошибкой его строки (значение failed), а остальные строки считаются.
+    """
+    items = [item for _, item, error in chunk if error is None]
+    try:
+        return iter(calculate(items, config))
+    except Exception:
+        results = []
+        for item in items:
+            try:
+                results += calculate([item], config)
+            except Exception:
+                results.append(failed)
+        return iter(results)
+
+
+def stream_ndjson(rows: Iterable[tuple], config, chunk_size: int) -> Iterator[str]:
+    """Результаты в NDJSON: {"row": N, "result": {...}} или {"row": N, "error": "..."}."""
+    for chunk in chunk_rows(rows, chunk_size):
+        computed = compute_chunk(calculate_items_json, chunk, config, (CALCULATION_FAILED, None))
+        lines = []
+        for row, _, error in chunk:
+            text = None
+            if error is None:
+                error, text = next(computed)
+            if text is None:
+                lines.append(json.dumps({"row": row, "error": error}) + "\n")
+            else:
+                lines.append(f'{{"row":{row},"result":{text}}}\n')
+        yield "".join(lines)
+
+
+def stream_csv(rows: Iterable[tuple], config, chunk_size: int) -> Iterator[str]:
+    """Результаты в CSV: по строке на набор с ключевыми величинами или текстом ошибки."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CSV_COLUMNS)
+    yield buffer.getvalue()
+    for chunk in chunk_rows(rows, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        computed = compute_chunk(calculate_metal_batch, chunk, config, {"error": CALCULATION_FAILED})
+        for row, _, error in chunk:
+            result = next(computed) if error is None else {"error": error}
+            if "error" in result:
+                writer.writerow([row, result["error"]] + [""] * (len(CSV_COLUMNS) - 2))
+                continue
+            s = summarize(result)
+            lengths, paint = s["lengths_mm"], s["paint"]
+            writer.writerow([
+                row, "", lengths["total"], lengths["base_frame"], lengths["steps_frames"],
+                lengths["vertical_stands"], lengths["reinforcements"],
+                paint["frame_area"], paint["pvl_area"], paint["total_area"],
+                paint["frame_weight"], paint["pvl_weight"], paint["total_weight"],
+                s["dpk_length"], s["dpk_boards"], s["bolts_count"],
+            ])
+        yield buffer.getvalue()
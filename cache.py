@@ -0,0 +1,89 @@
+"""Кэш сериализованных результатов расчета с LRU/TTL-вытеснением и счетчиками."""
+import threading  # Для защиты кэша при многопоточной работе
+import time  # Для отсчета времени жизни записей
+from collections import OrderedDict  # Для порядка использования записей (LRU)
+from typing import Hashable, Optional
+
+
+class ResultCache:
+    """Ограниченный по размеру кэш: вытесняет давно не использованные и устаревшие записи.
+
+    Кэш привязан к снимку настроек расчета: если снимок меняется, все записи сбрасываются.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 0, clock=time.monotonic):
+        self.max_size = max_size  # Максимальное количество записей
+        self.ttl = ttl  # Время жизни записи в секундах (0 - без ограничения)
+        self._clock = clock
+        self._data = OrderedDict()  # ключ -> (момент устаревания, значение)
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def check_fingerprint(self, fingerprint: Hashable) -> None:
+        """Сбрасывает кэш, если изменились настройки, от которых зависят результаты."""
+        if fingerprint == self._fingerprint:
+            return
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                if self._data:
+                    self.invalidations += 1
+                self._data.clear()
+                self._fingerprint = fingerprint
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Возвращает значение по ключу или None, если записи нет или она устарела."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and self._clock() >= expires_at:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: bytes) -> None:
+        """Сохраняет значение, вытесняя самые давно использованные записи при переполнении."""
+        if self.max_size <= 0:
+            return
+        expires_at = self._clock() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Удаляет все записи (счетчики сохраняются)."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """Возвращает счетчики попаданий, промахов и вытеснений."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -4,6 +4,13 @@ from dotenv import load_dotenv
 # Загружаем переменные окружения из файла .env
 load_dotenv()
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # Корень проекта
+
+def project_path(name: str, default: str) -> str:
+    """Путь из переменной окружения name относительно корня проекта, а не рабочей папки ('' - выключено)."""
+    value = os.getenv(name, default)
+    return os.path.join(BASE_DIR, value) if value else value
+
 class Config:
     # Базовые настройки
     DEBUG: bool = False  # Включить/выключить режим отладки. True для разработки, False для продакшена.
@@ -15,11 +22,34 @@ class Config:
         'ALLOWED_ORIGINS', 'http://localhost:5000'
     ).split(',')  # Список разрешённых источников. Пример: 'http://example.com,http://api.example.com'
 
+    # Логирование (см. log_pipeline.py)
+    LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO')  # Уровень логирования. Пример: 'WARNING'.
+    LOG_DIR: str = project_path('LOG_DIR', 'logs')  # Папка для логов; каждый процесс пишет в свой файл app-<pid>.log.
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024  # Ротация при достижении размера файла (байт).
+    LOG_ROTATE_INTERVAL: int = 24 * 3600  # Ротация по времени (секунды, 0 - только по размеру).
+    LOG_BACKUP_COUNT: int = 10  # Количество резервных копий логов.
+    LOG_ORPHAN_MAX_AGE: float = 7 * 24 * 3600  # Логи завершившихся процессов, не менявшиеся дольше (секунды), удаляются при запуске.
+    LOG_QUEUE_SIZE: int = 10000  # Размер очереди записей; при переполнении записи отбрасываются.
+    LOG_REQUEST_SAMPLE_RATE: float = float(os.getenv('LOG_REQUEST_SAMPLE_RATE', '1.0'))  # Доля логируемых успешных запросов (0..1).
+    LOG_PAYLOAD_MAX_CHARS: int = 1024  # Максимум символов тела запроса в логе (0 - не писать тело).
+
+    # Метрики и профилирование (см. metrics.py)
+    METRICS_DIR: str = project_path('METRICS_DIR', 'data/metrics')  # Папка снимков метрик процессов ('' - только текущий процесс).
+    METRICS_FLUSH_INTERVAL: float = 1.0  # Интервал сохранения снимка метрик процесса (секунды).
+    PROFILE_SLOW_MS: float = float(os.getenv('PROFILE_SLOW_MS', '0'))  # Порог медленного запроса для профилирования (мс, 0 - выключено).
+    PROFILE_SAMPLE_RATE: float = 1.0  # Доля профилируемых запросов при включенном профилировании (0..1).
+    PROFILE_DIR: str = project_path('PROFILE_DIR', 'data/profiles')  # Папка для профилей медленных запросов (.prof).
+
+    # Статические ресурсы (см. assets.py)
+    ASSETS_DIR: str = project_path('ASSETS_DIR', 'static/dist')  # Папка сборки python assets.py build (без сборки используются исходные файлы).
+
     # Ограничения размеров (мм)
     MIN_WIDTH: int = 300  # Минимальная ширина. Измените при необходимости, например, 200.
     MAX_WIDTH: int = 6000  # Максимальная ширина. Измените при необходимости, например, 8000.
     MIN_HEIGHT: int = 100  # Минимальная высота. Измените при необходимости, например, 50.
     MAX_HEIGHT: int = 3400  # Максимальная высота. Измените при необходимости, например, 4000.
+    MIN_STEP_HEIGHT: int = 110  # Минимальная высота ступени (ограничивает подбор /api/optimize).
+    MAX_STEP_HEIGHT: int = 300  # Максимальная высота ступени (ограничивает подбор /api/optimize).
 
     # Параметры материалов
     PROFILE_THICKNESS: int = 20  # Толщина профиля. Пример: 15, 25.
@@ -27,6 +57,89 @@ class Config:
     PVL_DEPTH: int = 300  # Глубина PVL. Пример: 290, 310.
     DPK_REDUCTION: int = 25  # Уменьшение DPK. Пример: 20, 30.
 
+    # Проверка прочности каркаса (см. structure.py)
+    PROFILE_WALL: float = 1.5  # Толщина стенки профильной трубы (мм). Пример: 1.2, 2.
+    STRUCT_ELASTIC_MODULUS: float = 206000  # Модуль упругости стали (МПа).
+    STRUCT_YIELD_STRENGTH: float = 245  # Предел текучести стали (МПа).
+    STRUCT_SAFETY_FACTOR: float = 1.5  # Запас по напряжению и устойчивости.
+    STRUCT_AREA_LOAD: float = 3.0  # Равномерная нагрузка на ступени и площадку (кПа).
+    STRUCT_POINT_LOAD: float = 1500  # Сосредоточенная нагрузка на ступень (Н).
+    STRUCT_DEFLECTION_LIMIT: int = 200  # Допустимый прогиб - пролет, деленный на это число.
+    STRUCT_MAX_REINFORCEMENTS: int = 10  # Максимум усилений при подборе минимального количества.
+
+    # Пакетный расчет
+    BATCH_MAX_ITEMS: int = 10000  # Максимум наборов параметров в одном запросе /api/calculate/batch.
+    BATCH_MALLOC_TRIM_BYTES: int = int(os.getenv('BATCH_MALLOC_TRIM_BYTES', str(64 * 1024 * 1024)))  # Освобожденная память malloc, которая остается процессу между пакетами (0 - настройки malloc не меняются).
+    BULK_CHUNK_SIZE: int = 256  # Размер порции строк при потоковом расчете файла /api/calculate/stream.
+    BULK_MAX_LINE_BYTES: int = 65536  # Максимальная длина строки файла (байт); длинные строки возвращаются с ошибкой.
+    EXPORT_MAX_ITEMS: int = 100000  # Максимум наборов (или котировок) в JSON-запросе /api/export.
+
+    # План раскроя профиля (см. cutting.py)
+    CUT_STOCK_LENGTH: int = 6000  # Длина хлыста профиля (мм).
+    CUT_KERF: int = 3  # Ширина реза (мм).
+    CUT_MAX_PIECES: int = 100000  # Максимум отрезков в одном запросе /api/cutplan.
+
+    # Подбор конфигурации /api/optimize (см. optimize.py)
+    OPTIMIZE_STEP_HEIGHT_MIN: int = 150  # Удобная высота ступени по умолчанию: от (мм).
+    OPTIMIZE_STEP_HEIGHT_MAX: int = 200  # Удобная высота ступени по умолчанию: до (мм).
+    OPTIMIZE_PLATFORM_DEPTHS: tuple = (600, 900, 1200)  # Глубины платформы (мм), перебираемые по умолчанию.
+    OPTIMIZE_MAX_CANDIDATES: int = 5000  # Максимум вариантов в одном запросе подбора.
+    OPTIMIZE_MAX_OPTIONS: int = 20  # Максимум вариантов в ответе по умолчанию.
+
+    # Воркеры gunicorn (см. gunicorn.conf.py)
+    WEB_WORKERS: int = int(os.getenv('WEB_WORKERS', '4'))  # Количество процессов-воркеров.
+    WEB_THREADS: int = int(os.getenv('WEB_THREADS', '32'))  # Потоков в каждом воркере (воркеры gthread).
+
+    # Живой пересчет /api/live (см. live.py)
+    LIVE_SOCKET_DIR: str = project_path('LIVE_SOCKET_DIR', 'data/live')  # Папка сокетов для пересылки изменений между процессами ('' - один процесс).
+    LIVE_MAX_SESSIONS: int = max(1, WEB_THREADS // 2)  # Максимум открытых потоков в процессе: каждый занимает поток воркера, половина остается другим запросам.
+    LIVE_HEARTBEAT: float = 15.0  # Интервал комментария-пинга в простаивающем потоке (секунды).
+    LIVE_IDLE_TIMEOUT: float = 60.0  # Поток закрывается после стольких секунд без изменений.
+    LIVE_MAX_BODY: int = 16384  # Максимальный размер тела изменения (байт).
+
+    # История расчетов /api/quotes (см. quotes.py)
+    QUOTES_ENABLED: bool = os.getenv('QUOTES_ENABLED', '1') == '1'  # Сохранять успешные расчеты /api/calculate.
+    QUOTES_DB_PATH: str = project_path('QUOTES_DB_PATH', 'data/quotes.db')  # Файл базы SQLite с историей.
+    QUOTES_BATCH_SIZE: int = 500  # Максимум котировок в одной транзакции записи.
+    QUOTES_FLUSH_INTERVAL: float = 1.0  # Максимальная задержка записи котировки (секунды).
+    QUOTES_QUEUE_SIZE: int = 10000  # Размер очереди записи; при переполнении котировки отбрасываются.
+    QUOTES_PAGE_SIZE: int = 50  # Котировок на странице истории по умолчанию.
+    QUOTES_MAX_PAGE_SIZE: int = 500  # Максимум котировок на странице истории.
+
+    # Превью лестницы /api/preview (см. preview.py)
+    PREVIEW_DIR: str = project_path('PREVIEW_DIR', 'data/previews')  # Папка дискового кэша превью.
+    PREVIEW_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # Максимальный объем кэша превью (байт).
+    PREVIEW_WIDTH: int = 480  # Ширина превью по умолчанию (пиксели).
+    PREVIEW_HEIGHT: int = 360  # Высота превью по умолчанию (пиксели).
+    PREVIEW_MAX_SIZE: int = 1600  # Максимальная сторона превью (пиксели).
+
+    # Объединение запросов и ограничение нагрузки /api/calculate (см. admission.py)
+    SINGLEFLIGHT_ENABLED: bool = True  # Одновременные запросы с одинаковыми параметрами ждут один расчет.
+    ADMISSION_MAX_IN_FLIGHT: int = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', str(max(1, WEB_THREADS // 4))))  # Максимум одновременных расчетов в процессе.
+    ADMISSION_MAX_QUEUE: int = int(os.getenv('ADMISSION_MAX_QUEUE', str(max(
+        1, WEB_THREADS - LIVE_MAX_SESSIONS - ADMISSION_MAX_IN_FLIGHT))))  # Максимум запросов в очереди; сверх - сразу 503. По умолчанию очередь и расчеты умещаются в потоках воркера, свободных от /api/live.
+    ADMISSION_QUEUE_TIMEOUT: float = 5.0  # Максимальное ожидание в очереди (секунды), затем 503.
+    ADMISSION_RETRY_AFTER: int = 1  # Значение заголовка Retry-After в ответе 503 (секунды).
+
+    # Кэширование GET /api/calculate браузером и прокси
+    CALCULATE_GET_MAX_AGE: int = 3600  # Время хранения ответа в браузере (секунды).
+    CALCULATE_GET_SHARED_MAX_AGE: int = 86400  # Время хранения ответа в общих кэшах: nginx, varnish, CDN (секунды).
+
+    # Кэш результатов /api/calculate
+    CACHE_ENABLED: bool = True  # Включить/выключить кэш готовых ответов.
+    CACHE_MAX_SIZE: int = 1024  # Максимум записей в кэше одного процесса. Пример: 256, 4096.
+    CACHE_TTL: int = 3600  # Время жизни записи в секундах (0 - без ограничения).
+    MODEL_CACHE_MAX_SIZE: int = 256  # Максимум GLB-моделей /api/model в кэше одного процесса.
+
+    # Сетка цен (предрасчитанные результаты, см. price_grid.py)
+    PRICE_GRID_ENABLED: bool = True  # Использовать сетку цен в /api/price.
+    PRICE_GRID_PATH: str = project_path('PRICE_GRID_PATH', 'data/price_grid.bin')  # Путь к файлу сетки.
+    PRICE_GRID_AUTOBUILD: bool = os.getenv('PRICE_GRID_AUTOBUILD', '1') == '1'  # Строить отсутствующую или устаревшую сетку при запуске ('0' - расчет без сетки и ошибка в логе).
+    GRID_RESOLUTION: int = int(os.getenv('GRID_RESOLUTION', '100'))  # Шаг сетки по ширине и высоте (мм); общий для сборки и приложения. Пример: 10, 50.
+    GRID_MAX_STEPS: int = 20  # Максимальное количество ступеней в сетке.
+    GRID_PLATFORM_DEPTHS: tuple = (600, 900, 1200)  # Глубины платформы (мм), входящие в сетку.
+    GRID_PAINT_CONSUMPTION: int = 110  # Расход краски (г/м²), для которого считается сетка.
+
 class DevelopmentConfig(Config):
     # Конфигурация для разработки
     DEBUG: bool = True  # Включён режим отладки.
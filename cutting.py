@@ -0,0 +1,251 @@
+"""План раскроя профиля: детали из результатов calculate_metal раскладываются по хлыстам.
+
+Каждый результат разбивается на отдельные отрезки профиля (основание, рамы ступеней, стойки,
+усиления). Отрезки всех заказов раскладываются по хлыстам стандартной длины эвристикой
+Best Fit Decreasing с учетом ширины реза, после чего проход улучшения пытается освободить
+наименее заполненные хлысты, переложив их отрезки в остатки других.
+"""
+from bisect import bisect_left, insort  # Для поиска подходящего остатка за O(log n)
+from typing import Iterable, NamedTuple
+
+from materials import material_plans  # Планы расчета материалов
+
+IMPROVE_MAX_FAILURES = 32  # Проход улучшения останавливается после стольких неудачных хлыстов подряд
+IMPROVE_EJECT_SCAN = 16  # Сколько хлыстов с наибольшим остатком просматривается при вытеснении
+
+
+class Piece(NamedTuple):
+    """Отрезок профиля."""
+    length: float  # Длина, мм
+    part: str  # Элемент конструкции
+    order: int  # Номер заказа
+
+
+def pieces_from_result(result: dict, config, order: int = 0) -> list:
+    """Разбивает результат calculate_metal на отдельные отрезки профиля.
+
+    Полоски для проушин режутся из полосы, а не из профиля, поэтому в план не входят.
+    """
+    d = result['dimensions']
+    t = d['profile_thickness']
+    width = d['width']
+    plan = material_plans(config)[d['material']]  # План материала (занижения и усиления под досками)
+    step_depth = d['step_depth']
+    step_height = d['step_height']
+    step_frame_height = d['step_frame_height']
+    count = d['reinforcements_count']
+    steps = len(result['steps_frames']['mm'])
+
+    pieces = []
+
+    def add(length, part, times=1):
+        pieces.extend([Piece(length, part, order)] * times)
+
+    # 1. Основание: две поперечины по ширине и две продольные балки
+    add(width, "base_frame", 2)
+    add(step_depth * steps - 2 * t, "base_frame", 2)
+
+    # 2. Рамы ступеней: две балки по ширине и две боковые на каждую ступень
+    for i in range(steps):
+        depth = d['platform_depth'] if (i == steps - 1 and d['has_platform']) else step_depth
+        add(width, "step_frame", 2)
+        add(depth - 2 * t, "step_frame", 2)
+
+    # 3. Вертикальные стойки
+    if steps == 1:
+        add(step_frame_height - 2 * t, "stand", 4)
+    else:
+        for i in range(steps):
+            height = step_height * (i + 1) - plan.step_reduction(i)
+            add(height - 2 * t, "stand", 4 if i == steps - 1 else 2)
+
+    # 4. Усиления
+    add(step_frame_height - 2 * t, "front_reinforcement", count)
+    back = step_height * steps - plan.back_reduction - 2 * t
+    add(back, "back_reinforcement", count)
+    add(170, "internal_reinforcement", count * (steps - 1))
+    for i in range(steps):
+        if not plan.step_boards(i):
+            continue  # Усиления глубины только под досками
+        depth = d['platform_depth'] if (i == steps - 1 and d['has_platform']) else step_depth
+        add(depth - 2 * t, "depth_reinforcement", count)
+    return pieces
+
+
+class _Bar:
+    """Хлыст в процессе раскладки."""
+    __slots__ = ("pieces", "free")
+
+    def __init__(self, capacity: float):
+        self.pieces = []
+        self.free = capacity
+
+
+def plan_cuts(pieces: Iterable[Piece], stock_length: float = 6000, kerf: float = 3,
+              improve: bool = True) -> dict:
+    """Раскладывает отрезки по хлыстам длиной stock_length с шириной реза kerf.
+
+    Каждый отрезок занимает length + kerf; емкость хлыста - stock_length + kerf,
+    так как после последнего отрезка рез не нужен.
+    """
+    capacity = stock_length + kerf
+    usable, oversize, skipped = [], [], 0
+    for piece in pieces:
+        if piece.length <= 0:
+            skipped += 1  # Отрезки нулевой или отрицательной длины (вырожденная геометрия)
+        elif piece.length > stock_length:
+            oversize.append(piece)  # Не помещается в хлыст целиком, требует стыковки
+        else:
+            usable.append(piece)
+    usable.sort(key=lambda p: p.length, reverse=True)
+
+    bars = []
+    # Отсортированные остатки открытых хлыстов и соответствующие им номера хлыстов
+    free_keys = []
+    for piece in usable:
+        need = piece.length + kerf
+        index = _best_fit(free_keys, need)
+        if index is None:
+            bar = _Bar(capacity)
+            bars.append(bar)
+            number = len(bars) - 1
+        else:
+            _, number = free_keys.pop(index)
+            bar = bars[number]
+        bar.pieces.append(piece)
+        bar.free -= need
+        insort(free_keys, (bar.free, number))
+
+    if improve:
+        bars = _improve(bars, free_keys, kerf)
+    return _summary(bars, oversize, skipped, stock_length, kerf)
+
+
+def _best_fit(free_keys: list, need: float):
+    """Индекс хлыста с наименьшим подходящим остатком или None."""
+    index = bisect_left(free_keys, (need, -1))
+    return index if index < len(free_keys) else None
+
+
+def _improve(bars: list, free_keys: list, kerf: float) -> list:
+    """Пытается освободить наименее заполненные хлысты, перекладывая их отрезки в остатки других.
+
+    Отрезок, который никуда не помещается, может занять место меньшего отрезка в другом хлысте,
+    если вытесненный отрезок сам помещается в какой-либо остаток.
+    """
+    removed = set()
+    # Кандидаты - хлысты с наибольшим остатком, начиная с самого пустого
+    candidates = sorted(range(len(bars)), key=lambda n: bars[n].free, reverse=True)
+    failures = 0
+    for number in candidates:
+        if failures >= IMPROVE_MAX_FAILURES or len(bars) - len(removed) <= 1:
+            break
+        bar = bars[number]
+        own_key = (bar.free, number)
+        free_keys.pop(bisect_left(free_keys, own_key))  # Кандидат не принимает отрезки
+        log = []  # Перемещения (отрезок, откуда, куда) для отката; None - хлыст-кандидат
+        pieces = sorted(bar.pieces, key=lambda p: p.length, reverse=True)
+        if all(_relocate(bars, free_keys, piece, kerf, log) for piece in pieces):
+            bar.pieces = []
+            removed.add(number)
+            failures = 0
+            continue
+        # Откат: возвращаем отрезки на место
+        for piece, source, target in reversed(log):
+            _shift(bars, free_keys, piece, target, source, kerf)
+        insort(free_keys, own_key)
+        failures += 1
+    return [bar for n, bar in enumerate(bars) if n not in removed]
+
+
+def _relocate(bars: list, free_keys: list, piece: Piece, kerf: float, log: list) -> bool:
+    """Переносит отрезок хлыста-кандидата в другой хлыст (при необходимости с вытеснением)."""
+    index = _best_fit(free_keys, piece.length + kerf)
+    if index is not None:
+        target = free_keys[index][1]
+        _shift(bars, free_keys, piece, None, target, kerf)
+        log.append((piece, None, target))
+        return True
+    # Вытеснение: просматриваем хлысты с наибольшими остатками
+    for free, target in free_keys[:-IMPROVE_EJECT_SCAN - 1:-1]:
+        # Вытесняемый отрезок должен освободить достаточно места: q >= length - free
+        gap = piece.length - free
+        ejected = min((q for q in bars[target].pieces if q.length >= gap),
+                      key=lambda q: q.length, default=None)
+        if ejected is None:
+            continue
+        own_key = (free, target)
+        free_keys.pop(bisect_left(free_keys, own_key))  # Вытесненный отрезок ищет другой хлыст
+        index = _best_fit(free_keys, ejected.length + kerf)
+        home = free_keys[index][1] if index is not None else None
+        insort(free_keys, own_key)
+        if home is None:
+            continue
+        _shift(bars, free_keys, ejected, target, home, kerf)
+        _shift(bars, free_keys, piece, None, target, kerf)
+        log.extend([(ejected, target, home), (piece, None, target)])
+        return True
+    return False
+
+
+def _shift(bars: list, free_keys: list, piece: Piece, source, target, kerf: float) -> None:
+    """Перемещает отрезок между хлыстами, поддерживая упорядоченность остатков.
+
+    None вместо номера хлыста - хлыст-кандидат, который не участвует в free_keys.
+    """
+    need = piece.length + kerf
+    if source is not None:
+        bar = bars[source]
+        free_keys.pop(bisect_left(free_keys, (bar.free, source)))
+        bar.pieces.remove(piece)
+        bar.free += need
+        insort(free_keys, (bar.free, source))
+    if target is not None:
+        bar = bars[target]
+        free_keys.pop(bisect_left(free_keys, (bar.free, target)))
+        bar.pieces.append(piece)
+        bar.free -= need
+        insort(free_keys, (bar.free, target))
+
+
+def _summary(bars: list, oversize: list, skipped: int, stock_length: float, kerf: float) -> dict:
+    """Формирует итог раскладки."""
+    plan = []
+    used_total = 0
+    for bar in bars:
+        pieces = sorted(bar.pieces, key=lambda p: p.length, reverse=True)
+        used = sum(p.length for p in pieces)
+        cuts = len(pieces) * kerf
+        used_total += used
+        plan.append({
+            "pieces": [{"length": round(p.length, 1), "part": p.part, "order": p.order} for p in pieces],
+            "used": round(used, 1),
+            "waste": round(max(stock_length - used - cuts, 0), 1)
+        })
+    stock_total = stock_length * len(bars)
+    return {
+        "stock_length": stock_length,
+        "kerf": kerf,
+        "bars_count": len(bars),
+        "pieces_count": sum(len(bar.pieces) for bar in bars),
+        "pieces_length": round(used_total, 1),
+        "waste_length": round(stock_total - used_total, 1),
+        "utilization": round(used_total / stock_total, 4) if stock_total else 0.0,
+        "bars": plan,
+        "oversize": [{"length": round(p.length, 1), "part": p.part, "order": p.order} for p in oversize],
+        "skipped": skipped
+    }
+
+
+def plan_orders(results: Iterable[dict], config, extra_pieces: Iterable[Piece] = (),
+                stock_length: float = None, kerf: float = None) -> dict:
+    """Строит общий план раскроя для результатов calculate_metal (номер заказа - индекс результата)."""
+    pieces = []
+    for order, result in enumerate(results):
+        pieces.extend(pieces_from_result(result, config, order))
+    pieces.extend(extra_pieces)
+    return plan_cuts(
+        pieces,
+        config['CUT_STOCK_LENGTH'] if stock_length is None else stock_length,
+        config['CUT_KERF'] if kerf is None else kerf
+    )
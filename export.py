@@ -0,0 +1,223 @@
+"""Потоковая выгрузка спецификации материалов (BOM) для множества лестниц в XLSX или CSV.
+
+Каждый набор параметров раскладывается на строки компонентов результата calculate_metal:
+основание, каркасы ступеней (по строке на каркас), стойки, усиления по типам, доски ДПК, болты,
+гайки, проушины и краска. Расчет идет порциями пакетным движком, как в bulk.py, а строки сразу
+отправляются клиенту; в памяти остаются только текущая порция и итоги по материалу и цвету,
+которые выводятся в конце (в XLSX - отдельным листом).
+
+XLSX собирается без сторонних библиотек: zipfile пишет архив в поток без перемотки, а листы
+записываются как XML построчно (строки хранятся в ячейках inlineStr, без общей таблицы строк).
+"""
+import csv  # Для формирования CSV
+import io  # Для буфера строк CSV
+import zipfile  # Для архива XLSX
+import zlib  # Для сжатия ответа gzip
+from typing import Iterable, Iterator
+from xml.sax.saxutils import escape  # Для экранирования текста в XML
+
+from batch import calculate_metal_batch
+from bulk import CALCULATION_FAILED, chunk_rows, compute_chunk
+
+# Столбцы спецификации и итогов
+BOM_COLUMNS = ("row", "component", "material", "color", "quantity", "unit")
+TOTAL_COLUMNS = ("material", "color", "quantity", "unit")
+TOTAL_ROW = "total"  # Номер строки итогов в CSV
+
+REINFORCEMENTS = (("front", "Усиление переднее"), ("back", "Усиление заднее"),
+                  ("internal", "Усиление внутреннее"), ("depth", "Усиление по глубине"))
+
+
+def bom_lines(result: dict) -> list:
+    """Строки спецификации одного результата: (компонент, материал, цвет, количество, единица).
+
+    Компоненты с нулевым количеством (например, доски у ПВЛ) пропускаются.
+    """
+    d = result["dimensions"]
+    profile = f"Профиль {d['profile_thickness']}x{d['profile_thickness']}"
+    frame_color = d["frame_color"]
+    extra = result["additional_materials"]
+    strips = extra["mounting_strips"]
+    lines = [("Основание", profile, frame_color, result["base_frame"]["mm"], "мм")]
+    lines += [(f"Каркас ступени {i}", profile, frame_color, length, "мм")
+              for i, length in enumerate(result["steps_frames"]["mm"], 1)]
+    lines.append(("Вертикальные стойки", profile, frame_color, result["vertical_stands"]["mm"], "мм"))
+    lines += [(title, profile, frame_color, result["reinforcements"][key]["mm"], "мм")
+              for key, title in REINFORCEMENTS]
+    lines += [
+        ("Доски ДПК", "ДПК", extra["dpk_color"] or "", extra["dpk_boards"], "шт"),
+        ("Болты", "Болт", "", extra["bolts_count"], "шт"),
+        ("Гайки", "Гайка", "", extra["nuts_count"], "шт"),
+        ("Проушины", f"Полоса {strips['size']}", frame_color, strips["count"], "шт"),
+        ("Краска", "Краска", frame_color, result["paint"]["total_weight"], "г"),
+    ]
+    return [line for line in lines if line[3]]
+
+
+def bom_rows(rows: Iterable[tuple], config, chunk_size: int, totals: dict) -> Iterator[list]:
+    """Порции строк спецификации: (номер, компонент, материал, цвет, количество, единица).
+
+    rows - тройки (номер строки, набор параметров, ошибка), как в bulk.py; для набора с ошибкой
+    выдается строка с текстом ошибки в столбце компонента. Итоги копятся в totals:
+    (материал, цвет, единица) -> количество.
+    """
+    for chunk in chunk_rows(rows, chunk_size):
+        computed = compute_chunk(calculate_metal_batch, chunk, config, {"error": CALCULATION_FAILED})
+        out = []
+        for row, _, error in chunk:
+            result = next(computed) if error is None else {"error": error}
+            if "error" in result:
+                out.append((row, f"Ошибка: {result['error']}", "", "", "", ""))
+                continue
+            for component, material, color, quantity, unit in bom_lines(result):
+                out.append((row, component, material, color, quantity, unit))
+                key = (material, color, unit)
+                totals[key] = totals.get(key, 0) + quantity
+        yield out
+
+
+def total_rows(totals: dict) -> list:
+    """Итоги по материалу и цвету, упорядоченные по материалу."""
+    return [(material, color, round(quantity, 2), unit)
+            for (material, color, unit), quantity in sorted(totals.items())]
+
+
+def stream_bom_csv(rows: Iterable[tuple], config, chunk_size: int) -> Iterator[str]:
+    """Спецификация в CSV; после строк компонентов идут строки итогов с номером total."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(BOM_COLUMNS)
+    yield buffer.getvalue()
+    totals = {}
+    for lines in bom_rows(rows, config, chunk_size, totals):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(lines)
+        yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    writer.writerows((TOTAL_ROW, "", material, color, quantity, unit)
+                     for material, color, quantity, unit in total_rows(totals))
+    yield buffer.getvalue()
+
+
+# Части книги XLSX, кроме листов
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet2.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="xl/workbook.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    '</Relationships>'
+)
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+    '<sheet name="Спецификация" sheetId="1" r:id="rId1"/><sheet name="Итого" sheetId="2" r:id="rId2"/>'
+    '</sheets></workbook>'
+)
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+    '<Relationship Id="rId2" Target="worksheets/sheet2.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+    '<Relationship Id="rId3" Target="styles.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+    '</Relationships>'
+)
+STYLES = (  # Два формата ячеек: обычный и полужирный для заголовков
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '</styleSheet>'
+)
+SHEET_START = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+               '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+SHEET_END = '</sheetData></worksheet>'
+
+
+def sheet_row(values: Iterable, style: int = 0) -> str:
+    """Строка листа XLSX: числа - числовые ячейки, остальное - строки inlineStr."""
+    cells = []
+    s = f' s="{style}"' if style else ''
+    for value in values:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c{s}><v>{value}</v></c>')
+        else:
+            cells.append(f'<c t="inlineStr"{s}><is><t>{escape(str(value))}</t></is></c>')
+    return f'<row>{"".join(cells)}</row>'
+
+
+class _Sink:
+    """Поток записи без перемотки: zipfile пишет в него архив, а генератор забирает готовые байты."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data: bytes) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def stream_bom_xlsx(rows: Iterable[tuple], config, chunk_size: int) -> Iterator[bytes]:
+    """Спецификация в XLSX: лист "Спецификация" со строками компонентов и лист "Итого"."""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, text in (("[Content_Types].xml", CONTENT_TYPES), ("_rels/.rels", ROOT_RELS),
+                           ("xl/workbook.xml", WORKBOOK), ("xl/_rels/workbook.xml.rels", WORKBOOK_RELS),
+                           ("xl/styles.xml", STYLES)):
+            archive.writestr(name, text)
+        yield sink.take()
+        totals = {}
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write((SHEET_START + sheet_row(BOM_COLUMNS, style=1)).encode())
+            for lines in bom_rows(rows, config, chunk_size, totals):
+                sheet.write("".join(sheet_row(line) for line in lines).encode())
+                yield sink.take()
+            sheet.write(SHEET_END.encode())
+        with archive.open("xl/worksheets/sheet2.xml", "w") as sheet:
+            sheet.write((SHEET_START + sheet_row(TOTAL_COLUMNS, style=1)
+                         + "".join(sheet_row(line) for line in total_rows(totals)) + SHEET_END).encode())
+    yield sink.take()
+
+
+def gzip_stream(chunks: Iterable) -> Iterator[bytes]:
+    """Сжимает поток ответа в gzip по мере отправки."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 - формат gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
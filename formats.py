@@ -0,0 +1,114 @@
+"""Форматы ответа /api/calculate.
+
+- json: схема calculate_metal через jsonify (по умолчанию, байт в байт как раньше);
+- fastjson: та же схема, быстрый сериализатор (orjson, если установлен), UTF-8 без экранирования;
+- compact: компактная схема только в базовых единицах (мм) без дублирования в метрах;
+- msgpack: компактная схема в MessagePack (нужен пакет msgpack).
+"""
+import json  # Запасной сериализатор, если orjson не установлен
+from typing import Optional
+
+try:
+    import orjson  # Быстрый сериализатор JSON (необязательная зависимость)
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack  # Сериализатор MessagePack (необязательная зависимость)
+except ImportError:
+    msgpack = None
+
+COMPACT_MIMETYPE = 'application/vnd.dpk.compact+json'
+COMPACT_SCHEMA = 'compact-v1'
+
+# Формат -> тип содержимого ответа
+MIMETYPES = {
+    "json": "application/json",
+    "fastjson": "application/json",
+    "compact": COMPACT_MIMETYPE,
+    "msgpack": "application/msgpack",
+}
+# Тип из заголовка Accept -> формат (первый - формат по умолчанию)
+ACCEPT = {
+    "application/json": "json",
+    COMPACT_MIMETYPE: "compact",
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+}
+
+
+def available(fmt: str) -> bool:
+    """Проверяет, что для формата установлены нужные пакеты."""
+    return fmt in MIMETYPES and (fmt != "msgpack" or msgpack is not None)
+
+
+def negotiate(fmt: Optional[str], accept) -> Optional[str]:
+    """Выбирает формат по параметру format или заголовку Accept (werkzeug MIMEAccept).
+
+    Неизвестный формат в параметре дает ValueError; известный, но недоступный - None.
+    """
+    if fmt:
+        if fmt not in MIMETYPES:
+            raise ValueError(f"Неизвестный формат: {fmt}. Допустимые: {', '.join(MIMETYPES)}")
+        return fmt if available(fmt) else None
+    offered = [mimetype for mimetype, name in ACCEPT.items() if available(name)]
+    return ACCEPT[accept.best_match(offered, default="application/json")]
+
+
+def fast_json(data) -> bytes:
+    """Сериализует в компактный JSON в UTF-8."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data)
+        except orjson.JSONEncodeError:  # Целые шире 64 бит (например, огромное количество усилений)
+            pass
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def compact_result(result: dict) -> dict:
+    """Компактная схема результата calculate_metal: длины только в мм, без вложенных пар mm/m."""
+    reinforcements = result['reinforcements']
+    additional = result['additional_materials']
+    strips = additional['mounting_strips']
+    paint = result['paint']
+    return {
+        "schema": COMPACT_SCHEMA,
+        "lengths_mm": {
+            "base_frame": result['base_frame']['mm'],
+            "steps_frames": result['steps_frames']['mm'],
+            "steps_frames_total": result['steps_frames']['total_mm'],
+            "vertical_stands": result['vertical_stands']['mm'],
+            "reinforcements_front": reinforcements['front']['mm'],
+            "reinforcements_back": reinforcements['back']['mm'],
+            "reinforcements_internal": reinforcements['internal']['mm'],
+            "reinforcements_depth": reinforcements['depth']['mm'],
+            "reinforcements_total": reinforcements['total']['mm'],
+            "total": result['total_length']['mm'],
+        },
+        "materials": {
+            "dpk_length_m": additional['dpk_length'],  # В исходной схеме длина доски есть только в метрах
+            "dpk_boards": additional['dpk_boards'],
+            "dpk_color": additional['dpk_color'],
+            "bolts": additional['bolts_count'],
+            "nuts": additional['nuts_count'],
+            "strips": strips['count'],
+            "strip_size": strips['size'],
+            "strips_length_mm": strips['total_length'],
+        },
+        "paint": paint,
+        "dimensions": result['dimensions'],
+        "structure": result['structure'],
+    }
+
+
+def encode(result: dict, fmt: str) -> bytes:
+    """Сериализует результат calculate_metal в формат fmt (кроме json, который отдает jsonify)."""
+    if fmt == "fastjson":
+        return fast_json(result)
+    compact = compact_result(result)
+    if fmt == "msgpack":
+        try:
+            return msgpack.packb(compact, use_bin_type=True)
+        except OverflowError:
+            raise ValueError("Число вне диапазона MessagePack (целые до 64 бит)") from None
+    return fast_json(compact)
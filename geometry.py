@@ -0,0 +1,406 @@
+"""Геометрия лестницы на сервере и ее выгрузка в GLB с инстансингом.
+
+Набор параллелепипедов повторяет createStairModel из static/js/eco.js, optima.js и komfort.js:
+каркас из профиля, доски ДПК, листы ПВЛ и болты. Все детали одного типа выгружаются как экземпляры одного
+единичного куба (расширение EXT_mesh_gpu_instancing): смещение и масштаб на экземпляр.
+"""
+import json  # Для JSON-части GLB
+import math  # Для округления количества ступеней
+import struct  # Для двоичной части GLB
+
+import numpy as np  # Для буферов экземпляров
+
+from materials import MATERIAL_SPECS  # Покрытия ступеней по материалам
+
+# Типы деталей в порядке вывода (один узел GLB на тип)
+PART_TYPES = ("profile", "board", "pvl", "bolt")
+
+# Модели лестницы: у Оптимы и Комфорта часть каркаса из профиля 40x20
+STAIR_MODELS = ("eco", "optima", "komfort")
+WIDE_PROFILE = 40  # Ширина профиля 40x20 (profile_thickness2 в static/js)
+
+# Цвета каркаса и доски ДПК (как COLOR_MAPPING в static/js)
+COLOR_MAPPING = {
+    'RAL9005': {'frame': 0x000000, 'dpk': 0x382B22},  # Черный - Венге
+    'RAL8017': {'frame': 0x44322D, 'dpk': 0x8B4513},  # Коричневый - Коричневый
+    'RAL7024': {'frame': 0x474A51, 'dpk': 0x808080},  # Серый - Серый
+}
+BOLT_COLOR = 0xC0C0C0  # Серебристый цвет
+
+# Доски ДПК
+BOARD_WIDTH = 150  # Стандартная ширина доски
+BOARD_HEIGHT = 25
+BOARD_GAP = 5  # Зазор между досками
+BOARD_FRONT_OFFSET = 10  # Смещение досок вперед на 10мм
+PVL_GRID_SIZE = 30  # Размер ячейки сетки ПВЛ
+
+
+class BoxList:
+    """Накопитель параллелепипедов одного типа: центры и размеры."""
+
+    def __init__(self):
+        self.centers = []
+        self.sizes = []
+
+    def add(self, size, center):
+        # Вырожденные детали (например, площадка нулевой глубины) не выводим
+        if min(size) <= 0:
+            return
+        self.sizes.append(size)
+        self.centers.append(center)
+
+    def __len__(self):
+        return len(self.centers)
+
+
+def stair_boxes(dimensions: dict, model: str = "eco") -> dict:
+    """Строит детали лестницы модели model по блоку dimensions из результата calculate_metal.
+
+    Возвращает словарь тип -> (центры, размеры) в виде массивов float32 формы (N, 3).
+    """
+    width = dimensions['width']
+    height = dimensions['height']
+    step_height = dimensions['step_height']
+    step_depth = dimensions['step_depth']
+    t = dimensions['profile_thickness']
+    has_platform = dimensions['has_platform']
+    platform_depth = dimensions['platform_depth']
+    reinforcements_count = dimensions['reinforcements_count']
+    spec = MATERIAL_SPECS.get(dimensions['material'])
+    board_elevation = dimensions['board_elevation']
+    if model not in STAIR_MODELS:
+        raise ValueError(f"Неизвестная модель лестницы: {model}")
+    steps = math.floor(height / step_height + 0.5)  # Как Math.round в браузере
+    # Покрытие каждой ступени (None для неизвестного материала - ступени без покрытия)
+    coverings = [spec.step_spec(i) if spec else None for i in range(steps)]
+
+    parts = {name: BoxList() for name in PART_TYPES}
+    last_step_depth = platform_depth if (has_platform and platform_depth > 0) else step_depth
+    if model == "eco":
+        _add_eco_frame(parts['profile'], dimensions, steps, coverings, last_step_depth)
+    else:
+        _add_wide_frame(parts['profile'], dimensions, steps, coverings, last_step_depth, model == "optima")
+
+    # Усиление глубины площадки ПВЛ и покрытия ступеней
+    for i in range(steps):
+        is_last = i == steps - 1
+        depth = platform_depth if (is_last and has_platform) else step_depth
+        y = (i + 1) * step_height
+        z = i * step_depth
+        if is_last and spec is not None and spec.step.painted and depth > 305:
+            step_spacing = (width - 2 * t) / (reinforcements_count + 1)
+            for j in range(reinforcements_count):
+                x = -width / 2 + t + step_spacing * (j + 1)
+                parts['profile'].add((t, t, depth - 2 * t), (x, y, z + depth / 2))
+        if coverings[i] is None:
+            continue
+        if coverings[i].boards:
+            _add_dpk_boards(parts, width, depth, y, z, board_elevation)
+        elif coverings[i].painted:
+            _add_pvl_cover(parts['pvl'], width, depth, y, z, t)
+
+    # Центрируем модель по глубине, как stairModel.position в браузере
+    shift = np.array([0, 0, -step_depth * (steps - 1) / 2], dtype=np.float64)
+    result = {}
+    for name, boxes in parts.items():
+        centers = np.array(boxes.centers, dtype=np.float64).reshape(-1, 3) + shift
+        result[name] = (centers.astype(np.float32), np.array(boxes.sizes, dtype=np.float32).reshape(-1, 3))
+    return result
+
+
+def default_reinforcements(width: float) -> int:
+    """Количество усилений по ширине, если оно не задано."""
+    if width <= 1000:
+        return 1
+    return math.ceil((width - 1000) / 300) + 1
+
+
+def wide_frame_reinforcements(width: float) -> int:
+    """Количество усилений каркаса Оптима и Комфорт по ширине, если оно не задано."""
+    if width <= 1000:
+        return 0
+    return math.ceil((width - 80) / 300) - 1
+
+
+def _add_eco_frame(profile: BoxList, dimensions: dict, steps: int, coverings: list, last_step_depth):
+    """Каркас Эко целиком из профиля 20x20."""
+    width = dimensions['width']
+    step_height = dimensions['step_height']
+    step_depth = dimensions['step_depth']
+    t = dimensions['profile_thickness']
+    has_platform = dimensions['has_platform']
+    platform_depth = dimensions['platform_depth']
+    reinforcements_count = dimensions['reinforcements_count']
+
+    # 1. Горизонтальное основание на земле
+    total_depth = step_depth * (steps - 1) + last_step_depth - t
+    side_x = width / 2 - t / 2
+    for x in (-side_x, side_x):
+        profile.add((t, t, total_depth), (x, 0, total_depth / 2))
+    for z in (0, total_depth):
+        profile.add((width, t, t), (0, 0, z))
+
+    # 2. Горизонтальные ступени, их опоры и 3. вертикальные стойки
+    for i in range(steps):
+        is_last = i == steps - 1
+        depth = platform_depth if (is_last and has_platform) else step_depth
+        y = (i + 1) * step_height
+        z = i * step_depth
+        profile.add((width, t, t), (0, y, z))
+        profile.add((width, t, t), (0, y, z + depth - t))
+        for x in (-side_x, side_x):
+            profile.add((t, t, depth - t), (x, y, z + (depth - t) / 2))
+            profile.add((t, y, t), (x, y / 2, z))
+            if is_last:
+                profile.add((t, y, t), (x, y / 2, z + depth - t))
+
+    # Усиления
+    count = reinforcements_count or default_reinforcements(width)
+    spacing = (width - 2 * t) / (reinforcements_count + 1)
+    xs = [-width / 2 + t + spacing * (j + 1) for j in range(count)]
+    for i in range(steps):
+        is_last = i == steps - 1
+        depth = platform_depth if (is_last and has_platform) else step_depth
+        z = i * step_depth
+        for x in xs:
+            if i == 0:
+                profile.add((t, step_height, t), (x, step_height / 2, 0))
+            else:
+                profile.add((t, step_height, t), (x, i * step_height + step_height / 2, (i - 1) * step_depth + step_depth))
+            if coverings[i] is not None and coverings[i].boards:  # Горизонтальные усиления под досками
+                profile.add((t, t, depth - t), (x, (i + 1) * step_height, z + (depth - t) / 2))
+    if steps > 1:
+        stand_height = steps * step_height
+        for x in xs:
+            profile.add((t, stand_height, t), (x, stand_height / 2, (steps - 1) * step_depth + last_step_depth - t))
+
+
+def _add_wide_frame(profile: BoxList, dimensions: dict, steps: int, coverings: list, last_step_depth, optima: bool):
+    """Каркас Оптима и Комфорт: балки и стойки из профиля 40x20, усиления Оптимы - с доборами от 1500 мм."""
+    width = dimensions['width']
+    step_height = dimensions['step_height']
+    step_depth = dimensions['step_depth']
+    t = dimensions['profile_thickness']
+    t2 = WIDE_PROFILE
+    has_platform = dimensions['has_platform']
+    platform_depth = dimensions['platform_depth']
+    reinforcements_count = dimensions['reinforcements_count']
+    wide = optima and width >= 1500  # Средняя балка основания и высокая стойка Оптимы
+
+    # 1. Горизонтальное основание на земле (продольные балки отступают от края на 10 мм)
+    total_depth = step_depth * (steps - 1) + last_step_depth - t2
+    base_x = width / 2 - t / 2 - 10
+    for x in (-base_x, base_x):
+        profile.add((t2, t, total_depth), (x, 0, total_depth / 2))
+    for z in (10, total_depth + 10):
+        profile.add((width, t, t2), (0, 0, z))
+    if wide:
+        profile.add((t2, t, total_depth), (0, 0, total_depth / 2))
+
+    # 2. Горизонтальные ступени, их опоры и 3. вертикальные стойки
+    side_x = width / 2 - t2 / 2
+    for i in range(steps):
+        is_last = i == steps - 1
+        depth = platform_depth if (is_last and has_platform) else step_depth
+        y = (i + 1) * step_height
+        z = i * step_depth
+        profile.add((width, t, t2), (0, y, z + 10))
+        profile.add((width, t, t2), (0, y, z + depth - t - 10))
+        for x in (-side_x, side_x):
+            profile.add((t2, t, depth - t2), (x, y, z + (depth - t) / 2))
+            profile.add((t2, y, t), (x, y / 2, z))
+        if is_last:
+            for x in (-base_x, base_x):
+                profile.add((t2, y, t), (x, y / 2, z + depth - t))
+
+    # Усиления
+    count = reinforcements_count or wide_frame_reinforcements(width)
+    spacing = (width - 2 * t) / (reinforcements_count + 1)
+    xs = [-width / 2 + t + spacing * (j + 1) for j in range(count)]
+    for i in range(steps):
+        is_last = i == steps - 1
+        depth = platform_depth if (is_last and has_platform) else step_depth
+        z = i * step_depth
+        start_y = i * step_height - t / 2 if optima else i * step_height
+        for j, x in enumerate(xs):
+            if i == 0:
+                profile.add((t2, step_height, t), (x, step_height / 2, 0))
+            elif wide and j == 1 and i == 4:  # Вторая стойка пятой ступени - до основания
+                profile.add((t2, (i + 1) * step_height, t), (x, (i + 1) * step_height / 2, (i - 1) * step_depth + step_depth))
+            else:
+                profile.add((t2, step_height, t), (x, start_y + step_height / 2, (i - 1) * step_depth + step_depth))
+            if coverings[i] is not None and coverings[i].boards:  # Горизонтальные усиления под досками
+                profile.add((t2, t, depth - t), (x, (i + 1) * step_height, z + (depth - t) / 2))
+    if steps > 1:
+        stand_height = steps * step_height
+        stand_width = t2 if optima else t
+        for x in xs:
+            profile.add((stand_width, stand_height, t), (x, stand_height / 2, (steps - 1) * step_depth + last_step_depth - t))
+
+
+def _add_dpk_boards(parts: dict, width, depth, step_y, step_z, board_elevation):
+    """Доски ДПК ступени и по два болта на доску."""
+    full_boards = math.floor((depth + BOARD_GAP) / (BOARD_WIDTH + BOARD_GAP))
+    remaining = depth - (full_boards * BOARD_WIDTH + (full_boards - 1) * BOARD_GAP)
+    boards = [(BOARD_WIDTH, i * (BOARD_WIDTH + BOARD_GAP) + BOARD_WIDTH / 2 - BOARD_FRONT_OFFSET)
+              for i in range(full_boards)]
+    if remaining > 0:
+        boards.append((remaining, full_boards * (BOARD_WIDTH + BOARD_GAP) + remaining / 2 - BOARD_FRONT_OFFSET))
+    bolt_y = step_y + BOARD_HEIGHT + board_elevation + 1
+    for board_width, z in boards:
+        parts['board'].add((width, BOARD_HEIGHT, board_width), (0, step_y + BOARD_HEIGHT / 2 + board_elevation, step_z + z))
+        for x in (-width / 2 + 10, width / 2 - 10):
+            # Шляпка болта и тело болта
+            parts['bolt'].add((8, 2, 8), (x, bolt_y, step_z + z))
+            parts['bolt'].add((4, 30, 4), (x, bolt_y - 15, step_z + z))
+
+
+def _add_pvl_cover(pvl: BoxList, width, depth, step_y, step_z, t):
+    """Лист ПВЛ внутри каркаса ступени с сеткой линий."""
+    inner_width = width - 2 * t
+    pvl_depth = depth - 2 * t
+    center_z = step_z + t + pvl_depth / 2
+    pvl.add((inner_width, 2, pvl_depth), (0, step_y + 1, center_z))
+    for i in range(math.floor(inner_width / PVL_GRID_SIZE) + 1):
+        pvl.add((1, 3, pvl_depth), (-width / 2 + t + i * PVL_GRID_SIZE, step_y + 1, center_z))
+    for i in range(math.floor(pvl_depth / PVL_GRID_SIZE) + 1):
+        pvl.add((inner_width, 3, 1), (0, step_y + 1, step_z + t + i * PVL_GRID_SIZE))
+
+
+# Единичный куб с центром в начале координат: 24 вершины (по 4 на грань) и 36 индексов
+def _unit_cube():
+    positions, normals, indices = [], [], []
+    for axis in range(3):
+        for sign in (-1.0, 1.0):
+            normal = [0.0, 0.0, 0.0]
+            normal[axis] = sign
+            u, v = [a for a in range(3) if a != axis]
+            base = len(positions)
+            for du, dv in ((-0.5, -0.5), (0.5, -0.5), (0.5, 0.5), (-0.5, 0.5)):
+                p = [0.0, 0.0, 0.0]
+                p[axis] = 0.5 * sign
+                p[u], p[v] = du, dv
+                positions.append(p)
+                normals.append(normal)
+            # Обход против часовой стрелки, если смотреть снаружи
+            if (sign > 0) == ((axis + 1) % 3 == u):
+                indices += [base, base + 1, base + 2, base, base + 2, base + 3]
+            else:
+                indices += [base, base + 2, base + 1, base, base + 3, base + 2]
+    return (np.array(positions, dtype=np.float32), np.array(normals, dtype=np.float32),
+            np.array(indices, dtype=np.uint16))
+
+
+_CUBE = _unit_cube()
+
+# Константы glTF
+_FLOAT = 5126
+_UNSIGNED_SHORT = 5123
+_ARRAY_BUFFER = 34962
+_ELEMENT_ARRAY_BUFFER = 34963
+
+
+def _srgb_to_linear(color: int) -> list:
+    """Переводит цвет 0xRRGGBB в линейные компоненты baseColorFactor."""
+    result = []
+    for shift in (16, 8, 0):
+        c = ((color >> shift) & 0xFF) / 255
+        result.append(round(c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4, 6))
+    return result + [1.0]
+
+
+def build_glb(boxes: dict, frame_color: str = 'RAL9005') -> bytes:
+    """Собирает GLB: по одному узлу с инстансингом на каждый непустой тип деталей."""
+    colors = COLOR_MAPPING.get(frame_color, COLOR_MAPPING['RAL9005'])
+    part_colors = {"profile": colors['frame'], "board": colors['dpk'], "pvl": colors['frame'], "bolt": BOLT_COLOR}
+
+    chunks = []
+    buffer_views = []
+    accessors = []
+    offset = 0
+
+    def add_view(data: np.ndarray, target=None) -> int:
+        nonlocal offset
+        raw = data.tobytes()
+        view = {"buffer": 0, "byteOffset": offset, "byteLength": len(raw)}
+        if target:
+            view["target"] = target
+        buffer_views.append(view)
+        padding = (-len(raw)) % 4
+        chunks.append(raw + b'\0' * padding)
+        offset += len(raw) + padding
+        return len(buffer_views) - 1
+
+    def add_accessor(data: np.ndarray, component_type: int, type_: str, target=None, bounds=False) -> int:
+        accessor = {
+            "bufferView": add_view(data, target),
+            "componentType": component_type,
+            "count": len(data),
+            "type": type_,
+        }
+        if bounds:
+            accessor["min"] = data.min(axis=0).tolist()
+            accessor["max"] = data.max(axis=0).tolist()
+        accessors.append(accessor)
+        return len(accessors) - 1
+
+    positions, normals, indices = _CUBE
+    position = add_accessor(positions, _FLOAT, "VEC3", _ARRAY_BUFFER, bounds=True)
+    normal = add_accessor(normals, _FLOAT, "VEC3", _ARRAY_BUFFER)
+    index = add_accessor(indices, _UNSIGNED_SHORT, "SCALAR", _ELEMENT_ARRAY_BUFFER)
+
+    nodes, meshes, materials = [], [], []
+    for name in PART_TYPES:
+        centers, sizes = boxes[name]
+        if not len(centers):
+            continue
+        materials.append({
+            "name": name,
+            "pbrMetallicRoughness": {
+                "baseColorFactor": _srgb_to_linear(part_colors[name]),
+                "metallicFactor": 0.5 if name == "bolt" else 0.0,
+                "roughnessFactor": 0.4 if name == "bolt" else 0.8
+            }
+        })
+        meshes.append({
+            "name": name,
+            "primitives": [{"attributes": {"POSITION": position, "NORMAL": normal},
+                            "indices": index, "material": len(materials) - 1}]
+        })
+        nodes.append({
+            "name": name,
+            "mesh": len(meshes) - 1,
+            "extras": {"count": len(centers)},
+            "extensions": {"EXT_mesh_gpu_instancing": {"attributes": {
+                "TRANSLATION": add_accessor(centers, _FLOAT, "VEC3"),
+                "SCALE": add_accessor(sizes, _FLOAT, "VEC3"),
+            }}}
+        })
+
+    gltf = {
+        "asset": {"version": "2.0", "generator": "DPK3D geometry.py"},
+        "extensionsUsed": ["EXT_mesh_gpu_instancing"],
+        "scene": 0,
+        "scenes": [{"nodes": list(range(len(nodes)))}],
+        "nodes": nodes,
+        "meshes": meshes,
+        "materials": materials,
+        "buffers": [{"byteLength": offset}],
+        "bufferViews": buffer_views,
+        "accessors": accessors,
+    }
+    json_chunk = json.dumps(gltf, separators=(',', ':')).encode()
+    json_chunk += b' ' * ((-len(json_chunk)) % 4)
+    bin_chunk = b''.join(chunks)
+    total = 12 + 8 + len(json_chunk) + 8 + len(bin_chunk)
+    return b''.join([
+        struct.pack('<4sII', b'glTF', 2, total),
+        struct.pack('<I4s', len(json_chunk), b'JSON'), json_chunk,
+        struct.pack('<I4s', len(bin_chunk), b'BIN\0'), bin_chunk,
+    ])
+
+
+def stair_glb(result: dict, model: str = "eco") -> bytes:
+    """GLB-модель лестницы model по результату calculate_metal."""
+    dimensions = result['dimensions']
+    return build_glb(stair_boxes(dimensions, model), dimensions.get('frame_color', 'RAL9005'))
@@ -0,0 +1,17 @@
+"""Настройки gunicorn по умолчанию (gunicorn читает этот файл из рабочей папки): gunicorn app:app.
+
+Воркеры потоковые (gthread): поток живого пересчета /api/live и очередь admission.py занимают
+поток воркера, а не весь процесс. Количество процессов и потоков - WEB_WORKERS и WEB_THREADS
+из config.py, по ним же ограничиваются сессии живого пересчета.
+"""
+import os  # Для пути к проекту
+import sys  # Для пути импорта
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config  # Настройки приложения
+
+bind = os.getenv('WEB_BIND', '0.0.0.0:5000')
+workers = Config.WEB_WORKERS
+worker_class = 'gthread'
+threads = Config.WEB_THREADS
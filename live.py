@@ -0,0 +1,218 @@
+"""Канал живого пересчета для форм с ползунками (/api/live).
+
+Браузер открывает поток Server-Sent Events (GET /api/live) и первым событием session получает
+номер сессии; изменения формы отправляются POST /api/live/<сессия> с номером изменения seq.
+Сессия хранит только последнее состояние: пока поток занят расчетом или ждет отправки, новые
+изменения заменяют необработанное, поэтому считается лишь самое свежее, а промежуточные
+отбрасываются. Результат отправляется в поток событием result вместе с номером seq.
+
+Сессия живет в процессе, который держит поток. POST может попасть в другой процесс gunicorn:
+номер процесса входит в номер сессии, и изменение пересылается владельцу датаграммой через его
+UNIX-сокет в LIVE_SOCKET_DIR. Ожидающий поток не занимает процессор (ожидание на Condition), но
+занимает поток воркера, поэтому число сессий процесса ограничено (LIVE_MAX_SESSIONS - часть
+WEB_THREADS), браузер открывает поток только при первом изменении формы, а простаивающий поток
+закрывается событием idle, после которого EventSource не переподключается.
+"""
+import atexit  # Для удаления сокета при завершении процесса
+import glob  # Для поиска сокетов завершившихся процессов
+import json  # Для датаграмм и событий
+import os  # Для номера процесса и работы с файловой системой
+import secrets  # Для случайной части номера сессии
+import socket  # Для пересылки изменений между процессами
+import threading  # Для ожидания изменений и потока приема датаграмм
+from typing import Callable, Iterator, Optional
+
+from metrics import pid_alive
+
+RETRY_MS = 2000  # Пауза перед переподключением EventSource после обрыва
+MAX_DATAGRAM = 65536  # Максимальный размер пересылаемого изменения (байт)
+
+
+def event(name: str, data: str) -> str:
+    """Событие SSE с данными в одну строку (JSON не содержит переводов строк)."""
+    return f"event: {name}\ndata: {data}\n\n"
+
+
+class LiveSession:
+    """Сессия живого пересчета: последнее необработанное изменение и ожидание нового."""
+    __slots__ = ("id", "_condition", "_params", "_seq", "_coalesced", "closed")
+
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self._condition = threading.Condition()
+        self._params = None  # Последнее необработанное изменение
+        self._seq = -1  # Номер последнего принятого изменения
+        self._coalesced = 0  # Сколько изменений заменено до обработки
+        self.closed = False
+
+    def offer(self, seq: int, params) -> str:
+        """Принимает изменение; возвращает исход: accepted, coalesced (заменило необработанное) или stale."""
+        with self._condition:
+            if seq <= self._seq:
+                return "stale"  # Пришло позже более нового (например, через другой процесс)
+            outcome = "accepted"
+            if self._params is not None:
+                self._coalesced += 1
+                outcome = "coalesced"
+            self._params, self._seq = params, seq
+            self._condition.notify()
+            return outcome
+
+    def take(self, timeout: float) -> Optional[tuple]:
+        """Ждет изменение не дольше timeout секунд; возвращает (seq, params, заменено) или None."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._params is not None or self.closed, timeout)
+            if self._params is None:
+                return None
+            update = (self._seq, self._params, self._coalesced)
+            self._params, self._coalesced = None, 0
+            return update
+
+    def close(self) -> None:
+        with self._condition:
+            self.closed = True
+            self._condition.notify()
+
+
+class LiveHub:
+    """Сессии живого пересчета текущего процесса и пересылка изменений между процессами."""
+
+    def __init__(self, socket_dir: str = None, max_sessions: int = 500, metrics=None):
+        self.socket_dir = socket_dir
+        self.max_sessions = max_sessions
+        self.metrics = metrics
+        self.reset()
+        if socket_dir:
+            os.makedirs(socket_dir, exist_ok=True)
+            self._remove_stale()
+            atexit.register(self._unlink)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self) -> None:
+        """Сбрасывает состояние (в дочернем процессе после fork сессии и сокет родителя не наследуются)."""
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.pid = os.getpid()
+        self._socket = None
+
+    def socket_path(self, pid: int) -> str:
+        return os.path.join(self.socket_dir, f"live-{pid}.sock")
+
+    def open(self) -> LiveSession:
+        """Создает сессию; при превышении max_sessions - OverflowError."""
+        with self.lock:
+            if len(self.sessions) >= self.max_sessions:
+                raise OverflowError("Слишком много открытых сессий живого пересчета")
+            if self.socket_dir and self._socket is None:
+                self._listen()
+            session = LiveSession(f"{self.pid}.{secrets.token_urlsafe(12)}")
+            self.sessions[session.id] = session
+        self._count('dpk_live_sessions_total', event='opened')
+        return session
+
+    def close(self, session: LiveSession) -> None:
+        """Закрывает сессию (повторный вызов ничего не делает)."""
+        session.close()
+        with self.lock:
+            removed = self.sessions.pop(session.id, None)
+        if removed is not None:
+            self._count('dpk_live_sessions_total', event='closed')
+
+    def deliver(self, session_id: str, seq: int, params) -> Optional[str]:
+        """Передает изменение сессии (своей или другого процесса); None, если сессия не найдена."""
+        pid, _, _ = session_id.partition('.')
+        if not pid.isdigit():
+            return None
+        if int(pid) == self.pid:
+            session = self.sessions.get(session_id)
+            outcome = session.offer(seq, params) if session is not None else None
+        else:
+            outcome = self._forward(int(pid), session_id, seq, params)
+        if outcome is not None:
+            self._count('dpk_live_updates_total', outcome=outcome)
+        return outcome
+
+    def stream(self, session: LiveSession, compute: Callable[[int, object, int], str],
+               heartbeat: float, idle_timeout: float) -> Iterator[str]:
+        """Поток событий сессии: session, затем result/calc-error на каждое обработанное изменение.
+
+        Пока изменений нет, раз в heartbeat секунд отправляется комментарий (держит соединение
+        через прокси и выявляет закрытые соединения); после idle_timeout секунд простоя поток
+        завершается событием idle, и клиент закрывает EventSource до следующего изменения.
+        """
+        try:
+            yield f"retry: {RETRY_MS}\n" + event("session", json.dumps({"session": session.id}))
+            idle = 0.0
+            while not session.closed:
+                update = session.take(heartbeat)
+                if update is None:
+                    if session.closed:
+                        return
+                    idle += heartbeat
+                    if idle >= idle_timeout:
+                        yield event("idle", "{}")
+                        return
+                    yield ": ping\n\n"
+                    continue
+                idle = 0.0
+                yield compute(*update)
+        finally:
+            self.close(session)
+
+    def _forward(self, pid: int, session_id: str, seq: int, params) -> Optional[str]:
+        """Пересылает изменение процессу-владельцу сессии."""
+        if not self.socket_dir:
+            return None
+        data = json.dumps({"session": session_id, "seq": seq, "params": params}).encode()
+        if len(data) > MAX_DATAGRAM:
+            raise ValueError("Слишком большое изменение")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            try:
+                sock.sendto(data, self.socket_path(pid))
+            except (FileNotFoundError, ConnectionRefusedError):
+                return None  # Процесс-владелец завершился
+        return "forwarded"
+
+    def _listen(self) -> None:
+        """Открывает сокет процесса и запускает поток приема пересланных изменений."""
+        path = self.socket_path(self.pid)
+        if os.path.exists(path):
+            os.unlink(path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(path)
+        self._socket = sock
+        threading.Thread(target=self._receive, args=(sock,), name="live-receiver", daemon=True).start()
+
+    def _receive(self, sock: socket.socket) -> None:
+        while True:
+            try:
+                message = json.loads(sock.recv(MAX_DATAGRAM))
+            except OSError:
+                return  # Сокет закрыт
+            except ValueError:
+                continue
+            session = self.sessions.get(message.get("session"))
+            if session is not None:
+                self._count('dpk_live_updates_total', outcome=session.offer(message["seq"], message["params"]))
+
+    def _count(self, name: str, **labels) -> None:
+        if self.metrics is not None:
+            self.metrics.inc(name, **labels)
+
+    def _unlink(self) -> None:
+        if self._socket is not None:
+            try:
+                os.unlink(self.socket_path(self.pid))
+            except OSError:
+                pass
+
+    def _remove_stale(self) -> None:
+        """Удаляет сокеты завершившихся процессов."""
+        for path in glob.glob(os.path.join(self.socket_dir, "live-*.sock")):
+            pid = os.path.basename(path)[5:-5]
+            if pid.isdigit() and int(pid) != os.getpid() and not pid_alive(int(pid)):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
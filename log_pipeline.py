@@ -0,0 +1,174 @@
+"""Асинхронное структурированное логирование.
+
+Обработчики запросов только кладут запись в ограниченную очередь; форматирование в JSON
+и запись на диск выполняет фоновый поток. Каждый процесс (воркер gunicorn) пишет в свой
+файл app-<pid>.log, который ротируется по размеру и по времени. Файлы завершившихся процессов
+удаляются при запуске, когда становятся старше orphan_max_age.
+"""
+import atexit  # Для сброса очереди при завершении процесса
+import copy  # Для копирования записи перед постановкой в очередь
+import glob  # Для поиска файлов завершившихся процессов
+import json  # Для записи логов в формате JSON Lines
+import logging  # Стандартная система логирования
+import os  # Для работы с файловой системой и номером процесса
+import queue  # Очередь между обработчиками запросов и фоновым потоком
+import time  # Для ротации по времени
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from metrics import pid_alive
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись как одну строку JSON; поля из extra={'fields': {...}} добавляются как есть."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SizeTimeRotatingFileHandler(RotatingFileHandler):
+    """Файловый обработчик с ротацией по размеру (max_bytes) и по времени (interval, секунды)."""
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int, interval: float = 0):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.interval = interval
+        self.rollover_at = time.time() + interval if interval else None
+
+    def shouldRollover(self, record: logging.LogRecord) -> int:
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return 1
+        return super().shouldRollover(record)
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        if self.interval:
+            self.rollover_at = time.time() + self.interval
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Кладет записи в ограниченную очередь; при переполнении запись отбрасывается, а не блокирует запрос."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0  # Количество отброшенных записей
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Подставляем аргументы в сообщение, а JSON формирует уже фоновый поток
+        record = copy.copy(record)  # Запись могут использовать и другие обработчики
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Очередь, фоновый поток записи и файл текущего процесса; после fork перезапускается в дочернем процессе."""
+
+    def __init__(self, directory: str, max_bytes: int, backup_count: int, interval: float,
+                 queue_size: int, level: int = logging.INFO, orphan_max_age: float = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.interval = interval
+        self.queue_size = queue_size
+        self.handler = DroppingQueueHandler(queue.Queue(queue_size))
+        self.handler.setLevel(level)
+        self.listener = None
+        self.file_handler = None
+        if orphan_max_age is not None:
+            self._remove_stale(orphan_max_age)
+        self.start()
+        atexit.register(self.stop)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    @property
+    def path(self) -> str:
+        """Файл лога текущего процесса."""
+        return os.path.join(self.directory, f"app-{os.getpid()}.log")
+
+    def start(self) -> None:
+        """Открывает файл текущего процесса и запускает фоновый поток записи."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.file_handler = SizeTimeRotatingFileHandler(self.path, self.max_bytes, self.backup_count, self.interval)
+        self.file_handler.setFormatter(JsonFormatter())
+        self.listener = QueueListener(self.handler.queue, self.file_handler)
+        self.listener.start()
+
+    def stop(self) -> None:
+        """Дописывает оставшиеся в очереди записи и останавливает фоновый поток."""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        if self.file_handler is not None:
+            self.file_handler.close()
+            self.file_handler = None
+
+    def flush(self) -> None:
+        """Дожидается записи всех поставленных в очередь записей (для тестов и завершения работы)."""
+        self.stop()
+        self.start()
+
+    def _remove_stale(self, max_age: float) -> None:
+        """Удаляет файлы (и их резервные копии) завершившихся процессов, не менявшиеся дольше max_age секунд."""
+        cutoff = time.time() - max_age
+        for path in glob.glob(os.path.join(self.directory, "app-*.log*")):
+            pid = os.path.basename(path)[4:].split('.', 1)[0]
+            if not pid.isdigit() or int(pid) == os.getpid() or pid_alive(int(pid)):
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+            except OSError:
+                pass
+
+    def _after_fork(self) -> None:
+        # Поток записи не переживает fork: дочерний процесс получает свою очередь, поток и файл
+        self.listener = None
+        self.file_handler = None
+        self.handler.queue = queue.Queue(self.queue_size)
+        self.handler.dropped = 0
+        self.start()
+
+
+def setup_logging(app) -> LogPipeline:
+    """Подключает асинхронное логирование к приложению по настройкам LOG_*."""
+    level = logging.getLevelName(app.config['LOG_LEVEL'])
+    pipeline = LogPipeline(
+        app.config['LOG_DIR'], app.config['LOG_MAX_BYTES'], app.config['LOG_BACKUP_COUNT'],
+        app.config['LOG_ROTATE_INTERVAL'], app.config['LOG_QUEUE_SIZE'], level, app.config['LOG_ORPHAN_MAX_AGE']
+    )
+    app.logger.addHandler(pipeline.handler)
+    app.logger.setLevel(level)
+    app.extensions['log_pipeline'] = pipeline
+    return pipeline
+
+
+def truncate_payload(text: str, limit: int) -> str:
+    """Обрезает тело запроса до limit символов (0 - тело не пишется)."""
+    if limit <= 0:
+        return ""
+    if len(text) <= limit:
+        return text
+    return text[:limit] + f"...(+{len(text) - limit})"
@@ -0,0 +1,141 @@
+"""Реестр материалов ступеней.
+
+Поведение материала задается строкой таблицы MATERIAL_TABLE: глубина ступени, занижение каркаса
+под покрытие, подъем доски, окраска покрытия, количество досок и болтов и отличия первой ступени.
+При первом обращении (и при изменении настроек) каждая строка компилируется в план MaterialPlan
+с уже подставленными константами из настроек; расчеты (calculate_metal, пакетный движок, раскрой,
+геометрия) выполняют план и не сравнивают названия материалов.
+
+Новый материал добавляется строкой таблицы без изменения расчетов.
+"""
+from dataclasses import dataclass  # Для строк таблицы и планов
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class StepSpec:
+    """Свойства покрытия ступени."""
+    reduced: bool  # Каркас занижается на DPK_REDUCTION под покрытие
+    board_elevation: int  # Подъем покрытия над каркасом (мм)
+    boards: bool  # Покрытие из досок (доски, горизонтальные усиления и усиления глубины)
+    painted: bool  # Покрытие окрашивается (лист ПВЛ, обе стороны)
+
+
+@dataclass(frozen=True)
+class MaterialSpec:
+    """Строка таблицы материалов."""
+    name: str  # Название материала в запросах
+    depth_key: str  # Настройка с глубиной ступени
+    step: StepSpec  # Покрытие ступеней
+    first_step: Optional[StepSpec] = None  # Покрытие первой ступени, если оно другое
+    boards_per_step: int = 0  # Досок на ступень с досками
+    bolts_per_step: int = 4  # Болтов (и гаек) на ступень
+    unbolted_steps: int = 0  # Сколько первых ступеней без болтов
+    reduce_back: bool = False  # Занижать заднее усиление на DPK_REDUCTION
+
+    def step_spec(self, index: int) -> StepSpec:
+        """Покрытие ступени с номером index (с нуля)."""
+        return self.first_step if index == 0 and self.first_step is not None else self.step
+
+
+BOARDS = StepSpec(reduced=True, board_elevation=10, boards=True, painted=False)  # Доска ДПК
+SHEET = StepSpec(reduced=False, board_elevation=0, boards=False, painted=True)  # Лист ПВЛ
+
+# Таблица материалов (порядок задает коды материалов в пакетном движке и сетке цен)
+MATERIAL_TABLE = (
+    # У листов ПВЛ болты считаются для всех ступеней, кроме первой
+    MaterialSpec("ПВЛ", "PVL_DEPTH", SHEET, unbolted_steps=1),
+    MaterialSpec("ДПК", "DPK_DEPTH", BOARDS, boards_per_step=2, reduce_back=True),
+    # Первая ступень - лист ПВЛ, остальные - доска ДПК
+    MaterialSpec("ДПК+1 ПВЛ", "DPK_DEPTH", BOARDS, first_step=SHEET, boards_per_step=2, unbolted_steps=1),
+)
+MATERIALS = tuple(spec.name for spec in MATERIAL_TABLE)  # Названия материалов
+MATERIAL_SPECS = {spec.name: spec for spec in MATERIAL_TABLE}  # Название -> строка таблицы
+MATERIAL_CODES = {name: code for code, name in enumerate(MATERIALS)}  # Название -> код
+
+# Настройки, которые подставляются в планы
+PLAN_CONFIG_KEYS = ('DPK_DEPTH', 'PVL_DEPTH', 'DPK_REDUCTION')
+
+
+@dataclass(frozen=True)
+class MaterialPlan:
+    """Скомпилированный план расчета для материала (константы уже подставлены).
+
+    Величины first_* относятся к первой ступени, остальные - ко всем прочим ступеням;
+    у материалов без особой первой ступени они совпадают.
+    """
+    __slots__ = ("name", "code", "step_depth", "split_first", "reduction", "first_reduction",
+                 "board_elevation", "first_board_elevation", "boards", "first_boards",
+                 "painted_all", "painted_first", "has_boards", "has_painted", "boards_per_step",
+                 "bare_steps", "bolts_per_step", "unbolted_steps", "back_reduction")
+    name: str
+    code: int
+    step_depth: int  # Глубина ступени (мм)
+    split_first: bool  # Первая ступень отличается от остальных
+    reduction: int  # Занижение каркаса ступени (мм)
+    first_reduction: int
+    board_elevation: int  # Подъем покрытия (мм)
+    first_board_elevation: int
+    boards: bool  # Ступень с досками
+    first_boards: bool
+    painted_all: bool  # Окрашиваемое покрытие на всех ступенях
+    painted_first: bool  # Окрашиваемое покрытие на первой ступени
+    has_boards: bool  # Есть ступени с досками (указывается цвет доски)
+    has_painted: bool  # Есть окрашиваемое покрытие
+    boards_per_step: int
+    bare_steps: int  # Ступеней без досок (у материалов с досками)
+    bolts_per_step: int
+    unbolted_steps: int
+    back_reduction: int  # Занижение заднего усиления (мм)
+
+    def step_reduction(self, index: int) -> int:
+        """Занижение каркаса ступени с номером index (с нуля)."""
+        return self.first_reduction if index == 0 else self.reduction
+
+    def step_boards(self, index: int) -> bool:
+        """Есть ли доски на ступени с номером index (с нуля)."""
+        return self.first_boards if index == 0 else self.boards
+
+
+def compile_plan(spec: MaterialSpec, code: int, config) -> MaterialPlan:
+    """Компилирует строку таблицы в план с константами из настроек."""
+    reduction = config['DPK_REDUCTION']
+    first = spec.first_step or spec.step
+    return MaterialPlan(
+        name=spec.name,
+        code=code,
+        step_depth=config[spec.depth_key],
+        split_first=spec.first_step is not None,
+        reduction=reduction if spec.step.reduced else 0,
+        first_reduction=reduction if first.reduced else 0,
+        board_elevation=spec.step.board_elevation,
+        first_board_elevation=first.board_elevation,
+        boards=spec.step.boards,
+        first_boards=first.boards,
+        painted_all=spec.step.painted,
+        painted_first=first.painted,
+        has_boards=spec.step.boards or first.boards,
+        has_painted=spec.step.painted or first.painted,
+        boards_per_step=spec.boards_per_step,
+        bare_steps=1 if spec.step.boards and not first.boards else 0,
+        bolts_per_step=spec.bolts_per_step,
+        unbolted_steps=spec.unbolted_steps,
+        back_reduction=reduction if spec.reduce_back else 0,
+    )
+
+
+_compiled = {}  # Снимок настроек -> планы материалов
+
+
+def material_plans(config) -> dict:
+    """Планы всех материалов (название -> MaterialPlan) для текущих настроек.
+
+    Планы компилируются один раз на снимок настроек, поэтому изменение DPK_DEPTH и других
+    констант учитывается без перезапуска.
+    """
+    key = tuple(config[name] for name in PLAN_CONFIG_KEYS)
+    plans = _compiled.get(key)
+    if plans is None:
+        plans = {spec.name: compile_plan(spec, code, config) for code, spec in enumerate(MATERIAL_TABLE)}
+        _compiled[key] = plans
+    return plans
@@ -0,0 +1,230 @@
+"""Метрики приложения в формате Prometheus.
+
+Каждый процесс копит счетчики и гистограммы в памяти и не чаще раза в METRICS_FLUSH_INTERVAL
+секунд сохраняет снимок в METRICS_DIR/metrics-<pid>.json. /metrics суммирует снимки всех
+процессов, поэтому при нескольких воркерах gunicorn любой из них отдает общие значения.
+"""
+import atexit  # Для сохранения снимка при завершении процесса
+import bisect  # Для поиска корзины гистограммы
+import cProfile  # Для профилирования медленных запросов
+import json  # Для снимков метрик процесса
+import os  # Для работы с файловой системой и номером процесса
+import random  # Для выборочного профилирования
+import threading  # Для блокировки при обновлении из нескольких потоков
+import time  # Для интервала сохранения снимков
+
+# Границы корзин гистограмм времени (секунды)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Описание метрик: имя -> (тип, описание)
+METRICS = {
+    "dpk_requests_total": ("counter", "Количество запросов по обработчику и коду ответа"),
+    "dpk_request_seconds": ("histogram", "Время обработки запроса по обработчику"),
+    "dpk_stage_seconds": ("histogram", "Время этапов расчета: parse, validate, geometry, materials, structure, serialize, logging"),
+    "dpk_calculations_total": ("counter", "Количество расчетов /api/calculate по материалу"),
+    "dpk_errors_total": ("counter", "Количество ошибок по обработчику и типу ошибки"),
+    "dpk_slow_profiles_total": ("counter", "Количество сохраненных профилей медленных запросов"),
+    "dpk_live_sessions_total": ("counter", "Открытые и закрытые сессии живого пересчета"),
+    "dpk_live_updates_total": ("counter", "Изменения живого пересчета: accepted, coalesced, stale, forwarded"),
+    "dpk_admission_total": ("counter", "Запросы /api/calculate: merged (объединены), queued (ждали), shed (отказ 503)"),
+    "dpk_quotes_total": ("counter", "Котировки истории расчетов: stored, dropped, failed"),
+    "dpk_previews_total": ("counter", "Превью лестниц: hit (из дискового кэша), rendered"),
+}
+
+
+def _key(name: str, labels: dict) -> tuple:
+    """Ключ метрики: имя и упорядоченные пары меток."""
+    return name, tuple(sorted(labels.items()))
+
+
+class Metrics:
+    """Счетчики и гистограммы текущего процесса со снимками для агрегации по процессам."""
+
+    def __init__(self, directory: str = None, flush_interval: float = 1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.counters = {}  # Ключ -> значение
+        self.histograms = {}  # Ключ -> [счетчики корзин..., +Inf, сумма]
+        self.flushed_at = 0.0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._remove_stale()
+            atexit.register(self.flush)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self) -> None:
+        """Обнуляет метрики (в дочернем процессе после fork метрики родителя не наследуются)."""
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.flushed_at = 0.0
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Увеличивает счетчик."""
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """Добавляет значение в гистограмму."""
+        key = _key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+            histogram[bisect.bisect_left(BUCKETS, seconds)] += 1
+            histogram[-1] += seconds
+
+    def snapshot(self) -> dict:
+        """Снимок метрик процесса в виде, пригодном для JSON."""
+        with self.lock:
+            return {
+                "counters": [[name, labels, value] for (name, labels), value in self.counters.items()],
+                "histograms": [[name, labels, list(values)] for (name, labels), values in self.histograms.items()],
+            }
+
+    @property
+    def path(self) -> str:
+        """Файл снимка текущего процесса."""
+        return os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+
+    def maybe_flush(self) -> None:
+        """Сохраняет снимок, если с прошлого сохранения прошло больше flush_interval секунд."""
+        if self.directory and time.monotonic() - self.flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Атомарно записывает снимок процесса в файл."""
+        self.flushed_at = time.monotonic()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass  # Метрики не должны прерывать обработку запроса; повторим при следующем сохранении
+
+    def collect(self) -> list:
+        """Снимки всех процессов: текущего - из памяти, остальных - из файлов."""
+        snapshots = [self.snapshot()]
+        if not self.directory:
+            return snapshots
+        own = os.path.basename(self.path)
+        for name in os.listdir(self.directory):
+            if name == own or not (name.startswith('metrics-') and name.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Файл мог быть удален или заменен во время чтения
+        return snapshots
+
+    def render(self) -> str:
+        """Метрики всех процессов в текстовом формате Prometheus."""
+        counters, histograms = {}, {}
+        for snapshot in self.collect():
+            for name, labels, value in snapshot["counters"]:
+                key = _key(name, dict(labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, values in snapshot["histograms"]:
+                key = _key(name, dict(labels))
+                total = histograms.get(key)
+                histograms[key] = values if total is None else [a + b for a, b in zip(total, values)]
+
+        lines = []
+        for name, (kind, description) in METRICS.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ("+Inf",), values):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {values[-1]!r}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def _remove_stale(self) -> None:
+        # Удаляем снимки процессов, которые уже не работают (например, от прошлого запуска)
+        for name in os.listdir(self.directory):
+            if not (name.startswith('metrics-') and name.endswith('.json')):
+                continue
+            try:
+                pid = int(name[len('metrics-'):-len('.json')])
+            except ValueError:
+                continue
+            if pid != os.getpid() and not pid_alive(pid):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+
+def pid_alive(pid: int) -> bool:
+    """Проверяет, существует ли процесс с номером pid."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _labels(labels: tuple) -> str:
+    """Метки в синтаксисе Prometheus."""
+    if not labels:
+        return ""
+    escaped = (f'{k}="{_escape(str(v))}"' for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value: str) -> str:
+    """Экранирует значение метки."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    """Число без лишней дробной части."""
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class SlowRequestProfiler:
+    """Профилирует запросы cProfile и сохраняет профиль, если запрос оказался медленнее порога."""
+
+    def __init__(self, directory: str, threshold_ms: float, sample_rate: float = 1.0):
+        self.directory = directory
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        """Включает профилировщик для запроса (с вероятностью sample_rate) или возвращает None."""
+        if random.random() >= self.sample_rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return None  # В этом потоке уже работает другой профилировщик
+        return profile
+
+    def finish(self, profile, seconds: float, name: str):
+        """Выключает профилировщик; для медленного запроса сохраняет профиль и возвращает путь к файлу."""
+        profile.disable()
+        if seconds < self.threshold:
+            return None
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.directory, f"{stamp}-{os.getpid()}-{name}-{int(seconds * 1000)}ms.prof")
+        profile.dump_stats(path)
+        return path
@@ -0,0 +1,234 @@
+"""Подбор конфигурации лестницы под заданные высоту и ширину (/api/optimize).
+
+Перебираются количество ступеней, материал, платформа (наличие и глубина) и количество усилений.
+Перебор сокращается до расчета:
+- количество ступеней берется только из диапазона удобной высоты ступени;
+- варианты, не помещающиеся в максимальную глубину, отбрасываются по формуле глубины;
+- из допустимых количеств усилений берется наименьшее: каждое усиление добавляет металл
+  и краску и не меняет количество досок, поэтому из прочных вариантов меньшее количество лучше;
+- прочность проверяется векторно (structure.evaluate): если каркас с наименьшим количеством
+  не проходит, берется наименьшее из разрешенных количеств не меньше рекомендованного
+  reinforcements_required, а вариант, для которого такого количества нет, отбрасывается.
+Оставшиеся варианты считаются одним вызовом векторного движка (batch.compute_arrays), из них
+выбираются Парето-оптимальные по длине металла, весу краски и количеству досок.
+"""
+import math  # Для границ количества ступеней
+from typing import Optional
+
+import numpy as np  # Для векторного расчета вариантов
+
+from batch import compute_arrays, plan_columns, round2
+from geometry import default_reinforcements
+from materials import MATERIAL_CODES, MATERIALS, material_plans
+from structure import evaluate as evaluate_structure
+
+# Критерии (все минимизируются)
+OBJECTIVES = ("total_length_mm", "paint_weight", "dpk_boards")
+
+
+def _number(data: dict, name: str, default=None) -> Optional[float]:
+    value = data.get(name, default)
+    if value is None:
+        return None
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"Некорректное значение {name}")
+    return value
+
+
+def parse_request(data: dict, config) -> dict:
+    """Проверяет запрос подбора и возвращает ограничения поиска.
+
+    Обязательны width и height; остальные ключи необязательны: step_height_min/step_height_max
+    (удобная высота ступени, мм), materials, has_platform (true/false, без ключа - оба варианта),
+    platform_depths, max_footprint (максимальная глубина лестницы, мм), reinforcements_counts,
+    paint_consumption и limit.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Ожидается объект с параметрами подбора")
+    width = _number(data, 'width')
+    height = _number(data, 'height')
+    if width is None or height is None:
+        raise ValueError("Параметры width и height обязательны")
+    if not config['MIN_WIDTH'] <= width <= config['MAX_WIDTH']:
+        raise ValueError(f"Ширина {width} мм вне допустимого диапазона: "
+                         f"{config['MIN_WIDTH']}..{config['MAX_WIDTH']} мм")
+    if not config['MIN_HEIGHT'] <= height <= config['MAX_HEIGHT']:
+        raise ValueError(f"Высота {height} мм вне допустимого диапазона: "
+                         f"{config['MIN_HEIGHT']}..{config['MAX_HEIGHT']} мм")
+    step_min = _number(data, 'step_height_min', config['OPTIMIZE_STEP_HEIGHT_MIN'])
+    step_max = _number(data, 'step_height_max', config['OPTIMIZE_STEP_HEIGHT_MAX'])
+    if not 0 < step_min <= step_max:
+        raise ValueError("Некорректный диапазон высоты ступени")
+    # Диапазон ограничивается допустимой высотой ступени: это ограничивает и количество вариантов
+    step_min = max(step_min, config['MIN_STEP_HEIGHT'])
+    step_max = min(step_max, config['MAX_STEP_HEIGHT'])
+    if step_min > step_max:
+        raise ValueError(f"Диапазон высоты ступени вне допустимого: "
+                         f"{config['MIN_STEP_HEIGHT']}..{config['MAX_STEP_HEIGHT']} мм")
+
+    materials = data.get('materials', list(MATERIALS))
+    if not isinstance(materials, list) or not materials:
+        raise ValueError("materials должен быть непустым массивом")
+    unknown = [m for m in materials if not isinstance(m, str) or m not in MATERIAL_CODES]
+    if unknown:
+        raise ValueError(f"Неизвестные материалы: {unknown}. Допустимые: {', '.join(MATERIALS)}")
+
+    has_platform = data.get('has_platform')
+    if has_platform not in (None, True, False):
+        raise ValueError("has_platform должен быть true, false или отсутствовать")
+    platform_depths = [float(d) for d in data.get('platform_depths', config['OPTIMIZE_PLATFORM_DEPTHS'])]
+    if any(not 0 < d < float('inf') for d in platform_depths):
+        raise ValueError("Глубины платформы должны быть положительными")
+    platforms = []  # Варианты (наличие платформы, глубина)
+    if has_platform is not True:
+        platforms.append((False, 0.0))
+    if has_platform is not False:
+        platforms.extend((True, d) for d in sorted(set(platform_depths)))
+    if not platforms:
+        raise ValueError("Нет вариантов платформы: задайте platform_depths")
+
+    # Без явного списка разрешены количества от рекомендованного для ширины до STRUCT_MAX_REINFORCEMENTS
+    default = default_reinforcements(width)
+    counts = [int(c) for c in data.get('reinforcements_counts',
+                                       range(default, max(default, config['STRUCT_MAX_REINFORCEMENTS']) + 1))]
+    if not counts or min(counts) < 0:
+        raise ValueError("reinforcements_counts должен содержать неотрицательные числа")
+    max_footprint = _number(data, 'max_footprint')
+    limit = int(data.get('limit', config['OPTIMIZE_MAX_OPTIONS']))
+    if limit < 1:
+        raise ValueError("limit должен быть положительным")
+    return {
+        "width": width, "height": height, "step_min": step_min, "step_max": step_max,
+        "materials": list(dict.fromkeys(materials)), "platforms": platforms,
+        "reinforcements": min(counts), "counts": sorted(set(counts)), "max_footprint": max_footprint,
+        "paint_consumption": _number(data, 'paint_consumption', 110), "limit": limit,
+    }
+
+
+def candidates(c: dict, config) -> dict:
+    """Допустимые варианты (массивы по одному элементу на вариант) после сокращения перебора."""
+    height = c['height']
+    low = max(1, math.ceil(height / c['step_max']))
+    high = math.floor(height / c['step_min'])
+    steps = [s for s in range(low, high + 1) if c['step_min'] <= height / s <= c['step_max']]
+    if len(steps) * len(c['materials']) * len(c['platforms']) > config['OPTIMIZE_MAX_CANDIDATES']:
+        raise ValueError("Слишком много вариантов: сузьте диапазон высоты ступени или список платформ")
+    plans = material_plans(config)
+    rows = []
+    for material in c['materials']:
+        step_depth = plans[material].step_depth
+        for s in steps:
+            for has_platform, platform_depth in c['platforms']:
+                # Глубина лестницы: все ступени, кроме последней, плюс последняя ступень или площадка
+                footprint = step_depth * (s - 1) + (platform_depth if has_platform else step_depth)
+                if c['max_footprint'] is not None and footprint > c['max_footprint']:
+                    continue
+                rows.append((s, MATERIAL_CODES[material], has_platform, platform_depth, footprint))
+    n = len(rows)
+    columns = list(zip(*rows)) if rows else [()] * 5
+    return {
+        "steps": np.array(columns[0], dtype=np.int64),
+        "code": np.array(columns[1], dtype=np.int64),
+        "has_platform": np.array(columns[2], dtype=bool),
+        "platform_depth": np.array(columns[3], dtype=np.float64),
+        "footprint": np.array(columns[4], dtype=np.float64),
+        "width": np.full(n, c['width']),
+        "height": np.full(n, c['height']),
+        "reinforcements": np.full(n, c['reinforcements'], dtype=np.int64),
+        "paint_consumption": np.full(n, c['paint_consumption']),
+    }
+
+
+def reinforce(v: dict, counts: list, config) -> dict:
+    """Количество усилений каждого варианта по проверке прочности; непрочные варианты отбрасываются.
+
+    Берется наименьшее из разрешенных запросом количеств counts, при котором каркас проходит проверку
+    (коэффициент использования не растет с количеством усилений).
+    """
+    allowed = np.array(counts, dtype=np.int64)
+    step_depth = plan_columns(config)['step_depth'][v['code']]
+    last_depth = np.where(v['has_platform'], v['platform_depth'], step_depth)
+
+    def check(reinforcements):
+        return evaluate_structure(v['width'], v['height'], v['steps'], step_depth, last_depth, reinforcements, config)
+
+    smallest = check(np.full(len(v['steps']), allowed[0]))
+    required = smallest['reinforcements_required']
+    # Наименьшее разрешенное не меньше рекомендованного; если рекомендации нет - наибольшее разрешенное
+    index = np.minimum(np.searchsorted(allowed, required), len(allowed) - 1)
+    chosen = np.where(smallest['utilization'] <= 1, allowed[0], np.where(required > 0, allowed[index], allowed[-1]))
+    utilization = check(chosen)['utilization']
+    keep = utilization <= 1
+    v = {name: values[keep] for name, values in v.items()}
+    v['reinforcements'] = chosen[keep]
+    v['utilization'] = utilization[keep]
+    return v
+
+
+def pareto_mask(values: np.ndarray) -> np.ndarray:
+    """Маска строк, не доминируемых другими (все столбцы минимизируются).
+
+    Столбцов три, последний принимает немного разных значений (количество досок). Строки
+    сортируются по первым двум столбцам; доминировать над строкой может только строка раньше нее
+    в этом порядке, поэтому для каждого значения последнего столбца достаточно одного прохода с
+    накопленным минимумом второго столбца: O(n * k) вместо попарного сравнения O(n²).
+    """
+    if not len(values):
+        return np.zeros(0, dtype=bool)
+    # Одинаковые строки не доминируют друг над другом: проверяется каждая различная строка один раз
+    unique, inverse = np.unique(values, axis=0, return_inverse=True)
+    order = np.lexsort((unique[:, 2], unique[:, 1], unique[:, 0]))
+    second, third = unique[order, 1], unique[order, 2]
+    dominated = np.zeros(len(unique), dtype=bool)
+    for level in np.unique(third):
+        # Наименьшее значение второго столбца среди предыдущих строк с третьим столбцом не больше level
+        candidates = np.where(third <= level, second, np.inf)
+        best = np.concatenate(([np.inf], np.minimum.accumulate(candidates)[:-1]))
+        current = third == level
+        dominated[current] = best[current] <= second[current]
+    mask = np.empty(len(unique), dtype=bool)
+    mask[order] = ~dominated
+    return mask[inverse.reshape(-1)]
+
+
+def optimize(data: dict, config) -> dict:
+    """Подбирает Парето-оптимальные конфигурации по запросу /api/optimize."""
+    c = parse_request(data, config)
+    v = candidates(c, config)
+    n = len(v['steps'])
+    v = reinforce(v, c['counts'], config)
+    if not len(v['steps']):
+        return {"evaluated": n, "pareto": 0, "options": []}
+    columns = compute_arrays(v['width'], v['height'], v['steps'], v['code'], v['has_platform'],
+                             v['platform_depth'], v['reinforcements'], v['paint_consumption'], config)
+    # Критерии в том виде, в каком их возвращает /api/calculate
+    total_mm = np.rint(columns['total_length']).astype(np.int64)
+    paint = round2(columns['total_paint_weight'])
+    boards = columns['dpk_boards'].astype(np.int64)
+    values = np.column_stack([total_mm, paint, boards]).astype(np.float64)
+    mask = pareto_mask(values)
+    front = np.flatnonzero(mask)
+    front = front[np.lexsort((boards[front], paint[front], total_mm[front]))][:c['limit']]
+
+    options = []
+    for i in front.tolist():
+        options.append({
+            "params": {
+                "width": c['width'],
+                "height": c['height'],
+                "steps": int(v['steps'][i]),
+                "material": MATERIALS[v['code'][i]],
+                "has_platform": bool(v['has_platform'][i]),
+                "platform_depth": float(v['platform_depth'][i]),
+                "reinforcements_count": int(v['reinforcements'][i]),
+                "paint_consumption": c['paint_consumption'],
+            },
+            "step_height": round(c['height'] / int(v['steps'][i]), 1),
+            "footprint_depth": float(v['footprint'][i]),
+            "total_length_mm": int(total_mm[i]),
+            "paint_weight": float(paint[i]),
+            "dpk_boards": int(boards[i]),
+            "structure_utilization": round(float(v['utilization'][i]), 2),
+        })
+    return {"evaluated": n, "pareto": int(mask.sum()), "options": options}
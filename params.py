@@ -0,0 +1,128 @@
+import hashlib  # Для ETag канонической ссылки
+import json  # Для канонической записи ETag
+from typing import NamedTuple  # Для описания набора параметров расчета
+from urllib.parse import quote, urlencode  # Для канонической строки запроса
+
+from materials import MATERIALS  # Материалы ступеней, которые поддерживает расчет (из реестра материалов)
+
+
+class CalcParams(NamedTuple):
+    """Нормализованный набор параметров для calculate_metal (в порядке аргументов функции)."""
+    width: float  # Ширина конструкции (мм)
+    height: float  # Высота конструкции (мм)
+    steps: int  # Количество ступеней
+    material: str  # Материал ступеней
+    has_platform: bool  # Наличие платформы
+    platform_depth: float  # Глубина платформы (мм), 0 если платформы нет
+    reinforcements_count: int  # Количество усилений
+    paint_consumption: float  # Расход краски (г/м²)
+    frame_color: str  # Цвет каркаса
+
+
+def parse_params(data: dict) -> CalcParams:
+    """Извлекает параметры расчета из данных запроса так же, как это делает /api/calculate.
+
+    Ошибки разбора не перехватываются: отсутствующий параметр дает KeyError,
+    некорректное значение - ValueError или TypeError.
+    """
+    width = float(data['width'])  # Ширина конструкции
+    height = float(data['height'])  # Высота конструкции
+    steps = int(data['steps'])  # Количество ступеней
+    material = data['material']  # Материал ступеней
+    has_platform = data['has_platform']  # Наличие платформы
+    platform_depth = float(data['platform_depth']) if has_platform else 0  # Глубина платформы (если есть)
+    reinforcements_count = int(data.get('reinforcements_count', 1))  # Количество усилений (по умолчанию 1)
+    paint_consumption = float(data.get('paint_consumption', 110))  # Расход краски (г/м²)
+    frame_color = data.get('frame_color', 'RAL9005')  # Цвет каркаса (по умолчанию черный)
+    return CalcParams(
+        width, height, steps, material, has_platform,
+        platform_depth, reinforcements_count, paint_consumption, frame_color
+    )
+
+
+# Значения флага платформы в строке запроса и в CSV
+TRUE_VALUES = {"1", "true", "yes", "y", "да", "+"}
+FALSE_VALUES = {"0", "false", "no", "n", "нет", "-"}
+
+# Параметры строки запроса GET /api/calculate (в каноническом порядке) и значения по умолчанию
+QUERY_FIELDS = CalcParams._fields
+QUERY_DEFAULTS = {"has_platform": False, "reinforcements_count": 1, "paint_consumption": 110, "frame_color": "RAL9005"}
+RESULT_VERSION = 2  # Меняется при изменении расчета или схемы ответа, чтобы старые ETag стали недействительными
+
+
+def parse_flag(value: str) -> bool:
+    """Флаг из текста: 1/0, true/false, yes/no, да/нет, +/-."""
+    flag = value.strip().lower()
+    if flag not in TRUE_VALUES and flag not in FALSE_VALUES:
+        raise ValueError(f"Некорректное значение has_platform: {value}")
+    return flag in TRUE_VALUES
+
+
+def query_params(args) -> dict:
+    """Данные для parse_params из строки запроса; отсутствующий флаг платформы - без платформы."""
+    data = {name: args[name] for name in QUERY_FIELDS if args.get(name, '') != ''}
+    data['has_platform'] = parse_flag(data['has_platform']) if 'has_platform' in data else QUERY_DEFAULTS['has_platform']
+    return data
+
+
+def _number(value: float) -> str:
+    """Каноническая запись числа: целое без дробной части (1000.0 -> 1000), иначе кратчайшая (1e3 -> 1000)."""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def canonical_query(params: CalcParams, fmt: str) -> str:
+    """Каноническая строка запроса: постоянный порядок, числа без лишних нулей, значения по умолчанию опущены.
+
+    Разные записи одного набора параметров дают одну строку, поэтому кэши браузера и прокси
+    хранят одну копию ответа.
+    """
+    pairs = [("width", _number(params.width)), ("height", _number(params.height)),
+             ("steps", str(params.steps)), ("material", params.material)]
+    if params.has_platform:
+        pairs += [("has_platform", "1"), ("platform_depth", _number(params.platform_depth))]
+    if params.reinforcements_count != QUERY_DEFAULTS["reinforcements_count"]:
+        pairs.append(("reinforcements_count", str(params.reinforcements_count)))
+    if params.paint_consumption != QUERY_DEFAULTS["paint_consumption"]:
+        pairs.append(("paint_consumption", _number(params.paint_consumption)))
+    if params.frame_color != QUERY_DEFAULTS["frame_color"]:
+        pairs.append(("frame_color", params.frame_color))
+    if fmt != "json":
+        pairs.append(("format", fmt))
+    return urlencode(pairs, quote_via=quote, safe='')
+
+
+def query_etag(canonical: str, config) -> str:
+    """Сильный ETag ответа по канонической строке запроса, снимку настроек расчета и версии ответа."""
+    text = json.dumps([RESULT_VERSION, canonical, config_fingerprint(config)])
+    return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+
+def describe_parse_error(e: Exception) -> str:
+    """Формирует текст ошибки разбора параметров для ответа API."""
+    if isinstance(e, KeyError):
+        return f"Отсутствует обязательный параметр: {e}"
+    return str(e)
+
+
+# Настройки, от которых зависит результат calculate_metal
+CALC_CONFIG_KEYS = (
+    'MIN_WIDTH', 'MAX_WIDTH', 'MIN_HEIGHT', 'MAX_HEIGHT',
+    'PROFILE_THICKNESS', 'DPK_DEPTH', 'PVL_DEPTH', 'DPK_REDUCTION',
+    'PROFILE_WALL', 'STRUCT_ELASTIC_MODULUS', 'STRUCT_YIELD_STRENGTH', 'STRUCT_SAFETY_FACTOR',
+    'STRUCT_AREA_LOAD', 'STRUCT_POINT_LOAD', 'STRUCT_DEFLECTION_LIMIT', 'STRUCT_MAX_REINFORCEMENTS',
+)
+
+
+def config_fingerprint(config) -> tuple:
+    """Возвращает снимок настроек расчета; при изменении любой константы меняется и снимок."""
+    return tuple(config[key] for key in CALC_CONFIG_KEYS)
+
+
+def params_key(params: CalcParams) -> tuple:
+    """Канонический ключ набора параметров.
+
+    Флаг платформы и цвет попадают в ответ как есть, поэтому в ключ входят и их типы
+    (иначе True и 1 дали бы один и тот же ключ).
+    """
+    return (*params, type(params.has_platform), type(params.frame_color))
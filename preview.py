@@ -0,0 +1,280 @@
+"""Превью лестницы на сервере без видеокарты: программный растеризатор на NumPy.
+
+Детали берутся из geometry.stair_boxes (те же параллелепипеды, что в GLB и в браузере): каркас,
+доски ДПК и листы ПВЛ. Каждый параллелепипед проецируется ортографически с фиксированной точки
+(спереди, справа, сверху); видны три его грани, которые растеризуются с буфером глубины. Проекция
+грани - параллелограмм, поэтому принадлежность пикселя и глубина считаются линейно по двум ребрам
+для всех пикселей ограничивающего прямоугольника сразу. Цвет грани - цвет детали, осветленный
+по направлению грани, чтобы черный каркас (RAL9005) оставался объемным.
+
+Готовые изображения хранятся в дисковом кэше с адресацией по содержимому (хэш размеров, формата
+и версии отрисовки) и вытеснением давно не использованных файлов при превышении объема.
+"""
+import hashlib  # Для адреса превью в кэше
+import json  # Для канонической записи размеров
+import os  # Для работы с файловой системой
+import struct  # Для блоков PNG
+import threading  # Для защиты счетчика объема кэша
+import zlib  # Для сжатия PNG
+from typing import Optional
+
+import numpy as np  # Для растеризации
+
+from geometry import BOLT_COLOR, COLOR_MAPPING, stair_boxes
+
+try:
+    from PIL import Image  # Кодирование WebP (необязательная зависимость)
+except ImportError:  # pragma: no cover - зависит от окружения
+    Image = None
+
+RENDER_VERSION = 1  # Меняется при изменении отрисовки, чтобы старые превью в кэше не использовались
+BACKGROUND = (255, 255, 255)
+MARGIN = 0.06  # Поля вокруг лестницы (доля размера изображения)
+TILE = 32  # Наибольшая сторона плитки растеризации (пиксели)
+MIN_PART = 10  # Детали, у которых два размера не больше MIN_PART мм (болты, линии сетки ПВЛ), не рисуются
+
+# Направление на наблюдателя: справа (+x), сверху (+y), спереди (-z, со стороны первой ступени)
+_EYE = np.array([1.0, 0.9, -1.4])
+_W = _EYE / np.linalg.norm(_EYE)
+_U = np.cross([0.0, 1.0, 0.0], _W)
+_U /= np.linalg.norm(_U)
+_V = np.cross(_W, _U)
+_VIEW = np.stack([_U, _V, _W])  # Строки: экранные x, y и глубина (больше - ближе)
+
+# Видимые грани: ось нормали, знак и осветление (доля белого)
+FACES = ((1, 1, 0.35), (2, -1, 0.2), (0, 1, 0.1))  # Верх, перед, правый бок
+
+
+def _face_corners(axis: int, sign: int) -> np.ndarray:
+    """Вершины грани единичного куба: угол, конец первого ребра, конец второго ребра."""
+    a, b = [i for i in range(3) if i != axis]
+    corners = np.zeros((3, 3))
+    corners[:, axis] = sign
+    corners[:, a] = (-1, 1, -1)
+    corners[:, b] = (-1, -1, 1)
+    return corners / 2
+
+
+_FACE_CORNERS = {axis: _face_corners(axis, sign) for axis, sign, _ in FACES}
+
+
+def _ceil_pow2(values: np.ndarray) -> np.ndarray:
+    """Ближайшие сверху степени двойки."""
+    return 1 << np.ceil(np.log2(np.maximum(values, 1))).astype(int)
+
+
+def _rgb(color: int) -> np.ndarray:
+    return np.array([(color >> 16) & 255, (color >> 8) & 255, color & 255], dtype=np.float64)
+
+
+def part_colors(frame_color: str) -> dict:
+    """Цвета типов деталей для цвета каркаса (как build_glb)."""
+    colors = COLOR_MAPPING.get(frame_color, COLOR_MAPPING['RAL9005'])
+    return {"profile": colors['frame'], "board": colors['dpk'], "pvl": colors['frame'], "bolt": BOLT_COLOR}
+
+
+def render(dimensions: dict, width: int, height: int) -> np.ndarray:
+    """Изображение лестницы (height, width, 3) uint8 по блоку dimensions результата calculate_metal."""
+    boxes = stair_boxes(dimensions)
+    colors = part_colors(dimensions.get('frame_color', 'RAL9005'))
+    centers, sizes, base = [], [], []
+    for name in ("profile", "pvl", "board"):
+        c, s = boxes[name]
+        visible = np.sort(s, axis=1)[:, 1] > MIN_PART
+        centers.append(c[visible])
+        sizes.append(s[visible])
+        base.append(np.repeat(_rgb(colors[name])[None], visible.sum(), axis=0))
+    centers = np.concatenate(centers).astype(np.float64)
+    sizes = np.concatenate(sizes).astype(np.float64)
+    base = np.concatenate(base)
+
+    # Грани всех деталей: угол и два ребра в экранных координатах (x, y, глубина)
+    origins, edges1, edges2, shades = [], [], [], []
+    for axis, _, light in FACES:
+        corners = centers[:, None, :] + _FACE_CORNERS[axis][None] * sizes[:, None, :]
+        projected = corners @ _VIEW.T
+        origins.append(projected[:, 0])
+        edges1.append(projected[:, 1] - projected[:, 0])
+        edges2.append(projected[:, 2] - projected[:, 0])
+        shades.append(base + (255 - base) * light)
+    origins, edges1, edges2 = np.concatenate(origins), np.concatenate(edges1), np.concatenate(edges2)
+    shades = np.concatenate(shades).astype(np.uint8)
+
+    # Масштаб: вся лестница помещается в изображение с полями
+    points = np.concatenate([origins, origins + edges1, origins + edges2, origins + edges1 + edges2])
+    low, high = points[:, :2].min(axis=0), points[:, :2].max(axis=0)
+    span = np.maximum(high - low, 1e-9)
+    scale = min(width * (1 - 2 * MARGIN) / span[0], height * (1 - 2 * MARGIN) / span[1])
+    offset = np.array([width, height]) / 2 - (low + high) / 2 * scale
+
+    def to_pixels(p):  # Экранная ось y направлена вниз
+        return np.stack([p[:, 0] * scale + offset[0], height - (p[:, 1] * scale + offset[1])], axis=1)
+
+    o = to_pixels(origins)
+    e1 = to_pixels(origins + edges1) - o
+    e2 = to_pixels(origins + edges2) - o
+    z0, dz1, dz2 = origins[:, 2], edges1[:, 2], edges2[:, 2]
+
+    # Длинные грани (например, проекция профиля во всю ширину - тонкая диагональ) делятся на плитки
+    # со сторонами не больше TILE пикселей: работа растеризатора пропорциональна площади граней,
+    # а не их ограничивающих прямоугольников
+    n1 = np.maximum(np.ceil(np.hypot(e1[:, 0], e1[:, 1]) / TILE), 1).astype(int)
+    n2 = np.maximum(np.ceil(np.hypot(e2[:, 0], e2[:, 1]) / TILE), 1).astype(int)
+    counts = n1 * n2
+    face = np.repeat(np.arange(len(counts)), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    n1, n2 = n1[face], n2[face]
+    t1, t2 = (k % n1) / n1, (k // n1) / n2
+    o = o[face] + e1[face] * t1[:, None] + e2[face] * t2[:, None]
+    z0 = z0[face] + dz1[face] * t1 + dz2[face] * t2
+    e1, e2 = e1[face] / n1[:, None], e2[face] / n2[:, None]
+    dz1, dz2 = dz1[face] / n1, dz2[face] / n2
+    shades = shades[face]
+
+    det = e1[:, 0] * e2[:, 1] - e1[:, 1] * e2[:, 0]
+    corners_px = np.stack([o, o + e1, o + e2, o + e1 + e2], axis=1)
+    x0 = np.clip(np.floor(corners_px[..., 0].min(axis=1)).astype(int), 0, width)
+    x1 = np.clip(np.ceil(corners_px[..., 0].max(axis=1)).astype(int) + 1, 0, width)
+    y0 = np.clip(np.floor(corners_px[..., 1].min(axis=1)).astype(int), 0, height)
+    y1 = np.clip(np.ceil(corners_px[..., 1].max(axis=1)).astype(int) + 1, 0, height)
+
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = BACKGROUND
+    depth = np.full(height * width, -np.inf, dtype=np.float32)
+    # Коэффициенты перехода от пикселя к координатам (a, b) в базисе ребер плитки: внутри при 0 <= a, b <= 1
+    drawn = (np.abs(det) > 1e-9) & (x1 > x0) & (y1 > y0)
+    det = np.where(drawn, det, 1.0)
+    ax, ay = e2[:, 1] / det, -e2[:, 0] / det
+    bx, by = -e1[:, 1] / det, e1[:, 0] / det
+    eps = 0.5  # Допуск в пикселях, чтобы тонкие грани не пропадали
+    ta = eps / np.maximum(np.hypot(e1[:, 0], e1[:, 1]), eps)
+    tb = eps / np.maximum(np.hypot(e2[:, 0], e2[:, 1]), eps)
+
+    # Плитки с одинаковым (до степени двойки) размером ограничивающего прямоугольника считаются
+    # одной операцией над массивом (плитка, строка, столбец)
+    span_x = _ceil_pow2(x1 - x0)
+    span_y = _ceil_pow2(y1 - y0)
+    flat_image = image.reshape(-1, 3)
+    for group_x, group_y in set(zip(span_x[drawn].tolist(), span_y[drawn].tolist())):
+        f = np.flatnonzero(drawn & (span_x == group_x) & (span_y == group_y))
+        px = x0[f, None, None] + np.arange(group_x)[None, None, :]
+        py = y0[f, None, None] + np.arange(group_y)[None, :, None]
+        qx = (px + 0.5 - o[f, 0, None, None]).astype(np.float32)
+        qy = (py + 0.5 - o[f, 1, None, None]).astype(np.float32)
+        a = qx * ax[f, None, None] + qy * ay[f, None, None]
+        b = qx * bx[f, None, None] + qy * by[f, None, None]
+        inside = ((px < x1[f, None, None]) & (py < y1[f, None, None])
+                  & (a >= -ta[f, None, None]) & (a <= 1 + ta[f, None, None])
+                  & (b >= -tb[f, None, None]) & (b <= 1 + tb[f, None, None]))
+        tile, row, column = np.nonzero(inside)
+        pixels = py[tile, row, 0] * width + px[tile, 0, column]
+        z = (z0[f[tile]] + a[tile, row, column] * dz1[f[tile]] + b[tile, row, column] * dz2[f[tile]]).astype(np.float32)
+        # Буфер глубины: сначала ближайшая глубина по каждому пикселю, затем цвет плитки, которая ее дала
+        np.maximum.at(depth, pixels, z)
+        nearest = z >= depth[pixels]
+        flat_image[pixels[nearest]] = shades[f[tile[nearest]]]
+    return image
+
+
+def encode_png(image: np.ndarray) -> bytes:
+    """PNG из массива RGB без сторонних библиотек."""
+    height, width, _ = image.shape
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), image.reshape(height, -1)], axis=1)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)  # 8 бит, RGB
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b""))
+
+
+def encode_webp(image: np.ndarray) -> bytes:
+    """WebP из массива RGB (нужен Pillow)."""
+    import io
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, 'WEBP', quality=85, method=4)
+    return buffer.getvalue()
+
+
+FORMATS = {"png": ("image/png", encode_png), "webp": ("image/webp", encode_webp)}
+
+
+def available_formats() -> tuple:
+    """Форматы превью, доступные в текущем окружении."""
+    return ("png", "webp") if Image is not None else ("png",)
+
+
+def preview_key(dimensions: dict, width: int, height: int, fmt: str) -> str:
+    """Адрес превью в кэше: хэш размеров лестницы, размеров изображения, формата и версии отрисовки."""
+    text = json.dumps([RENDER_VERSION, dimensions, width, height, fmt], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class PreviewCache:
+    """Дисковый кэш превью: файл <каталог>/<2 символа>/<хэш>.<формат>.
+
+    Попадание обновляет время изменения файла; при превышении max_bytes удаляются самые
+    давно использованные файлы, пока объем не станет меньше 90% предела. Объем считается при
+    запуске и учитывается при записи; процессы пишут в один каталог, поэтому при вытеснении
+    объем пересчитывается по файлам.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(size for _, _, size in self._files())
+
+    def path(self, key: str, fmt: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.{fmt}")
+
+    def get(self, key: str, fmt: str) -> Optional[bytes]:
+        path = self.path(key, fmt)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # Отмечаем использование для вытеснения
+            return data
+        except OSError:
+            return None
+
+    def put(self, key: str, fmt: str, data: bytes) -> None:
+        path = self.path(key, fmt)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, path)  # Читатели видят либо старый файл, либо новый целиком
+        with self._lock:
+            self.size += len(data)
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _files(self) -> list:
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, path, stat.st_size))
+        return files
+
+    def _evict(self) -> None:
+        files = sorted(self._files())
+        self.size = sum(size for _, _, size in files)
+        target = self.max_bytes * 0.9
+        for _, path, size in files:
+            if self.size <= target:
+                break
+            try:
+                os.unlink(path)
+                self.size -= size
+            except OSError:
+                pass
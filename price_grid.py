@@ -0,0 +1,275 @@
+"""Предрасчитанная сетка цен: ключевые результаты calculate_metal для всего диапазона параметров.
+
+Сетка строится заранее (python price_grid.py) и хранится в компактном столбцовом двоичном
+файле. Приложение отображает файл в память (mmap), поэтому страницы разделяются всеми
+процессами gunicorn, а запрос на узел сетки обслуживается вычислением индекса.
+
+Формат файла: MAGIC, длина заголовка (uint32, little-endian), JSON-заголовок, выравнивание
+до DATA_ALIGN байт и столбцы int32 подряд (по ROWS значений в каждом).
+"""
+import argparse  # Для разбора аргументов командной строки
+import json  # Для заголовка файла
+import os  # Для работы с файловой системой
+import struct  # Для записи длины заголовка
+from typing import Optional
+
+import numpy as np  # Для векторных вычислений и отображения файла в память
+
+from batch import compute_arrays, round2
+from materials import MATERIAL_CODES, MATERIALS
+from params import CalcParams, config_fingerprint
+
+MAGIC = b'DPKGRID1'
+FORMAT_VERSION = 1
+DATA_ALIGN = 64
+
+# Столбцы сетки: длины в мм, площади и вес краски - в сотых долях, длина ДПК - в сотых метра
+COLUMNS = (
+    "total_mm", "base_frame_mm", "steps_frames_mm", "vertical_stands_mm", "reinforcements_mm",
+    "frame_area", "pvl_area", "total_area", "frame_weight", "pvl_weight", "total_weight",
+    "dpk_length", "dpk_boards", "bolts_count",
+)
+_HUNDREDTHS = {"frame_area", "pvl_area", "total_area", "frame_weight", "pvl_weight", "total_weight",
+               "dpk_length"}
+
+
+def grid_settings(config) -> dict:
+    """Возвращает параметры сетки и снимок настроек, для которых она строится."""
+    return {
+        "version": FORMAT_VERSION,
+        "fingerprint": list(config_fingerprint(config)),
+        "resolution": config['GRID_RESOLUTION'],
+        "max_steps": config['GRID_MAX_STEPS'],
+        "platform_depths": list(config['GRID_PLATFORM_DEPTHS']),
+        "reinforcements_count": 1,
+        "paint_consumption": config['GRID_PAINT_CONSUMPTION'],
+    }
+
+
+def summarize(result: dict) -> dict:
+    """Выбирает из полного результата calculate_metal ключевые величины, которые хранит сетка."""
+    paint = result['paint']
+    additional = result['additional_materials']
+    return {
+        "lengths_mm": {
+            "total": result['total_length']['mm'],
+            "base_frame": result['base_frame']['mm'],
+            "steps_frames": result['steps_frames']['total_mm'],
+            "vertical_stands": result['vertical_stands']['mm'],
+            "reinforcements": result['reinforcements']['total']['mm']
+        },
+        "paint": {
+            "frame_area": paint['frame_area'],
+            "pvl_area": paint['pvl_area'],
+            "total_area": paint['total_area'],
+            "frame_weight": paint['frame_weight'],
+            "pvl_weight": paint['pvl_weight'],
+            "total_weight": paint['total_weight']
+        },
+        "dpk_length": additional['dpk_length'],
+        "dpk_boards": additional['dpk_boards'],
+        "bolts_count": additional['bolts_count']
+    }
+
+
+def _axes(settings: dict, config) -> dict:
+    """Значения каждой оси сетки (в порядке хранения: ступени, материал, платформа, ширина, высота)."""
+    res = settings['resolution']
+    return {
+        "steps": np.arange(1, settings['max_steps'] + 1),
+        "material": np.array([MATERIAL_CODES[m] for m in MATERIALS]),
+        # 0 - без платформы, далее - глубины платформы
+        "platform": np.array([0] + settings['platform_depths'], dtype=np.float64),
+        "width": np.arange(config['MIN_WIDTH'], config['MAX_WIDTH'] + 1, res, dtype=np.float64),
+        "height": np.arange(config['MIN_HEIGHT'], config['MAX_HEIGHT'] + 1, res, dtype=np.float64),
+    }
+
+
+def build_grid(config, path: str) -> int:
+    """Строит сетку по текущим настройкам и атомарно записывает ее в path. Возвращает число строк."""
+    settings = grid_settings(config)
+    axes = _axes(settings, config)
+    shape = tuple(len(values) for values in axes.values())
+    rows = int(np.prod(shape))
+    per_steps = rows // shape[0]
+
+    header = dict(settings, columns=list(COLUMNS), rows=rows, shape=list(shape),
+                  axes={name: values.tolist() for name, values in axes.items()})
+    header_bytes = json.dumps(header).encode()
+    offset = _data_offset(len(header_bytes))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes)
+        f.write(b'\0' * (offset - f.tell()))
+    data = np.memmap(tmp_path, dtype='<i4', mode='r+', offset=offset, shape=(len(COLUMNS), rows))
+
+    # Считаем по одному значению числа ступеней за раз, чтобы ограничить потребление памяти
+    material, platform, width, height = np.meshgrid(
+        axes['material'], axes['platform'], axes['width'], axes['height'], indexing='ij')
+    material, platform, width, height = (a.reshape(-1) for a in (material, platform, width, height))
+    n = len(width)
+    for i, steps in enumerate(axes['steps'].tolist()):
+        columns = compute_arrays(
+            width, height, np.full(n, steps), material, platform > 0, platform,
+            np.ones(n, dtype=np.int64), np.full(n, float(settings['paint_consumption'])), config)
+        block = slice(i * per_steps, (i + 1) * per_steps)
+        for j, values in enumerate(_grid_columns(columns)):
+            data[j, block] = values
+    data.flush()
+    del data
+    os.replace(tmp_path, path)
+    return rows
+
+
+def _grid_columns(columns: dict) -> list:
+    """Округляет результаты движка так же, как calculate_metal, и переводит в целые для хранения."""
+    def mm(name):
+        return np.rint(columns[name])
+
+    def hundredths(values):
+        return np.rint(round2(values) * 100)
+
+    values = {
+        "total_mm": mm("total_length"),
+        "base_frame_mm": mm("base_length"),
+        "steps_frames_mm": mm("steps_total"),
+        "vertical_stands_mm": mm("stands"),
+        "reinforcements_mm": mm("reinforcements_total"),
+        "frame_area": hundredths(columns["frame_paint_area"]),
+        "pvl_area": hundredths(columns["pvl_paint_area"]),
+        "total_area": hundredths(columns["total_paint_area"]),
+        "frame_weight": hundredths(columns["frame_paint_weight"]),
+        "pvl_weight": hundredths(columns["pvl_paint_weight"]),
+        "total_weight": hundredths(columns["total_paint_weight"]),
+        "dpk_length": hundredths(columns["dpk_length"] / 1000),
+        "dpk_boards": columns["dpk_boards"],
+        "bolts_count": columns["bolts"],
+    }
+    return [values[name].astype('<i4') for name in COLUMNS]
+
+
+def _data_offset(header_length: int) -> int:
+    """Смещение начала данных: после заголовка с выравниванием до DATA_ALIGN."""
+    end = len(MAGIC) + 4 + header_length
+    return (end + DATA_ALIGN - 1) // DATA_ALIGN * DATA_ALIGN
+
+
+class PriceGrid:
+    """Сетка цен, отображенная в память; поиск по узлу - только арифметика индексов."""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Файл {path} не является сеткой цен")
+            (header_length,) = struct.unpack('<I', f.read(4))
+            self.header = json.loads(f.read(header_length))
+        self.path = path
+        self.shape = tuple(self.header['shape'])
+        self.data = np.memmap(path, dtype='<i4', mode='r', offset=_data_offset(header_length),
+                              shape=(len(COLUMNS), self.header['rows']))
+        self.fingerprint = tuple(self.header['fingerprint'])
+        axes = self.header['axes']
+        self._width = (axes['width'][0], self.header['resolution'], len(axes['width']))
+        self._height = (axes['height'][0], self.header['resolution'], len(axes['height']))
+        self._platform = {depth: i for i, depth in enumerate(axes['platform'])}
+        self._materials = {name: i for i, name in enumerate(MATERIALS)}
+
+    def matches(self, config) -> bool:
+        """Проверяет, что сетка построена для текущих настроек расчета и параметров сетки."""
+        return all(self.header.get(key) == value for key, value in grid_settings(config).items())
+
+    def is_current(self, config) -> bool:
+        """Проверяет, что константы расчета не менялись после загрузки сетки."""
+        return self.fingerprint == config_fingerprint(config)
+
+    def row_index(self, params: CalcParams) -> Optional[int]:
+        """Номер строки для набора параметров или None, если набор не попадает в узел сетки."""
+        if params.reinforcements_count != 1 or params.paint_consumption != self.header['paint_consumption']:
+            return None
+        if not 1 <= params.steps <= self.shape[0]:
+            return None
+        m = self._materials.get(params.material) if isinstance(params.material, str) else None
+        p = self._platform.get(params.platform_depth if params.has_platform else 0)
+        w = _axis_index(params.width, *self._width)
+        h = _axis_index(params.height, *self._height)
+        if m is None or p is None or w is None or h is None:
+            return None
+        _, materials, platforms, widths, heights = self.shape
+        return (((params.steps - 1) * materials + m) * platforms + p) * widths * heights + w * heights + h
+
+    def lookup(self, params: CalcParams) -> Optional[dict]:
+        """Возвращает ключевые величины для узла сетки (в формате summarize) или None."""
+        row = self.row_index(params)
+        if row is None:
+            return None
+        v = dict(zip(COLUMNS, self.data[:, row].tolist()))
+        for name in _HUNDREDTHS:
+            v[name] = v[name] / 100
+        return {
+            "lengths_mm": {
+                "total": v['total_mm'],
+                "base_frame": v['base_frame_mm'],
+                "steps_frames": v['steps_frames_mm'],
+                "vertical_stands": v['vertical_stands_mm'],
+                "reinforcements": v['reinforcements_mm']
+            },
+            "paint": {name: v[name] for name in ("frame_area", "pvl_area", "total_area",
+                                                 "frame_weight", "pvl_weight", "total_weight")},
+            "dpk_length": v['dpk_length'],
+            "dpk_boards": v['dpk_boards'],
+            "bolts_count": v['bolts_count']
+        }
+
+
+def _axis_index(value: float, start: float, step: float, count: int) -> Optional[int]:
+    """Индекс значения на равномерной оси или None, если значение не совпадает с узлом."""
+    offset = value - start
+    index = int(offset // step) if offset >= 0 else -1
+    if 0 <= index < count and start + index * step == value:
+        return index
+    return None
+
+
+def load_grid(config, logger=None) -> Optional[PriceGrid]:
+    """Открывает сетку цен; при отсутствии или устаревании перестраивает ее (если разрешено)."""
+    path = config['PRICE_GRID_PATH']
+    grid = None
+    if os.path.exists(path):
+        try:
+            grid = PriceGrid(path)
+        except (OSError, ValueError) as e:
+            if logger:
+                logger.warning(f"Не удалось открыть сетку цен {path}: {e}")
+    if grid is not None and grid.matches(config):
+        return grid
+    if not config['PRICE_GRID_AUTOBUILD']:
+        if logger and grid is not None:
+            logger.error(f"Сетка цен {path} построена для других настроек и не используется: "
+                         f"перестройте ее командой python price_grid.py")
+        elif logger:
+            logger.info(f"Сетка цен {path} не найдена, расчет выполняется без нее")
+        return None
+    build_grid(config, path)
+    return PriceGrid(path)
+
+
+def main():
+    from config import get_config  # Импорт только для запуска из командной строки
+
+    parser = argparse.ArgumentParser(description="Построение сетки цен для calculate_metal")
+    parser.add_argument('--output', help="Путь к файлу сетки (по умолчанию PRICE_GRID_PATH)")
+    args = parser.parse_args()
+
+    # Параметры сетки (в том числе шаг GRID_RESOLUTION) берутся из той же конфигурации, что и у
+    # приложения: сетку с другими параметрами приложение не использует
+    config_object = get_config()
+    config = {key: getattr(config_object, key) for key in dir(config_object) if key.isupper()}
+    path = args.output or config['PRICE_GRID_PATH']
+    rows = build_grid(config, path)
+    print(f"Сетка цен записана в {path}: {rows} строк, {os.path.getsize(path)} байт")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+"""История расчетов (котировок) в SQLite с отложенной пакетной записью.
+
+Обработчик /api/calculate только кладет параметры успешного расчета в ограниченную очередь
+(при переполнении котировка отбрасывается, а не задерживает запрос). Фоновый поток забирает
+очередь пачками до QUOTES_BATCH_SIZE записей или раз в QUOTES_FLUSH_INTERVAL секунд, считает
+результаты пачки одним вызовом векторного движка (batch.py, результаты совпадают с calculate_metal)
+и записывает их одной транзакцией: параметры, ключевые итоги и полный результат, сжатый zlib.
+
+Каждый процесс пишет своим потоком в общую базу (режим WAL, ожидание блокировки busy_timeout).
+Выборка истории постраничная по курсору (created, id): страница читается по индексу без OFFSET,
+поэтому скорость не зависит от количества строк и номера страницы.
+"""
+import atexit  # Для записи оставшейся очереди при завершении процесса
+import os  # Для работы с файловой системой
+import queue  # Очередь между обработчиками запросов и фоновым потоком
+import sqlite3  # Хранилище истории
+import threading  # Для фонового потока записи и соединений потоков чтения
+import time  # Для отметок времени и интервала записи
+import zlib  # Для сжатия полного результата
+from datetime import datetime, timezone  # Для разбора и вывода дат
+from typing import Iterable, Iterator, Optional
+
+from batch import build_results, compute_columns  # Векторный расчет пачки котировок
+from formats import encode  # Быстрый JSON для сохраняемого результата
+from params import CalcParams
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,              -- Время расчета (секунды Unix, UTC)
+    width REAL NOT NULL,
+    height REAL NOT NULL,
+    steps INTEGER NOT NULL,
+    material TEXT NOT NULL,
+    has_platform INTEGER NOT NULL,
+    platform_depth REAL NOT NULL,
+    reinforcements_count INTEGER NOT NULL,
+    paint_consumption REAL NOT NULL,
+    frame_color TEXT NOT NULL,
+    total_length_mm INTEGER NOT NULL,   -- Общая длина профиля (мм)
+    paint_weight REAL NOT NULL,         -- Общий вес краски (г)
+    dpk_boards INTEGER NOT NULL,
+    bolts_count INTEGER NOT NULL,
+    result BLOB NOT NULL                -- Полный результат calculate_metal (JSON, zlib)
+);
+CREATE INDEX IF NOT EXISTS quotes_created ON quotes (created);
+CREATE INDEX IF NOT EXISTS quotes_material_created ON quotes (material, created);
+CREATE INDEX IF NOT EXISTS quotes_width ON quotes (width);
+"""
+
+INSERT = ("INSERT INTO quotes (created, width, height, steps, material, has_platform, platform_depth, "
+          "reinforcements_count, paint_consumption, frame_color, total_length_mm, paint_weight, "
+          "dpk_boards, bolts_count, result) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+# Поля строки в ответе списка (без полного результата)
+LIST_COLUMNS = ("id", "created", "width", "height", "steps", "material", "has_platform", "platform_depth",
+                "reinforcements_count", "paint_consumption", "frame_color", "total_length_mm",
+                "paint_weight", "dpk_boards", "bolts_count")
+PARAM_COLUMNS = LIST_COLUMNS[2:11]
+TOTAL_COLUMNS = LIST_COLUMNS[11:]
+
+# Если в диапазон ширины попадает больше строк, страница читается по индексу времени с фильтром
+# по ширине (совпадения встречаются часто); иначе - по индексу ширины с сортировкой найденных строк
+NARROW_WIDTH_ROWS = 5000
+
+
+def quote_row(created: float, params: CalcParams, result: dict) -> tuple:
+    """Строка таблицы quotes для результата расчета."""
+    materials = result["additional_materials"]
+    return (created, params.width, params.height, params.steps, params.material, bool(params.has_platform),
+            params.platform_depth, params.reinforcements_count, params.paint_consumption,
+            str(params.frame_color), result["total_length"]["mm"], result["paint"]["total_weight"],
+            materials["dpk_boards"], materials["bolts_count"], zlib.compress(encode(result, 'fastjson')))
+
+
+def parse_time(value: str) -> float:
+    """Разбирает дату ISO 8601 ('2024-05-01' или '2024-05-01T12:00:00') или секунды Unix; без зоны - UTC."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Некорректная дата: {value}")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def format_time(created: float) -> str:
+    return datetime.fromtimestamp(created, timezone.utc).isoformat(timespec='milliseconds')
+
+
+def encode_cursor(created: float, quote_id: int) -> str:
+    """Курсор следующей страницы: позиция последней строки текущей."""
+    return f"{created!r}_{quote_id}"
+
+
+def decode_cursor(cursor: str) -> tuple:
+    created, _, quote_id = cursor.partition('_')
+    try:
+        return float(created), int(quote_id)
+    except ValueError:
+        raise ValueError("Некорректный курсор before")
+
+
+class QuoteStore:
+    """Очередь котировок, фоновый поток пакетной записи и выборка истории."""
+
+    def __init__(self, path: str, config, batch_size: int = 500, flush_interval: float = 1.0,
+                 queue_size: int = 10000, metrics=None, logger=None):
+        self.path = path
+        self.config = config
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.metrics = metrics
+        self.logger = logger
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+        self._local = threading.local()  # Соединения потоков чтения
+        self.queue = queue.Queue(queue_size)
+        self.thread = None
+        self.start()
+        atexit.register(self.stop)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")  # Чтение не блокируется записью
+        connection.execute("PRAGMA synchronous=NORMAL")  # В режиме WAL сохранность не теряется при сбое процесса
+        return connection
+
+    def record(self, params: CalcParams) -> bool:
+        """Ставит успешный расчет в очередь записи; False, если очередь переполнена."""
+        try:
+            self.queue.put_nowait((time.time(), params))
+            return True
+        except queue.Full:
+            self._count('dropped')
+            return False
+
+    def start(self) -> None:
+        """Запускает фоновый поток записи."""
+        self.thread = threading.Thread(target=self._run, name="quote-writer", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Записывает оставшиеся в очереди котировки и останавливает фоновый поток."""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def flush(self) -> None:
+        """Дожидается записи всех поставленных в очередь котировок (для тестов и завершения работы)."""
+        self.stop()
+        self.start()
+
+    def _after_fork(self) -> None:
+        # Поток записи и соединения не переживают fork: дочерний процесс получает свои
+        self._local = threading.local()
+        self.queue = queue.Queue(self.queue_size)
+        self.start()
+
+    def _run(self) -> None:
+        connection = self._connect()
+        try:
+            stopping = False
+            while not stopping:
+                item = self.queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._write(connection, batch)
+        finally:
+            connection.close()
+
+    def _write(self, connection: sqlite3.Connection, batch: list) -> None:
+        """Считает результаты пачки и записывает их одной транзакцией.
+
+        Если пачка не считается или не записывается целиком (например, количество усилений вне
+        диапазона int64), котировки записываются по одной: теряется только ошибочная.
+        """
+        try:
+            params = [p for _, p in batch]
+            results = build_results(params, compute_columns(params, self.config), self.config)
+            rows = [quote_row(created, p, result) for (created, p), result in zip(batch, results)]
+            with connection:
+                connection.executemany(INSERT, rows)
+            self._count('stored', len(rows))
+        except Exception as e:  # Ошибка записи не должна останавливать поток
+            if len(batch) > 1:
+                for quote in batch:
+                    self._write(connection, [quote])
+                return
+            self._count('failed')
+            if self.logger is not None:
+                self.logger.error(f"Ошибка записи истории расчетов: {e}")
+
+    def _count(self, outcome: str, value: int = 1) -> None:
+        if self.metrics is not None:
+            self.metrics.inc('dpk_quotes_total', value, outcome=outcome)
+
+    def _reader(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._connect()
+            self._local.connection = connection
+        return connection
+
+    def history(self, since: float = None, until: float = None, material: str = None,
+                width_min: float = None, width_max: float = None, limit: int = 50,
+                before: tuple = None) -> dict:
+        """Страница истории от новых к старым: {"quotes": [...], "next": курсор или None}.
+
+        before - позиция (created, id), после которой начинается страница (курсор next предыдущей).
+        """
+        connection = self._reader()
+        width = "width"
+        if (width_min is not None or width_max is not None) and not self._narrow(connection, width_min, width_max):
+            width = "+width"  # Унарный плюс запрещает SQLite выбирать индекс ширины
+        where, args = [], []
+        for condition, value in (("created >= ?", since), ("created < ?", until), ("material = ?", material),
+                                 (f"{width} >= ?", width_min), (f"{width} <= ?", width_max)):
+            if value is not None:
+                where.append(condition)
+                args.append(value)
+        if before is not None:
+            where.append("(created, id) < (?, ?)")
+            args.extend(before)
+        sql = f"SELECT {', '.join(LIST_COLUMNS)} FROM quotes"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created DESC, id DESC LIMIT ?"
+        rows = connection.execute(sql, (*args, limit + 1)).fetchall()
+        quotes = [self._describe(row) for row in rows[:limit]]
+        last = rows[limit - 1] if len(rows) > limit else None
+        return {"quotes": quotes, "next": encode_cursor(last[1], last[0]) if last else None}
+
+    def params(self, quote_ids: Iterable[int], chunk_size: int = 500) -> Iterator[tuple]:
+        """Параметры котировок по номерам порциями: (номер, параметры или None, если котировки нет)."""
+        connection = self._reader()
+        ids = list(quote_ids)
+        for start in range(0, len(ids), chunk_size):
+            part = ids[start:start + chunk_size]
+            rows = connection.execute(
+                f"SELECT id, {', '.join(PARAM_COLUMNS)} FROM quotes WHERE id IN ({', '.join('?' * len(part))})",
+                part).fetchall()
+            found = {row[0]: dict(zip(PARAM_COLUMNS, row[1:])) for row in rows}
+            for quote_id in part:
+                params = found.get(quote_id)
+                if params is not None:
+                    params["has_platform"] = bool(params["has_platform"])
+                yield quote_id, params
+
+    @staticmethod
+    def _narrow(connection: sqlite3.Connection, width_min: float, width_max: float) -> bool:
+        """Попадает ли в диапазон ширины меньше NARROW_WIDTH_ROWS строк (подсчет по индексу не дальше порога)."""
+        low = width_min if width_min is not None else float('-inf')
+        high = width_max if width_max is not None else float('inf')
+        count, = connection.execute(
+            "SELECT count(*) FROM (SELECT 1 FROM quotes WHERE width BETWEEN ? AND ? LIMIT ?)",
+            (low, high, NARROW_WIDTH_ROWS)).fetchone()
+        return count < NARROW_WIDTH_ROWS
+
+    def get(self, quote_id: int) -> Optional[dict]:
+        """Котировка с полным результатом или None."""
+        row = self._reader().execute(
+            f"SELECT {', '.join(LIST_COLUMNS)}, result FROM quotes WHERE id = ?", (quote_id,)).fetchone()
+        if row is None:
+            return None
+        quote = self._describe(row[:-1])
+        quote["result"] = zlib.decompress(row[-1])  # JSON как есть, без повторного разбора
+        return quote
+
+    @staticmethod
+    def _describe(row: tuple) -> dict:
+        values = dict(zip(LIST_COLUMNS, row))
+        values["has_platform"] = bool(values["has_platform"])
+        return {
+            "id": values["id"],
+            "created": format_time(values["created"]),
+            "params": {name: values[name] for name in PARAM_COLUMNS},
+            "totals": {name: values[name] for name in TOTAL_COLUMNS},
+        }
@@ -0,0 +1,129 @@
+// Клиент живого пересчета (/api/live): поток результатов через EventSource и отправка изменений формы.
+// Одновременно отправляется не больше одного изменения; пока оно в пути, новые изменения
+// заменяют ожидающее, поэтому сервер получает только последнее состояние формы.
+// Поток занимает поток воркера на сервере, поэтому он открывается только при первом изменении
+// формы и закрывается после LIVE_IDLE_MS без изменений (или по событию idle от сервера).
+// onResult получает результат и параметры изменения, по которым он посчитан (для запроса 3D-модели).
+const LIVE_IDLE_MS = 30000;
+
+class LiveCalculator {
+    constructor(onResult, onError) {
+        this.onResult = onResult;
+        this.onError = onError;
+        this.source = null;
+        this.session = null;
+        this.seq = 0;           // Номер последнего изменения
+        this.answered = 0;      // Номер изменения, результат которого уже показан
+        this.latest = null;     // Последнее изменение {seq, params}
+        this.pending = null;    // Изменение, ожидающее отправки
+        this.sent = new Map();  // Параметры отправленных изменений без ответа по номеру
+        this.sending = false;
+        this.idleTimer = null;
+        // Без EventSource расчет выполняется только кнопкой
+        this.supported = typeof EventSource !== 'undefined';
+    }
+
+    open() {
+        this.source = new EventSource('/api/live');
+        this.source.addEventListener('session', (e) => {
+            this.session = JSON.parse(e.data).session;
+            // Новая сессия (в том числе после переподключения): повторяем неотвеченное изменение
+            if (this.latest && this.latest.seq > this.answered && !this.pending) {
+                this.pending = this.latest;
+            }
+            this.send();
+        });
+        this.source.addEventListener('result', (e) => {
+            const data = JSON.parse(e.data);
+            if (data.seq > this.answered) {
+                this.answered = data.seq;
+                this.onResult(data.result, this.takeParams(data.seq));
+            }
+        });
+        this.source.addEventListener('calc-error', (e) => {
+            const data = JSON.parse(e.data);
+            if (data.seq > this.answered) {
+                this.answered = data.seq;
+                this.takeParams(data.seq);
+                this.onError(data.error);
+            }
+        });
+        // Сервер закрыл простаивающий поток: не переподключаемся до следующего изменения
+        this.source.addEventListener('idle', () => this.close());
+        this.source.addEventListener('error', () => {
+            // Отказ сервера (например, 503 при превышении числа сессий): EventSource не переподключается
+            if (this.source && this.source.readyState === EventSource.CLOSED) {
+                this.close();
+            }
+        });
+    }
+
+    // Параметры отвеченного изменения; более ранние изменения уже не будут показаны
+    takeParams(seq) {
+        const params = this.sent.get(seq);
+        for (const sentSeq of this.sent.keys()) {
+            if (sentSeq <= seq) {
+                this.sent.delete(sentSeq);
+            }
+        }
+        return params;
+    }
+
+    close() {
+        clearTimeout(this.idleTimer);
+        this.idleTimer = null;
+        if (this.source) {
+            this.source.close();
+            this.source = null;
+        }
+        this.session = null;
+    }
+
+    update(params) {
+        if (!this.supported) {
+            return;
+        }
+        this.seq += 1;
+        this.latest = { seq: this.seq, params: params };
+        this.pending = this.latest;
+        if (!this.source) {
+            this.open();  // Изменение уйдет после события session
+        }
+        clearTimeout(this.idleTimer);
+        this.idleTimer = setTimeout(() => this.close(), LIVE_IDLE_MS);
+        this.send();
+    }
+
+    async send() {
+        if (this.sending || !this.pending || !this.session) {
+            return;
+        }
+        const change = this.pending;
+        this.pending = null;
+        this.sending = true;
+        this.sent.set(change.seq, change.params);
+        try {
+            const response = await fetch(`/api/live/${encodeURIComponent(this.session)}`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(change)
+            });
+            if (response.status === 404) {
+                // Сессия закрыта сервером: открываем новый поток, изменение повторится после события session
+                this.session = null;
+                if (!this.pending) {
+                    this.pending = change;
+                }
+                if (this.source) {
+                    this.source.close();
+                }
+                this.open();
+            }
+        } catch (error) {
+            console.error('Ошибка живого пересчета:', error);
+        } finally {
+            this.sending = false;
+        }
+        this.send();
+    }
+}
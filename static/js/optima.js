@@ -29,6 +29,14 @@ function validateForm() {
     return true;
 }
 
+// Проверка полей без сообщений (для живого пересчета во время ввода)
+function formIsReady() {
+    const width = parseFloat(document.getElementById('width').value);
+    const height = parseFloat(document.getElementById('height').value);
+    return document.getElementById('calculator-form').checkValidity() &&
+        width >= MIN_WIDTH && width <= MAX_WIDTH && height >= MIN_HEIGHT && height <= MAX_HEIGHT;
+}
+
 // Глобальные переменные
 let scene, camera, renderer, controls;
 let stairModel = new THREE.Group();
@@ -857,30 +865,75 @@ function updateResults(result) {
     resultBox.classList.remove('hidden');
 }
 
-// Обновляем функцию изменения 3D модели
-function updateStairsModel(dimensions) {
-    // Очищаем существующую модель
-    while(stairModel.children.length > 0) {
-        stairModel.remove(stairModel.children[0]);
+// Модель лестницы для /api/model: от нее зависит каркас
+const STAIR_MODEL = 'optima';
+
+// Создание модели из деталей GLB сервера: по одному InstancedMesh на тип деталей
+function createStairModelFromParts(parts, dimensions) {
+    const colors = COLOR_MAPPING[document.getElementById('frame-color').value];
+    const meshes = createInstancedParts(parts, {
+        profile: new THREE.MeshPhongMaterial({ color: colors.frame }),
+        board: new THREE.MeshPhongMaterial({ color: colors.dpk, flatShading: true }),
+        pvl: new THREE.MeshPhongMaterial({ color: colors.frame, flatShading: true }),
+        bolt: boltMaterial
+    });
+
+    scene.remove(stairModel);
+    stairModel = new THREE.Group();
+    coveringsGroup = new THREE.Group();
+    boltsGroup = new THREE.Group();
+
+    if (meshes.profile) {
+        stairModel.add(meshes.profile);
     }
-    while(coveringsGroup.children.length > 0) {
-        coveringsGroup.remove(coveringsGroup.children[0]);
+    if (meshes.board) {
+        meshes.board.userData.isDPK = true;
+        coveringsGroup.add(meshes.board);
     }
-    while(boltsGroup.children.length > 0) {
-        boltsGroup.remove(boltsGroup.children[0]);
+    if (meshes.pvl) {
+        meshes.pvl.userData.isPVL = true;
+        coveringsGroup.add(meshes.pvl);
     }
-    
-    // Создаем новую модель
-    createStairModel(dimensions);
+    if (meshes.bolt) {
+        meshes.bolt.userData.isBolt = true;
+        boltsGroup.add(meshes.bolt);
+    }
+    stairModel.add(coveringsGroup);
+    stairModel.add(boltsGroup);
+    scene.add(stairModel);
+
+    // Настраиваем камеру так же, как в createStairModel
+    camera.position.set(dimensions.width * 2, dimensions.height * 1.5, dimensions.width * 2);
+    camera.lookAt(0, dimensions.height / 2, 0);
+    controls.update();
 }
 
-// Обработчики событий
-document.getElementById('calculator-form').addEventListener('submit', async function(e) {
-    e.preventDefault();
-    
-    if (!validateForm()) {
-        return;
+// Номер последнего запроса модели: ответ на запрос, после которого был отправлен новый, не выводится
+let modelRequest = 0;
+
+// Обновляем 3D модель: она строится на сервере одним буфером; если он недоступен, собираем ее в браузере.
+// Прежняя модель остается на сцене, пока не готова новая (createStairModel заменяет группы целиком)
+async function updateStairsModel(dimensions, params) {
+    const request = ++modelRequest;
+    let parts = null;
+    try {
+        parts = await fetchStairModel(params, STAIR_MODEL);
+    } catch (error) {
+        console.warn(`Не удалось загрузить модель с сервера: ${error.message}`);
+    }
+    if (request !== modelRequest) {
+        return;  // Пока модель загружалась, запрошена более новая
+    }
+    if (parts) {
+        createStairModelFromParts(parts, dimensions);
+    } else {
+        createStairModel(dimensions);
     }
+}
+
+// Обработчики событий
+// Параметры расчета из полей формы
+function collectFormData() {
 //Если шинира меньше или равна 1000, то будет 1 перемычка в ступени. 
 //Иначе производим просчёт кол-ва перемычек в зависимости от ширины
 var peremI;
@@ -908,6 +961,17 @@ if(widthProscet > 1200){
         paint_consumption: parseFloat(document.getElementById('paint-consumption').value),
         frame_color: document.getElementById('frame-color').value
     };
+    return formData;
+}
+
+document.getElementById('calculator-form').addEventListener('submit', async function(e) {
+    e.preventDefault();
+    
+    if (!validateForm()) {
+        return;
+    }
+
+    const formData = collectFormData();
     
     try {
         const response = await fetch('/api/calculate', {
@@ -925,7 +989,7 @@ if(widthProscet > 1200){
         
         const result = await response.json();
         updateResults(result);
-        updateStairsModel(result.dimensions);
+        updateStairsModel(result.dimensions, formData);
         
     } catch (error) {
         if (!navigator.onLine) {
@@ -936,6 +1000,20 @@ if(widthProscet > 1200){
     }
 });
 
+// Живой пересчет: изменения полей отправляются в канал /api/live, сервер считает только последнее состояние
+const liveCalculator = new LiveCalculator(function(result, params) {
+    updateResults(result);
+    updateStairsModel(result.dimensions, params);
+}, function(message) {
+    updateResults({ error: message });
+});
+
+document.getElementById('calculator-form').addEventListener('input', function() {
+    if (formIsReady()) {
+        liveCalculator.update(collectFormData());
+    }
+});
+
 document.getElementById('has-platform').addEventListener('change', function(e) {
     const platformDepthContainer = document.getElementById('platform-depth-container');
     if (e.target.checked) {
@@ -0,0 +1,71 @@
+// Загрузка 3D-модели лестницы, построенной на сервере (/api/model).
+// Модель приходит одним GLB-буфером: по одному узлу с инстансингом (EXT_mesh_gpu_instancing)
+// на тип деталей, каждая деталь - смещение и масштаб единичного куба.
+
+const GLB_MAGIC = 0x46546C67; // 'glTF'
+
+// Разбор GLB: возвращает список типов деталей с массивами смещений и размеров
+function parseStairGLB(arrayBuffer) {
+    const view = new DataView(arrayBuffer);
+    if (view.getUint32(0, true) !== GLB_MAGIC) {
+        throw new Error('Ответ сервера не является GLB');
+    }
+    const jsonLength = view.getUint32(12, true);
+    const gltf = JSON.parse(new TextDecoder().decode(new Uint8Array(arrayBuffer, 20, jsonLength)));
+    const binOffset = 20 + jsonLength + 8; // Заголовок двоичной части - 8 байт
+
+    const readVec3 = (index) => {
+        const accessor = gltf.accessors[index];
+        const bufferView = gltf.bufferViews[accessor.bufferView];
+        const offset = binOffset + (bufferView.byteOffset || 0) + (accessor.byteOffset || 0);
+        return new Float32Array(arrayBuffer, offset, accessor.count * 3);
+    };
+
+    return gltf.nodes.map(node => {
+        const attributes = node.extensions.EXT_mesh_gpu_instancing.attributes;
+        return {
+            name: node.name,
+            translations: readVec3(attributes.TRANSLATION),
+            scales: readVec3(attributes.SCALE)
+        };
+    });
+}
+
+// Создание по одному InstancedMesh на тип деталей (один вызов отрисовки на тип)
+function createInstancedParts(parts, materials) {
+    const geometry = new THREE.BoxGeometry(1, 1, 1);
+    const matrix = new THREE.Matrix4();
+    const position = new THREE.Vector3();
+    const scale = new THREE.Vector3();
+    const rotation = new THREE.Quaternion();
+    const meshes = {};
+
+    parts.forEach(part => {
+        const count = part.translations.length / 3;
+        const mesh = new THREE.InstancedMesh(geometry, materials[part.name], count);
+        for (let i = 0; i < count; i++) {
+            position.fromArray(part.translations, i * 3);
+            scale.fromArray(part.scales, i * 3);
+            matrix.compose(position, rotation, scale);
+            mesh.setMatrixAt(i, matrix);
+        }
+        mesh.instanceMatrix.needsUpdate = true;
+        meshes[part.name] = mesh;
+    });
+    return meshes;
+}
+
+// Запрос модели с сервера по тем же параметрам, что и /api/calculate; model - каркас (eco, optima, komfort)
+async function fetchStairModel(params, model) {
+    const response = await fetch('/api/model', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(Object.assign({}, params, { model: model || 'eco' }))
+    });
+    if (!response.ok) {
+        throw new Error(`Сервер вернул статус ${response.status}`);
+    }
+    return parseStairGLB(await response.arrayBuffer());
+}
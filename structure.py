@@ -0,0 +1,150 @@
+"""Проверка прочности и прогиба каркаса лестницы из квадратной трубы PROFILE_THICKNESS x PROFILE_WALL.
+
+Расчетная схема упрощенная:
+- продольные профили рамы ступени (передний и задний, вдоль ширины) - однопролетные балки между
+  опорами (боковые стойки и передние усиления), пролет (width - 2t) / (n + 1) при n усилениях;
+  равномерная нагрузка собирается с половины глубины ступени. Отдельно проверяются обычная ступень
+  и последняя (площадка, если она есть);
+- профили по глубине (боковые и усиления глубины) - балки пролетом depth - 2t, равномерная нагрузка
+  собирается с полосы шириной в шаг усилений;
+- стойки и вертикальные усиления - сжатые стержни, раскрепленные на уровне каждой ступени (расчетная
+  длина - высота ступени); нагрузка собирается с шага усилений на половине глубины последней ступени.
+
+Нагрузки: равномерная STRUCT_AREA_LOAD (кПа) и сосредоточенная STRUCT_POINT_LOAD (Н, поровну на два
+несущих профиля) в середине пролета, не действующие одновременно; берется худший случай.
+Сосредоточенная нагрузка - местное воздействие на проступь: она проверяется для рам ступеней и стоек,
+а профили по глубине, несущие настил целиком, проверяются на равномерную нагрузку (поэтому их
+разгружают дополнительные усиления). Балка проходит, если напряжение не больше
+STRUCT_YIELD_STRENGTH / STRUCT_SAFETY_FACTOR, а прогиб не больше пролет / STRUCT_DEFLECTION_LIMIT;
+стойка - по напряжению и по критической силе Эйлера с тем же запасом. Коэффициент использования -
+наибольшее отношение к допустимому (не больше 1 - проходит).
+
+Формулы записаны один раз и работают как над массивами (пакетный движок, по элементу на набор), так и
+над числами (calculate_metal, без накладных расходов NumPy на одном наборе). Минимальное количество
+усилений подбирается проверкой вариантов 1..STRUCT_MAX_REINFORCEMENTS: в пакете - операциями
+над массивом (набор, вариант).
+"""
+import math  # Для числа пи
+
+import numpy as np  # Для векторных вычислений
+
+BEAMS = ("step_frame", "last_frame", "depth")  # Балки: рама обычной ступени, рама последней ступени, профили по глубине
+BEAM_FIELDS = ("span_mm", "stress_mpa", "deflection_mm", "utilization")
+STAND_FIELDS = ("length_mm", "force_n", "stress_mpa", "utilization")
+# Округляемые до сотых величины: имя столбца -> (элемент, поле)
+COLUMNS = {f"{member}_{field}": (member, field) for member in BEAMS for field in BEAM_FIELDS}
+COLUMNS.update({f"stand_{field}": ("stand", field) for field in STAND_FIELDS})
+FIRST_CANDIDATES = 4  # Количества усилений, которые проверяются для всех наборов пакета сразу
+
+
+def section(config) -> tuple:
+    """Площадь (мм²), момент инерции (мм⁴) и момент сопротивления (мм³) сечения трубы."""
+    b = config['PROFILE_THICKNESS']
+    inner = b - 2 * config['PROFILE_WALL']
+    area = b * b - inner * inner
+    inertia = (b * b * b * b - inner * inner * inner * inner) / 12
+    return area, inertia, inertia / (b / 2)
+
+
+def _members(width, step_depth, last_depth, step_height, n, config, maximum=np.maximum) -> dict:
+    """Величины всех элементов при n усилениях: элемент -> {поле: массив}.
+
+    Для одного набора вместо массивов передаются числа и maximum=max: формулы те же, а результат
+    совпадает с векторным расчетом бит в бит.
+    """
+    t = config['PROFILE_THICKNESS']
+    area, inertia, modulus = section(config)
+    stiffness = config['STRUCT_ELASTIC_MODULUS'] * inertia
+    allowable = config['STRUCT_YIELD_STRENGTH'] / config['STRUCT_SAFETY_FACTOR']
+    pressure = config['STRUCT_AREA_LOAD'] / 1000  # кПа -> Н/мм²
+    point = config['STRUCT_POINT_LOAD'] / 2  # Сосредоточенная нагрузка делится между двумя профилями
+    limit = config['STRUCT_DEFLECTION_LIMIT']
+    spacing = (width - 2 * t) / (maximum(n, 0) + 1)  # Шаг опор вдоль ширины
+
+    def beam(span, load, point):
+        # Огибающая двух случаев: равномерная нагрузка load (Н/мм) и сила point в середине пролета
+        moment = maximum(load * span * span / 8, point * span / 4)
+        cube = span * span * span
+        deflection = maximum(5 * load * cube * span / (384 * stiffness), point * cube / (48 * stiffness))
+        stress = moment / modulus
+        utilization = maximum(stress / allowable, deflection * limit / span)
+        return {"span_mm": span, "stress_mpa": stress, "deflection_mm": deflection, "utilization": utilization}
+
+    depth = maximum(step_depth, last_depth)
+    force = maximum(pressure * spacing * last_depth / 2, point)
+    critical = math.pi * math.pi * stiffness / (step_height * step_height)
+    stress = force / area
+    return {
+        "step_frame": beam(spacing, pressure * step_depth / 2, point),
+        "last_frame": beam(spacing, pressure * last_depth / 2, point),
+        "depth": beam(depth - 2 * t, pressure * spacing, 0.0),
+        "stand": {"length_mm": step_height, "force_n": force, "stress_mpa": stress,
+                  "utilization": maximum(stress / allowable, force * config['STRUCT_SAFETY_FACTOR'] / critical)},
+    }
+
+
+def _utilization(members: dict, maximum=np.maximum):
+    utilization = members["stand"]["utilization"]
+    for member in BEAMS:
+        utilization = maximum(utilization, members[member]["utilization"])
+    return utilization
+
+
+def evaluate(width, height, steps, step_depth, last_depth, reinforcements, config) -> dict:
+    """Проверка для массивов параметров (last_depth - глубина последней ступени или площадки).
+
+    Возвращает словарь массивов без округления: столбцы COLUMNS, utilization (наибольший
+    коэффициент использования) и reinforcements_required (0 - не хватает и STRUCT_MAX_REINFORCEMENTS).
+    """
+    width = np.asarray(width, dtype=np.float64)
+    height, steps, step_depth, last_depth, reinforcements = (
+        np.broadcast_to(np.asarray(a, dtype=np.float64), width.shape)
+        for a in (height, steps, step_depth, last_depth, reinforcements))
+    step_height = height / steps
+    members = _members(width, step_depth, last_depth, step_height, reinforcements, config)
+    columns = {name: np.broadcast_to(members[member][field], width.shape) for name, (member, field) in COLUMNS.items()}
+    columns["utilization"] = _utilization(members)
+
+    # Варианты количества усилений проверяются операцией над массивом (набор, вариант): сначала первые
+    # FIRST_CANDIDATES для всех наборов, остальные - только для наборов, которым их не хватило
+    candidates = np.arange(1, config['STRUCT_MAX_REINFORCEMENTS'] + 1)
+    required = np.zeros(width.shape, dtype=np.int64)
+    rows = np.arange(len(width))
+    for block in (candidates[:FIRST_CANDIDATES], candidates[FIRST_CANDIDATES:]):
+        if not (len(rows) and len(block)):
+            break
+        passed = _utilization(_members(width[rows, None], step_depth[rows, None], last_depth[rows, None],
+                                       step_height[rows, None], block[None, :], config)) <= 1
+        found = passed.any(axis=1)
+        required[rows[found]] = block[np.argmax(passed[found], axis=1)]
+        rows = rows[~found]
+    columns["reinforcements_required"] = required
+    return columns
+
+
+def layout(v) -> dict:
+    """Блок structure ответа calculate_metal из значений structure_* одного набора."""
+    block = {
+        "utilization": v['structure_utilization'],
+        "ok": v['structure_ok'],
+        "reinforcements_required": v['structure_reinforcements_required'],
+    }
+    for name, (member, field) in COLUMNS.items():
+        block.setdefault(member, {})[field] = v[f"structure_{name}"]
+    return block
+
+
+def structure_result(width: float, height: float, steps: int, step_depth: float, last_depth: float,
+                     reinforcements: int, config) -> dict:
+    """Блок structure ответа calculate_metal для одного набора (числа вместо массивов, те же формулы)."""
+    width, height, step_depth, last_depth = float(width), float(height), float(step_depth), float(last_depth)
+    step_height = height / float(steps)
+    members = _members(width, step_depth, last_depth, step_height, float(reinforcements), config, max)
+    utilization = _utilization(members, max)
+    required = next((n for n in range(1, config['STRUCT_MAX_REINFORCEMENTS'] + 1)
+                     if _utilization(_members(width, step_depth, last_depth, step_height, n, config, max), max) <= 1),
+                    None)
+    values = {f"structure_{name}": round(members[member][field], 2) for name, (member, field) in COLUMNS.items()}
+    values.update(structure_utilization=round(utilization, 2), structure_ok=utilization <= 1,
+                  structure_reinforcements_required=required)
+    return layout(values)
@@ -0,0 +1,261 @@
+"""Проверка инвариантов calculate_metal на всем допустимом пространстве параметров.
+
+Пространство - ширины и высоты с шагом resolution в пределах MIN_WIDTH..MAX_WIDTH и
+MIN_HEIGHT..MAX_HEIGHT, ступени 1..max_steps, все материалы, без платформы и с глубинами
+GRID_PLATFORM_DEPTHS, 1..max_reinforcements каркасов усилений. Оно делится на задачи по (ступени,
+материал, платформа, усиления); задача считает всю сетку ширина x высота пакетным движком
+(compute_arrays, результаты совпадают с calculate_metal) в отдельном процессе и проверяет:
+
+- неотрицательность длин, площадей и количеств, а также самой короткой стойки и высоты каркаса ступени;
+- неубывание величин по ширине и по высоте (между соседними узлами сетки);
+- равенство итогов сумме составляющих в ответе (после округления до мм и до сотых);
+- правила материалов: по два болта на доску ДПК (у листов ПВЛ болтов нет, как и в 3D-модели)
+  и хотя бы одна доска у материала с досками (ДПК+1 ПВЛ с одной ступенью уходит в ветку ПВЛ);
+- совпадение с calculate_metal в samples равномерно выбранных узлах сетки каждой задачи
+  (поштучный расчет берет константы из app.config).
+
+Отчет - JSON с числом нарушений по проверкам и по одной записи на задачу и проверку: число
+нарушений, диапазоны ширины и высоты и худший пример.
+"""
+import argparse  # Для разбора аргументов командной строки
+import json  # Для отчета
+import os  # Для работы с файловой системой
+import time  # Для измерения времени проверки
+from concurrent.futures import ProcessPoolExecutor  # Для распределения задач по процессам
+
+import numpy as np  # Для векторных проверок
+
+from batch import STRIP_LENGTH, STRIPS_COUNT, compute_arrays, round2
+from materials import MATERIAL_CODES, MATERIALS, material_plans
+
+SAMPLES = 8  # Узлов сетки на задачу для сверки с calculate_metal
+
+TOLERANCE = 1e-6  # Допуск сравнения неокругленных величин (мм, м², г)
+
+# Величины, которые не могут быть отрицательными
+NON_NEGATIVE = (
+    "base_length", "frame_standard", "frame_last", "steps_total", "stands", "stand_min", "front", "back",
+    "internal", "depth", "reinforcements_total", "total_length", "frame_height", "step_frame_height",
+    "frame_paint_area", "pvl_paint_area", "dpk_length", "dpk_boards", "bolts",
+)
+# Величины, не убывающие с ростом ширины и с ростом высоты
+INCREASING = {
+    "width": ("base_length", "steps_total", "total_length", "total_paint_area", "total_paint_weight",
+              "dpk_length"),
+    "height": ("stands", "front", "back", "reinforcements_total", "total_length", "total_paint_area",
+               "total_paint_weight"),
+}
+# Итоги ответа и их составляющие: (итог, составляющие, округление)
+SUMS = (
+    ("total_length", ("base_length", "steps_total", "stands", "reinforcements_total", "strips"), "mm"),
+    ("reinforcements_total", ("front", "back", "internal", "depth"), "mm"),
+    ("steps_total", ("frame_standard", "frame_last"), "mm"),  # steps - 1 стандартных рам и последняя
+    ("total_paint_area", ("frame_paint_area", "pvl_paint_area"), "hundredths"),
+    ("total_paint_weight", ("frame_paint_weight", "pvl_paint_weight"), "hundredths"),
+)
+# Величины для сверки с ответом calculate_metal: (величина, путь в ответе, округление)
+CROSS_CHECKS = (
+    ("base_length", ("base_frame", "mm"), "mm"),
+    ("steps_total", ("steps_frames", "total_mm"), "mm"),
+    ("stands", ("vertical_stands", "mm"), "mm"),
+    ("front", ("reinforcements", "front", "mm"), "mm"),
+    ("back", ("reinforcements", "back", "mm"), "mm"),
+    ("internal", ("reinforcements", "internal", "mm"), "mm"),
+    ("depth", ("reinforcements", "depth", "mm"), "mm"),
+    ("reinforcements_total", ("reinforcements", "total", "mm"), "mm"),
+    ("total_length", ("total_length", "mm"), "mm"),
+    ("frame_paint_area", ("paint", "frame_area"), "hundredths"),
+    ("pvl_paint_area", ("paint", "pvl_area"), "hundredths"),
+    ("total_paint_area", ("paint", "total_area"), "hundredths"),
+    ("total_paint_weight", ("paint", "total_weight"), "hundredths"),
+    ("dpk_boards", ("additional_materials", "dpk_boards"), "count"),
+    ("bolts", ("additional_materials", "bolts_count"), "count"),
+)
+
+
+def _response_value(result: dict, path: tuple, rounding: str) -> float:
+    """Величина из ответа calculate_metal в единицах _rounded."""
+    for key in path:
+        result = result[key]
+    return round(result * 100) if rounding == "hundredths" else result
+
+
+def space(config, resolution: int, max_steps: int, max_reinforcements: int) -> tuple:
+    """Оси сетки ширина x высота и список задач (ступени, материал, глубина платформы, усиления)."""
+    widths = np.arange(config['MIN_WIDTH'], config['MAX_WIDTH'] + 1, resolution, dtype=np.float64)
+    heights = np.arange(config['MIN_HEIGHT'], config['MAX_HEIGHT'] + 1, resolution, dtype=np.float64)
+    tasks = [(steps, material, float(platform), reinforcements)
+             for steps in range(1, max_steps + 1)
+             for material in MATERIALS
+             for platform in (0, *config['GRID_PLATFORM_DEPTHS'])
+             for reinforcements in range(1, max_reinforcements + 1)]
+    return widths, heights, tasks
+
+
+def _stand_min(columns: dict, steps: int, plan, profile_thickness: int) -> np.ndarray:
+    """Высота самой короткой стойки (первая или вторая ступень, у остальных стойки выше)."""
+    if steps == 1:
+        return columns["step_frame_height"] - 2 * profile_thickness
+    step_height = columns["step_height"]
+    return np.minimum(step_height - plan.first_reduction, 2 * step_height - plan.reduction) - 2 * profile_thickness
+
+
+def _rounded(values: np.ndarray, rounding: str) -> np.ndarray:
+    """Величина в единицах ответа: целые мм или сотые доли."""
+    if rounding == "count":
+        return values
+    return np.rint(values) if rounding == "mm" else np.rint(round2(values) * 100)
+
+
+def _cross_check(columns: dict, widths: np.ndarray, heights: np.ndarray, task: tuple, paint: float,
+                 samples: int) -> list:
+    """Сверяет пакетный расчет с calculate_metal в samples узлах сетки.
+
+    Возвращает записи для found: расхождение по каждой величине в выбранных узлах.
+    """
+    from app import calculate_metal  # Поштучный расчет (импорт в процессе задачи)
+
+    steps, material, platform, reinforcements = task
+    shape = (len(widths), len(heights))
+    nodes = np.unique(np.linspace(0, shape[0] * shape[1] - 1, samples).astype(np.int64))
+    differences = {name: np.zeros(shape) for name, _, _ in CROSS_CHECKS}
+    missing = np.zeros(shape, dtype=bool)
+    for node in nodes:
+        i, j = np.unravel_index(node, shape)
+        result = calculate_metal(float(widths[i]), float(heights[j]), steps, material, platform > 0, platform,
+                                 reinforcements, paint)
+        if result is None:
+            missing[i, j] = True
+            continue
+        for name, path, rounding in CROSS_CHECKS:
+            expected = _response_value(result, path, rounding)
+            differences[name][i, j] = _rounded(columns[name][i, j], rounding) - expected
+    found = [("calc:none", missing, missing.astype(float), "max")]
+    for name, _, _ in CROSS_CHECKS:
+        found.append((f"calc:{name}", differences[name] != 0, np.abs(differences[name]), "max"))
+    return found
+
+
+def check_task(config, widths: np.ndarray, heights: np.ndarray, task: tuple, samples: int = SAMPLES) -> tuple:
+    """Проверяет сетку ширина x высота для одной задачи.
+
+    Возвращает (число наборов, записи о нарушениях).
+    """
+    steps, material, platform, reinforcements = task
+    shape = (len(widths), len(heights))
+    width, height = (a.reshape(-1) for a in np.meshgrid(widths, heights, indexing='ij'))
+    n = len(width)
+    columns = compute_arrays(
+        width, height, np.full(n, steps), np.full(n, MATERIAL_CODES[material]), np.full(n, platform > 0),
+        np.full(n, platform), np.full(n, reinforcements), np.full(n, float(config['GRID_PAINT_CONSUMPTION'])),
+        config)
+    columns = {name: np.broadcast_to(values, (n,)).reshape(shape) for name, values in columns.items()}
+    plan = material_plans(config)[material]
+    columns["stand_min"] = _stand_min(columns, steps, plan, config['PROFILE_THICKNESS'])
+    columns["strips"] = np.full(shape, float(STRIP_LENGTH * STRIPS_COUNT))
+
+    found = []  # (проверка, маска нарушений, величина нарушения, худшее - минимум или максимум)
+    for name in NON_NEGATIVE:
+        values = columns[name]
+        found.append((f"negative:{name}", values < -TOLERANCE, values, "min"))
+    for axis, (direction, names) in enumerate(INCREASING.items()):
+        for name in names:
+            decrease = np.diff(columns[name], axis=axis)
+            # Нарушение относится к узлу с большей шириной (высотой)
+            pad = ((1, 0), (0, 0)) if axis == 0 else ((0, 0), (1, 0))
+            decrease = np.pad(decrease, pad, constant_values=0.0)
+            found.append((f"{direction}:{name}", decrease < -TOLERANCE, decrease, "min"))
+    for total, parts, rounding in SUMS:
+        rounded = [_rounded(columns[part], rounding) for part in parts]
+        if total == "steps_total":
+            rounded[0] = rounded[0] * (steps - 1)
+        difference = _rounded(columns[total], rounding) - sum(rounded)
+        found.append((f"sum:{total}", difference != 0, np.abs(difference), "max"))
+    # Правила материалов
+    extra_bolts = columns["bolts"] - 2 * columns["dpk_boards"]
+    found.append(("rule:bolts_per_board", extra_bolts != 0, extra_bolts, "max"))
+    if plan.has_boards:
+        found.append(("rule:boards_missing", columns["dpk_boards"] == 0, columns["dpk_boards"], "max"))
+    if samples:
+        found += _cross_check(columns, widths, heights, task, float(config['GRID_PAINT_CONSUMPTION']), samples)
+
+    records = []
+    for check, mask, values, worst in found:
+        count = int(mask.sum())
+        if not count:
+            continue
+        w, h = np.nonzero(mask)
+        flat = np.where(mask, values, np.inf if worst == "min" else -np.inf)
+        i, j = np.unravel_index(np.argmin(flat) if worst == "min" else np.argmax(flat), shape)
+        records.append({
+            "check": check, "steps": steps, "material": material, "platform_depth": platform,
+            "reinforcements_count": reinforcements, "count": count,
+            "width": [float(widths[w.min()]), float(widths[w.max()])],
+            "height": [float(heights[h.min()]), float(heights[h.max()])],
+            "example": {"width": float(widths[i]), "height": float(heights[j]), "value": round(float(values[i, j]), 4)},
+        })
+    return n, records
+
+
+def _run(args: tuple) -> tuple:
+    return check_task(*args)
+
+
+def sweep(config, resolution: int, max_steps: int, max_reinforcements: int = 1, workers: int = 1,
+          samples: int = SAMPLES) -> dict:
+    """Проверяет все пространство параметров; при workers > 1 задачи выполняются в пуле процессов."""
+    started = time.perf_counter()
+    widths, heights, tasks = space(config, resolution, max_steps, max_reinforcements)
+    jobs = [(config, widths, heights, task, samples) for task in tasks]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run, jobs, chunksize=1))
+    else:
+        results = [_run(job) for job in jobs]
+
+    anomalies = sorted((record for _, records in results for record in records),
+                       key=lambda r: (r["check"], r["material"], r["steps"], r["platform_depth"],
+                                      r["reinforcements_count"]))
+    checks = {}
+    for record in anomalies:
+        checks[record["check"]] = checks.get(record["check"], 0) + record["count"]
+    return {
+        "combinations": sum(n for n, _ in results),
+        "seconds": round(time.perf_counter() - started, 2),
+        "space": {"resolution": resolution, "max_steps": max_steps, "max_reinforcements": max_reinforcements,
+                  "platform_depths": [0, *config['GRID_PLATFORM_DEPTHS']], "materials": list(MATERIALS),
+                  "samples": samples},
+        "checks": dict(sorted(checks.items())),
+        "anomalies": anomalies,
+    }
+
+
+def main():
+    from config import get_config  # Импорт только для запуска из командной строки
+
+    parser = argparse.ArgumentParser(description="Проверка инвариантов calculate_metal")
+    parser.add_argument('--resolution', type=int, default=10, help="Шаг по ширине и высоте, мм")
+    parser.add_argument('--max-steps', type=int, help="Максимум ступеней (по умолчанию GRID_MAX_STEPS)")
+    parser.add_argument('--max-reinforcements', type=int, default=1, help="Максимум каркасов усилений")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Число процессов")
+    parser.add_argument('--samples', type=int, default=SAMPLES,
+                        help="Узлов сетки на задачу для сверки с calculate_metal (0 - без сверки)")
+    parser.add_argument('--output', default='data/sweep.json', help="Путь к отчету JSON")
+    args = parser.parse_args()
+
+    config_object = get_config()
+    config = {key: getattr(config_object, key) for key in dir(config_object) if key.isupper()}
+    report = sweep(config, args.resolution, args.max_steps or config['GRID_MAX_STEPS'],
+                   args.max_reinforcements, args.workers, args.samples)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+
+    print(f"Проверено {report['combinations']} наборов за {report['seconds']} с, отчет: {args.output}")
+    for check, count in report['checks'].items():
+        print(f"  {check}: {count}")
+    raise SystemExit(1 if report['anomalies'] else 0)
+
+
+if __name__ == '__main__':
+    main()
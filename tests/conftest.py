@@ -0,0 +1,18 @@
+"""Общая настройка тестов: данные приложения пишутся во временную папку, а не в data/ проекта.
+
+Переменные окружения задаются до импорта app (pytest загружает этот файл раньше модулей тестов).
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+DATA_DIR = tempfile.mkdtemp(prefix='dpk-tests-')
+atexit.register(shutil.rmtree, DATA_DIR, True)
+
+# История расчетов: тесты проверяют запись, поэтому хранилище включено, но база временная
+os.environ.setdefault('QUOTES_DB_PATH', os.path.join(DATA_DIR, 'quotes.db'))
+# Дисковый кэш превью
+os.environ.setdefault('PREVIEW_DIR', os.path.join(DATA_DIR, 'previews'))
+# Логи процессов тестов
+os.environ.setdefault('LOG_DIR', os.path.join(DATA_DIR, 'logs'))
@@ -0,0 +1,84 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module  # Модуль приложения (для подмены ограничителя)
+from admission import AdmissionLimiter, Overloaded, SingleFlight  # Объединение запросов и ограничение нагрузки
+
+class TestAdmission(unittest.TestCase):
+    def test_singleflight_merges_calls(self):
+        # Пока ведущий вызов считает, остальные с тем же ключом ждут его результат
+        flight = SingleFlight()
+        started, release, calls, results = threading.Event(), threading.Event(), [], []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "результат"
+
+        threads = [threading.Thread(target=lambda: results.append(flight.do("ключ", compute))) for _ in range(5)]
+        threads[0].start()
+        started.wait(5)  # Ведущий вызов начал расчет
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.1)  # Остальные вызовы успевают встать в ожидание
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([value for value, _ in results], ["результат"] * 5)
+        self.assertEqual(sum(merged for _, merged in results), 4)
+        self.assertEqual(len(flight), 0)
+
+    def test_limiter_queue_and_shedding(self):
+        # Сверх предела запрос ждет; при заполненной очереди или долгом ожидании - отказ
+        limiter = AdmissionLimiter(max_in_flight=1, max_queue=1, queue_timeout=0.05)
+        self.assertFalse(limiter.acquire())
+        with self.assertRaises(Overloaded) as timeout:
+            limiter.acquire()
+        self.assertEqual(timeout.exception.reason, "timeout")
+        limiter.max_queue = 0
+        with self.assertRaises(Overloaded) as full:
+            limiter.acquire()
+        self.assertEqual(full.exception.reason, "queue_full")
+        limiter.max_queue, limiter.queue_timeout = 1, 5
+        waiter = threading.Thread(target=lambda: limiter.run(lambda: None))
+        waiter.start()
+        while not limiter.waiting:
+            time.sleep(0.001)
+        limiter.release()  # Место освободилось - ожидающий запрос выполняется
+        waiter.join()
+        self.assertEqual((limiter.in_flight, limiter.waiting), (0, 0))
+        # По умолчанию расчеты, очередь и потоки /api/live умещаются в потоках воркера gthread
+        config = app_module.app.config
+        self.assertLessEqual(config['ADMISSION_MAX_IN_FLIGHT'] + config['ADMISSION_MAX_QUEUE'] + config['LIVE_MAX_SESSIONS'],
+                             config['WEB_THREADS'])
+
+    def test_calculate_sheds_with_retry_after(self):
+        # Без свободных мест и очереди расчет сразу получает 503 с Retry-After, кэш по-прежнему отвечает
+        client = app_module.app.test_client()
+        payload = {'width': 1234, 'height': 1700, 'steps': 9, 'material': 'ДПК', 'has_platform': False}
+        previous = app_module.admission
+        app_module.admission = AdmissionLimiter(max_in_flight=0, max_queue=0, queue_timeout=0)
+        try:
+            app_module.result_cache.clear()
+            response = client.post('/api/calculate', json=payload)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], str(app_module.app.config['ADMISSION_RETRY_AFTER']))
+        finally:
+            app_module.admission = previous
+        self.assertEqual(client.post('/api/calculate', json=payload).status_code, 200)
+        app_module.admission = AdmissionLimiter(max_in_flight=0, max_queue=0, queue_timeout=0)
+        try:
+            self.assertEqual(client.post('/api/calculate', json=payload).status_code, 200)  # Из кэша
+        finally:
+            app_module.admission = previous
+
+if __name__ == '__main__':
+    unittest.main()
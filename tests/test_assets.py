@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+import gzip
+import tempfile
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app  # Импорт приложения
+from assets import Assets, IMMUTABLE, STATIC_DIR, build, minify_js, split_shared  # Сборка ресурсов
+
+class TestAssets(unittest.TestCase):
+    def test_minify_keeps_strings_and_regex(self):
+        # Комментарии удаляются, строки, шаблоны и регулярные выражения остаются как есть
+        source = "// комментарий\nvar url = 'http://x'; /* блок */\nvar re = /a\\/b/g;\n" \
+                 "var t = `${a + `//`}`;\nvar s = a + +b;\nreturn\nvalue\n"
+        minified = minify_js(source)
+        self.assertNotIn("комментарий", minified)
+        self.assertNotIn("блок", minified)
+        self.assertIn("'http://x'", minified)
+        self.assertIn("/a\\/b/g", minified)
+        self.assertIn("`${a + `//`}`", minified)
+        self.assertIn("a+ +b", minified)
+        self.assertIn("return\nvalue", minified)  # Перевод строки после return сохраняется
+
+    def test_split_shared(self):
+        # В общий код уходят только функции, одинаковые во всех скриптах
+        common, pages = split_shared({
+            "a": "function same(x) { return x; }\nfunction own() { return 1; }\nsame(1);\n",
+            "b": "// другой комментарий\n  function same(x)  {  return x;  } // отступы не важны\nfunction own() { return 2; }\n",
+        })
+        self.assertIn("function same", common)
+        self.assertNotIn("own", common)
+        self.assertNotIn("same(x)", pages["a"])
+        self.assertIn("same(1)", pages["a"])
+        self.assertIn("return 2", pages["b"])
+
+    def test_build_and_serve(self):
+        # Собранный файл раздается со сжатием, неизменяемым кэшем и ответом 304 по ETag
+        with tempfile.TemporaryDirectory() as dist_dir:
+            manifest = build(STATIC_DIR, dist_dir)
+            self.assertIn("js/common.js", manifest)
+            previous = app.extensions['assets']
+            app.extensions['assets'] = Assets(dist_dir)
+            app.jinja_env.globals['page_scripts'] = app.extensions['assets'].page_scripts
+            try:
+                client = app.test_client()
+                url = f"/assets/{manifest['js/eco.js']}"
+                response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+                self.assertEqual(response.headers['Cache-Control'], IMMUTABLE)
+                self.assertIn('Accept-Encoding', response.headers['Vary'])
+                with open(os.path.join(dist_dir, manifest['js/eco.js']), 'rb') as f:
+                    self.assertEqual(gzip.decompress(response.get_data()), f.read())
+                etag = response.headers['ETag']
+                cached = client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(client.get('/assets/js/missing.js').status_code, 404)
+                # Страница подключает общий скрипт и скрипт страницы из сборки
+                page = client.get('/eco.html')
+                self.assertIn(manifest['js/common.js'], page.get_data(as_text=True))
+                self.assertEqual(client.get('/eco.html', headers={'If-None-Match': page.headers['ETag']}).status_code, 304)
+            finally:
+                app.extensions['assets'] = previous
+                app.jinja_env.globals['page_scripts'] = previous.page_scripts
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+import json
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, calculate_metal  # Импорт приложения и функции расчета
+from batch import calculate_metal_batch, calculate_metal_batch_json, tune_allocator  # Пакетный расчет
+from params import parse_params  # Разбор параметров
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        # Настройка тестового клиента Flask
+        self.app = app.test_client()
+        self.app.testing = True
+        # Наборы параметров, покрывающие все материалы, платформу и одну ступень
+        self.items = []
+        for material in ["ПВЛ", "ДПК", "ДПК+1 ПВЛ"]:
+            for steps in [1, 2, 7]:
+                for has_platform in [False, True]:
+                    self.items.append({
+                        'width': 1234.5,
+                        'height': 1115,
+                        'steps': steps,
+                        'material': material,
+                        'has_platform': has_platform,
+                        'platform_depth': 905 if has_platform else 0,
+                        'reinforcements_count': 2,
+                        'paint_consumption': 95.5,
+                        'frame_color': 'RAL8017'
+                    })
+
+    def test_batch_matches_calculate_metal(self):
+        # Пакетный расчет должен совпадать с поштучным
+        results = calculate_metal_batch(self.items, app.config)
+        for item, result in zip(self.items, results):
+            expected = calculate_metal(*parse_params(item))
+            self.assertEqual(result, expected)
+
+    def test_batch_json_matches_jsonify_layout(self):
+        # JSON пакетного расчета должен совпадать с компактным JSON поштучного результата
+        body = json.loads(calculate_metal_batch_json(self.items, app.config))
+        self.assertEqual(body['errors'], 0)
+        for item, result in zip(self.items, body['results']):
+            self.assertEqual(result, calculate_metal(*parse_params(item)))
+
+    def test_batch_per_item_errors(self):
+        # Ошибки отдельных наборов не прерывают расчет остальных
+        results = calculate_metal_batch([
+            self.items[0],
+            {'width': 100, 'height': 2000, 'steps': 10, 'material': 'ДПК', 'has_platform': False},
+            {'width': 800, 'height': 2000},
+            {'width': 800, 'height': 2000, 'steps': 10, 'material': 'Дерево', 'has_platform': False},
+        ], app.config)
+        self.assertIn('total_length', results[0])
+        self.assertIn('Ширина 100.0 мм', results[1]['error'])
+        self.assertIn('steps', results[2]['error'])
+        self.assertEqual(results[3]['error'], 'Неверный материал')
+
+    def test_batch_json_mixed_value_types(self):
+        # Наборы с числами в строках, флагом-числом и без глубины разбираются по одному, остальные - по столбцам
+        items = self.items + [
+            dict(self.items[3], width="1200", paint_consumption="90.25"),
+            dict(self.items[5], has_platform=1),
+            {'width': 1000, 'height': 1700, 'steps': 10, 'material': 'ДПК', 'has_platform': False},
+            {'width': 1000, 'height': 1700, 'steps': 10, 'material': 'ДПК', 'has_platform': True},
+            dict(self.items[1], width=1000.123, height=1700),
+        ]
+        body = json.loads(calculate_metal_batch_json(items, app.config))
+        self.assertEqual(body['errors'], 1)
+        for item, result in zip(items, body['results']):
+            if 'error' in result:
+                self.assertNotIn('platform_depth', item)
+                continue
+            self.assertEqual(result, calculate_metal(*parse_params(item)))
+        # Без glibc или с нулевым порогом настройки malloc не меняются
+        self.assertFalse(tune_allocator(0))
+
+    def test_api_calculate_batch(self):
+        # Проверка API пакетного расчета
+        response = self.app.post('/api/calculate/batch', json={'items': self.items + [{'width': 800}]})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(len(data['results']), len(self.items) + 1)
+        self.assertEqual(data['errors'], 1)
+        self.assertIn('error', data['results'][-1])
+
+    def test_api_calculate_batch_huge_counts(self):
+        # Огромные количества ступеней и усилений - ошибка своего набора, остальные наборы считаются
+        huge = [dict(self.items[0], steps=10 ** 20), dict(self.items[0], reinforcements_count=-10 ** 20)]
+        response = self.app.post('/api/calculate/batch', json=[self.items[0], *huge, self.items[1]])
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['errors'], 2)
+        self.assertIn('Количество ступеней', data['results'][1]['error'])
+        self.assertIn('Количество усилений', data['results'][2]['error'])
+        self.assertEqual(data['results'][3], calculate_metal(*parse_params(self.items[1])))
+
+    def test_api_calculate_batch_invalid(self):
+        # Тело запроса должно содержать массив наборов параметров
+        response = self.app.post('/api/calculate/batch', json={'width': 800})
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+import sys
+import os
+
+# Добавляем каталог бенчмарков в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+
+from bench import compare, measure  # Сравнение с базовой линией
+from load import make_payloads  # Генератор нагрузки
+
+class TestBench(unittest.TestCase):
+    def test_compare_detects_regression(self):
+        # Замедление больше порога - регрессия; для пропускной способности лучше большее значение
+        baseline = {"calc": {"value": 10.0}, "load/throughput": {"value": 100.0}}
+        current = {"calc": {"value": 13.0, "better": "lower"},
+                   "load/throughput": {"value": 70.0, "better": "higher"},
+                   "new": {"value": 1.0, "better": "lower"}}
+        names = [name for name, *_ in compare(current, baseline, 0.2)]
+        self.assertEqual(names, ["calc", "load/throughput"])
+        self.assertEqual(compare(current, baseline, 0.5), [])
+
+    def test_measure_and_payloads(self):
+        # Замер возвращает время одного вызова, а нагрузка воспроизводима при том же seed
+        result = measure(lambda: None, 10, 2)
+        self.assertEqual((result["unit"], result["better"]), ("us", "lower"))
+        self.assertEqual(make_payloads(100, 7, 0.5), make_payloads(100, 7, 0.5))
+
+if __name__ == '__main__':
+    unittest.main()
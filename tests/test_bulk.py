@@ -0,0 +1,80 @@
+import unittest
+import sys
+import os
+import io
+import json
+import itertools
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, calculate_metal  # Импорт приложения и функции расчета
+from bulk import CALCULATION_FAILED, compute_chunk, iter_lines, ndjson_rows, stream_ndjson  # Потоковый расчет файлов
+
+ROW = {'width': 1000, 'height': 1700, 'steps': 10, 'material': 'ДПК', 'has_platform': False}
+
+class TestBulk(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_ndjson_with_bad_rows(self):
+        # Ошибочные строки возвращаются на своих местах, остальные совпадают с calculate_metal
+        body = "\n".join([json.dumps(ROW), "{не json", json.dumps(dict(ROW, width=10)), "",
+                          json.dumps(dict(ROW, material='ПВЛ'))]) + "\n"
+        response = self.client.post('/api/calculate/stream', data=body.encode(),
+                                    content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([line['row'] for line in lines], [1, 2, 3, 4])
+        self.assertEqual(lines[0]['result'], json.loads(json.dumps(calculate_metal(**ROW))))
+        self.assertEqual(lines[1]['error'], "Некорректная строка JSON")
+        self.assertIn("Ширина 10.0 мм", lines[2]['error'])
+        self.assertEqual(lines[3]['result']['dimensions']['material'], 'ПВЛ')
+
+    def test_csv_semicolon_upload(self):
+        # CSV из Excel: точка с запятой, десятичная запятая, флаг платформы словами
+        csv_text = "width;height;steps;material;has_platform;platform_depth\n" \
+                   "1000,5;1700;10;ДПК;да;900\n1000;1700;10;ДПК;может быть;\n"
+        response = self.client.post('/api/calculate/stream?format=csv', content_type='multipart/form-data',
+                                    data={'file': (io.BytesIO(csv_text.encode('utf-8-sig')), 'orders.csv')})
+        self.assertEqual(response.status_code, 200)
+        rows = response.get_data(as_text=True).splitlines()
+        expected = calculate_metal(1000.5, 1700, 10, 'ДПК', True, 900)
+        self.assertTrue(rows[0].startswith('row,error,total_mm'))
+        self.assertTrue(rows[1].startswith(f"1,,{expected['total_length']['mm']},"))
+        self.assertIn("has_platform", rows[2])
+        bad = self.client.post('/api/calculate/stream', data=b'a;b\n1;2\n', content_type='text/csv')
+        self.assertEqual(bad.status_code, 400)
+
+    def test_bad_row_does_not_abort_stream(self):
+        # Строка с огромным количеством ступеней - ошибка этой строки, остальные 43 строки считаются
+        csv_text = "width,height,steps,material\n" + "1000,1700,10,ДПК\n" * 3 + f"1000,1700,{10 ** 20},ДПК\n" \
+                   + "1000,1700,10,ДПК\n" * 40
+        response = self.client.post('/api/calculate/stream?format=csv', data=csv_text.encode(),
+                                    content_type='text/csv')
+        rows = response.get_data(as_text=True).splitlines()
+        self.assertEqual(len(rows), 45)
+        self.assertIn("Количество ступеней", rows[4])
+        self.assertTrue(all(row.split(',')[1] == '' for row in rows[1:4] + rows[5:]))
+
+        # Если пакетный движок падает на порции, она пересчитывается по одной строке
+        def calculate(items, config):
+            if any(item.get('broken') for item in items):
+                raise OverflowError
+            return [item['width'] for item in items]
+        chunk = [(1, ROW, None), (2, dict(ROW, broken=True), None), (3, None, "ошибка"), (4, ROW, None)]
+        self.assertEqual(list(compute_chunk(calculate, chunk, app.config, CALCULATION_FAILED)),
+                         [1000, CALCULATION_FAILED, 1000])
+
+    def test_streaming_is_lazy(self):
+        # Первая порция выдается без чтения всего входа (вход здесь бесконечный)
+        rows = ((n + 1, ROW, None) for n in itertools.count())
+        first = next(stream_ndjson(rows, app.config, 256))
+        self.assertEqual(first.count("\n"), 16)
+        # Слишком длинная строка заменяется ошибкой, а следующая читается как обычно
+        lines = list(iter_lines(io.BytesIO(b'x' * 100 + b'\n{}\n'), 50))
+        self.assertEqual(lines, [None, '{}'])
+        self.assertEqual(next(ndjson_rows(lines))[2], "Строка слишком длинная")
+
+if __name__ == '__main__':
+    unittest.main()
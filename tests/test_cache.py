@@ -0,0 +1,85 @@
+import unittest
+import sys
+import os
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, result_cache  # Импорт приложения и кэша результатов
+from cache import ResultCache  # Кэш результатов
+
+class FakeClock:
+    # Управляемые часы для проверки времени жизни записей
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestResultCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        # При переполнении вытесняется давно не использованная запись
+        cache = ResultCache(max_size=2)
+        cache.put('a', b'1')
+        cache.put('b', b'2')
+        cache.get('a')
+        cache.put('c', b'3')
+        self.assertEqual(cache.get('a'), b'1')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_ttl_expiration(self):
+        # Устаревшая запись не возвращается
+        clock = FakeClock()
+        cache = ResultCache(max_size=10, ttl=60, clock=clock)
+        cache.put('a', b'1')
+        clock.now = 59
+        self.assertEqual(cache.get('a'), b'1')
+        clock.now = 61
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_fingerprint_invalidation(self):
+        # Изменение настроек расчета сбрасывает кэш
+        cache = ResultCache(max_size=10)
+        cache.check_fingerprint((20, 305))
+        cache.put('a', b'1')
+        cache.check_fingerprint((20, 305))
+        self.assertEqual(len(cache), 1)
+        cache.check_fingerprint((20, 310))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()['invalidations'], 1)
+
+class TestApiCache(unittest.TestCase):
+    def setUp(self):
+        # Настройка тестового клиента Flask
+        self.app = app.test_client()
+        self.app.testing = True
+        result_cache.clear()
+
+    def test_repeated_request_is_served_from_cache(self):
+        # Повторный запрос возвращает те же байты и учитывается как попадание
+        payload = {'width': 900, 'height': 1500, 'steps': 6, 'material': 'ПВЛ', 'has_platform': False}
+        hits = result_cache.hits
+        first = self.app.post('/api/calculate', json=payload)
+        second = self.app.post('/api/calculate', json=payload)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.get_data(), second.get_data())
+        self.assertEqual(result_cache.hits, hits + 1)
+        stats = self.app.get('/api/cache/stats').get_json()
+        self.assertEqual(stats['results']['size'], 1)
+
+    def test_config_change_invalidates_cache(self):
+        # После изменения константы материала результат пересчитывается
+        payload = {'width': 900, 'height': 1500, 'steps': 6, 'material': 'ДПК', 'has_platform': False}
+        before = self.app.post('/api/calculate', json=payload).get_json()
+        original = app.config['DPK_DEPTH']
+        app.config['DPK_DEPTH'] = original + 10
+        try:
+            after = self.app.post('/api/calculate', json=payload).get_json()
+        finally:
+            app.config['DPK_DEPTH'] = original
+        self.assertNotEqual(before['base_frame'], after['base_frame'])
+
+if __name__ == '__main__':
+    unittest.main()
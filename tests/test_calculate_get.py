@@ -0,0 +1,68 @@
+import unittest
+import sys
+import os
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module  # Модуль приложения (для счетчиков расчетов)
+from params import canonical_query, parse_params, query_etag, query_params
+
+PAYLOAD = {'width': 1250, 'height': 1700, 'steps': 8, 'material': 'ДПК+1 ПВЛ', 'has_platform': True,
+           'platform_depth': 900}
+
+class TestCalculateGet(unittest.TestCase):
+    def test_canonical_query(self):
+        # Разные записи одного набора дают одну строку: порядок, запись чисел и значения по умолчанию
+        canonical = canonical_query(parse_params(PAYLOAD), 'json')
+        self.assertEqual(canonical, 'width=1250&height=1700&steps=8&material=%D0%94%D0%9F%D0%9A%2B1%20%D0%9F%D0%92%D0%9B'
+                                    '&has_platform=1&platform_depth=900')
+        spelled = {'platform_depth': '9e2', 'has_platform': 'да', 'frame_color': 'RAL9005', 'steps': '8',
+                   'material': 'ДПК+1 ПВЛ', 'height': '1700.00', 'width': '1250.0', 'reinforcements_count': '1'}
+        self.assertEqual(canonical_query(parse_params(query_params(spelled)), 'json'), canonical)
+        self.assertEqual(canonical_query(parse_params(query_params(dict(spelled, has_platform='0'))), 'compact'),
+                         'width=1250&height=1700&steps=8&material=%D0%94%D0%9F%D0%9A%2B1%20%D0%9F%D0%92%D0%9B&format=compact')
+        with self.assertRaises(ValueError):
+            query_params(dict(spelled, has_platform='может быть'))
+
+    def test_redirect_etag_and_not_modified(self):
+        # Неканоническая ссылка перенаправляется на каноническую, ответ совпадает с POST, повтор с ETag - 304
+        client = app_module.app.test_client()
+        response = client.get('/api/calculate?platform_depth=900.0&has_platform=true&material=%D0%94%D0%9F%D0%9A%2B1+'
+                              '%D0%9F%D0%92%D0%9B&steps=8&height=1700&width=1250')
+        self.assertEqual(response.status_code, 301)
+        self.assertIn('max-age=', response.headers['Cache-Control'])
+        location = response.headers['Location']
+        self.assertTrue(location.endswith('/api/calculate?' + canonical_query(parse_params(PAYLOAD), 'json')))
+
+        response = client.get(location)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, client.post('/api/calculate', json=PAYLOAD).data)
+        etag, weak = response.get_etag()
+        self.assertFalse(weak)
+        self.assertTrue(response.headers['Cache-Control'].startswith('public'))
+
+        counters = app_module.metrics.counters
+        key = ('dpk_calculations_total', (('material', 'ДПК+1 ПВЛ'),))
+        before = counters.get(key, 0)
+        cached = client.get(location, headers={'If-None-Match': f'"{etag}"'})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.get_etag(), (etag, False))
+        self.assertEqual(counters.get(key, 0), before)  # Без расчета и без обращения к кэшу результатов
+        # Ослабленный прокси ETag (W/"...") тоже дает 304
+        self.assertEqual(client.get(location, headers={'If-None-Match': f'W/"{etag}"'}).status_code, 304)
+
+    def test_etag_depends_on_config_and_errors(self):
+        # ETag меняется вместе с константами расчета; некорректные параметры дают 400
+        canonical = canonical_query(parse_params(PAYLOAD), 'json')
+        config = dict(app_module.app.config)
+        etag = query_etag(canonical, config)
+        self.assertEqual(query_etag(canonical, dict(config)), etag)
+        self.assertNotEqual(query_etag(canonical, dict(config, DPK_DEPTH=config['DPK_DEPTH'] + 5)), etag)
+        client = app_module.app.test_client()
+        self.assertEqual(client.get('/api/calculate?width=1250&height=1700&steps=8&material=ДПК&has_platform=x').status_code, 400)
+        self.assertEqual(client.get('/api/calculate?width=99999&height=1700&steps=8&material=ДПК').status_code, 400)
+        self.assertEqual(client.get('/api/calculate?height=1700&steps=8&material=ДПК').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
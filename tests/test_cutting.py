@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, calculate_metal  # Импорт приложения и функции расчета
+from cutting import Piece, pieces_from_result, plan_cuts, plan_orders  # План раскроя
+
+class TestCutting(unittest.TestCase):
+    def test_pieces_match_profile_length(self):
+        # Сумма отрезков равна длине профиля из расчета (без полосок для проушин)
+        for args in [(1000, 1700, 10, 'ДПК', False), (1200, 2550, 15, 'ДПК+1 ПВЛ', True, 900, 2),
+                     (800, 500, 1, 'ПВЛ', False)]:
+            result = calculate_metal(*args)
+            total = sum(p.length for p in pieces_from_result(result, app.config))
+            expected = (result['base_frame']['mm'] + result['steps_frames']['total_mm']
+                        + result['vertical_stands']['mm'] + result['reinforcements']['total']['mm'])
+            self.assertAlmostEqual(total, expected, delta=2)
+
+    def test_plan_is_valid(self):
+        # Каждый отрезок попадает ровно в один хлыст, и хлыст не переполнен с учетом резов
+        results = [calculate_metal(900 + 10 * i, 1000 + 5 * i, 3 + i % 8, 'ДПК', i % 3 == 0, 900)
+                   for i in range(300)]
+        plan = plan_orders(results, app.config)
+        pieces = [piece for result in results for piece in pieces_from_result(result, app.config)]
+        self.assertEqual(plan['pieces_count'] + len(plan['oversize']) + plan['skipped'], len(pieces))
+        for bar in plan['bars']:
+            used = sum(p['length'] for p in bar['pieces']) + 3 * (len(bar['pieces']) - 1)
+            self.assertLessEqual(used, 6000 + 0.5)
+        # Не хуже одного лишнего хлыста на 50 относительно нижней оценки
+        lower = plan['pieces_length'] / 6000
+        self.assertLessEqual(plan['bars_count'], lower * 1.02 + 1)
+
+    def test_improvement_frees_bar(self):
+        # Проход улучшения освобождает хлыст, который оставила жадная раскладка
+        pieces = [Piece(600 * n, 'a', 0) for n in (9, 5, 4, 3, 3, 3, 2)]
+        self.assertEqual(plan_cuts(pieces, 6000, 0, improve=False)['bars_count'], 4)
+        self.assertEqual(plan_cuts(pieces, 6000, 0)['bars_count'], 3)
+        self.assertEqual(plan_cuts([Piece(7000, 'a', 0), Piece(0, 'b', 0)], 6000, 3)['oversize'][0]['length'], 7000)
+
+    def test_api_cutplan(self):
+        # API принимает заказы и отдельные отрезки, ошибки заказов возвращает отдельно
+        client = app.test_client()
+        orders = [{'width': 1000, 'height': 1700, 'steps': 10, 'material': 'ДПК', 'has_platform': False},
+                  {'width': 1000, 'height': 1700, 'steps': 10, 'material': 'Дерево', 'has_platform': False}]
+        response = client.post('/api/cutplan', json={'orders': orders, 'pieces': [{'length': 500, 'count': 4}]})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['errors'], [{'order': 1, 'error': 'Неверный материал'}])
+        self.assertEqual(sum(p['part'] == 'custom' for bar in data['bars'] for p in bar['pieces']), 4)
+        self.assertEqual(client.post('/api/cutplan', json={'kerf': -1}).status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+import io
+import csv
+import gzip
+import zipfile
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, calculate_metal, quote_store  # Импорт приложения и истории расчетов
+from export import bom_lines  # Строки спецификации
+from params import parse_params  # Разбор параметров запроса
+
+ITEMS = [
+    {'width': 1000, 'height': 1700, 'steps': 9, 'material': 'ДПК', 'has_platform': False},
+    {'width': 1200, 'height': 1700, 'steps': 9, 'material': 'ПВЛ', 'has_platform': True,
+     'platform_depth': 900, 'frame_color': 'RAL7024'},
+]
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_bom_lines(self):
+        # По строке на каждый каркас ступени; компонентов с нулевым количеством нет
+        result = calculate_metal(*parse_params(ITEMS[1]))
+        lines = bom_lines(result)
+        components = [line[0] for line in lines]
+        self.assertEqual(sum(c.startswith("Каркас ступени") for c in components), 9)
+        self.assertNotIn("Доски ДПК", components)  # У ПВЛ нет досок
+        frames = sum(line[3] for line in lines if line[4] == "мм")
+        self.assertEqual(frames, result['total_length']['mm'] - result['additional_materials']['mounting_strips']['total_length'])
+
+    def test_csv_gzip_with_totals(self):
+        # CSV сжимается gzip, ошибочный набор дает строку ошибки, итоги - по материалу и цвету
+        huge = dict(ITEMS[0], reinforcements_count=10 ** 20)
+        response = self.client.post('/api/export?format=csv', json=ITEMS + [{'width': 1}, huge, ITEMS[0]],
+                                    headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.get_data()).decode())))
+        self.assertTrue(rows[-1]['row'] == 'total')
+        self.assertTrue(any(r['row'] == '3' and r['component'].startswith('Ошибка') for r in rows))
+        # Набор, который не считает пакетный движок, - тоже ошибка своей строки, следующие строки выгружаются
+        self.assertTrue(any(r['row'] == '4' and 'Количество усилений' in r['component'] for r in rows))
+        self.assertTrue(any(r['row'] == '5' and r['component'] == 'Основание' for r in rows))
+        totals = {(r['material'], r['color']): float(r['quantity']) for r in rows if r['row'] == 'total'}
+        self.assertIn(('ДПК', 'Венге'), totals)
+        paint = sum(calculate_metal(*parse_params(item))['paint']['total_weight'] for item in ITEMS[1:])
+        self.assertAlmostEqual(totals[('Краска', 'RAL7024')], paint, places=2)
+
+    def test_xlsx_from_quotes(self):
+        # Выгрузка по номерам котировок из истории - корректная книга XLSX с двумя листами
+        for item in ITEMS:
+            self.client.post('/api/calculate', json=item)
+        quote_store.flush()
+        ids = [q['id'] for q in self.client.get('/api/quotes?limit=2').get_json()['quotes']]
+        response = self.client.post('/api/export', json={'quotes': ids + [0]})
+        self.assertEqual(response.status_code, 200)
+        book = zipfile.ZipFile(io.BytesIO(response.get_data()))
+        self.assertIsNone(book.testzip())
+        sheet = book.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('Котировка не найдена', sheet)
+        self.assertIn('Каркас ступени 9', sheet)
+        self.assertIn('Итого', book.read('xl/workbook.xml').decode())
+        self.assertEqual(self.client.post('/api/export', json={'quotes': 'все'}).status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
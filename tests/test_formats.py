@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+import json
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import jsonify  # Прежний способ сериализации для сравнения
+from app import app, calculate_metal  # Импорт приложения и функции расчета
+from formats import compact_result, msgpack  # Форматы ответа
+from params import parse_params  # Разбор параметров запроса
+
+PAYLOAD = {'width': 1000, 'height': 3400, 'steps': 20, 'material': 'ДПК+1 ПВЛ',
+           'has_platform': True, 'platform_depth': 900, 'reinforcements_count': 2}
+
+class TestFormats(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        self.expected = calculate_metal(*parse_params(PAYLOAD))  # Те же типы, что после разбора запроса
+
+    def test_default_is_unchanged(self):
+        # Без format и Accept ответ совпадает с jsonify байт в байт
+        response = self.client.post('/api/calculate', json=PAYLOAD)
+        with app.app_context():
+            self.assertEqual(response.get_data(), jsonify(self.expected).get_data())
+        self.assertEqual(response.mimetype, 'application/json')
+
+    def test_fastjson_and_compact(self):
+        # Быстрый JSON дает ту же схему, компактная схема - только миллиметры
+        fast = self.client.post('/api/calculate?format=fastjson', json=PAYLOAD)
+        self.assertEqual(json.loads(fast.get_data()), json.loads(json.dumps(self.expected)))
+        compact = self.client.post('/api/calculate', json=PAYLOAD,
+                                   headers={'Accept': 'application/vnd.dpk.compact+json'})
+        self.assertEqual(compact.mimetype, 'application/vnd.dpk.compact+json')
+        data = json.loads(compact.get_data())
+        self.assertEqual(data['lengths_mm']['steps_frames'], self.expected['steps_frames']['mm'])
+        self.assertEqual(data['lengths_mm']['total'], self.expected['total_length']['mm'])
+        self.assertEqual(self.client.post('/api/calculate?format=xml', json=PAYLOAD).status_code, 400)
+        # Целое шире 64 бит: быстрый JSON переходит на стандартный сериализатор, а не дает 500
+        huge = dict(PAYLOAD, reinforcements_count=10 ** 20)
+        fast = self.client.post('/api/calculate?format=fastjson', json=huge)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(json.loads(fast.get_data())['dimensions']['reinforcements_count'], 10 ** 20)
+        if msgpack is not None:
+            self.assertEqual(self.client.post('/api/calculate?format=msgpack', json=huge).status_code, 400)
+
+    @unittest.skipIf(msgpack is None, "пакет msgpack не установлен")
+    def test_msgpack(self):
+        # MessagePack содержит компактную схему
+        response = self.client.post('/api/calculate', json=PAYLOAD, headers={'Accept': 'application/msgpack'})
+        self.assertEqual(response.mimetype, 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.get_data()), json.loads(json.dumps(compact_result(self.expected))))
+
+if __name__ == '__main__':
+    unittest.main()
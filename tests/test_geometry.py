@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+import json
+import struct
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, calculate_metal  # Импорт приложения и функции расчета
+from geometry import stair_boxes, stair_glb  # Геометрия лестницы
+
+def read_glb(data):
+    # Разбирает GLB на JSON-часть и двоичный буфер
+    magic, version, length = struct.unpack('<4sII', data[:12])
+    json_length, _ = struct.unpack('<I4s', data[12:20])
+    gltf = json.loads(data[20:20 + json_length])
+    bin_length, _ = struct.unpack('<I4s', data[20 + json_length:28 + json_length])
+    return magic, version, length, gltf, bin_length
+
+class TestGeometry(unittest.TestCase):
+    def test_boxes_by_material(self):
+        # У ДПК есть доски и болты, у ПВЛ - листы без болтов
+        dpk = stair_boxes(calculate_metal(1000, 1700, 10, 'ДПК', False)['dimensions'])
+        pvl = stair_boxes(calculate_metal(1000, 1700, 10, 'ПВЛ', False)['dimensions'])
+        self.assertEqual(len(dpk['board'][0]), 10 * 2)  # Две доски на ступень глубиной 305 мм
+        self.assertEqual(len(dpk['bolt'][0]), 10 * 2 * 2 * 2)  # По два болта (шляпка и тело) на доску
+        self.assertEqual(len(pvl['bolt'][0]), 0)
+        self.assertGreater(len(pvl['pvl'][0]), 10)
+
+    def test_frame_models(self):
+        # Каркас Оптимы и Комфорта из профиля 40x20; у Оптимы от 1500 мм средняя балка основания и высокая стойка
+        dimensions = calculate_metal(1600, 1700, 10, 'ДПК', False, 0, 3)['dimensions']
+        eco, optima, komfort = (stair_boxes(dimensions, model) for model in ('eco', 'optima', 'komfort'))
+        self.assertEqual(len(optima['profile'][0]), len(komfort['profile'][0]) + 1)
+        self.assertEqual(eco['board'][0].tolist(), optima['board'][0].tolist())
+        self.assertEqual(eco['bolt'][0].tolist(), komfort['bolt'][0].tolist())
+        wide = [size for size in komfort['profile'][1].tolist() if size[0] == 40]
+        self.assertGreater(len(wide), 10 * 4)  # Боковые опоры и передние стойки каждой ступени
+        # Высокая стойка Оптимы вместо стойки усиления пятой ступени; задние стойки усилений Комфорта 20x20
+        tall = [40.0, 5 * 170.0, 20.0]
+        self.assertEqual(optima['profile'][1].tolist().count(tall), komfort['profile'][1].tolist().count(tall) + 1)
+        self.assertEqual(komfort['profile'][1].tolist().count([20.0, 1700.0, 20.0]), 3)
+        narrow = calculate_metal(1200, 1700, 10, 'ДПК', False, 0, 3)['dimensions']
+        self.assertEqual(len(stair_boxes(narrow, 'optima')['profile'][0]), len(stair_boxes(narrow, 'komfort')['profile'][0]))
+        with self.assertRaises(ValueError):
+            stair_boxes(dimensions, 'lux')
+
+    def test_glb_structure(self):
+        # GLB содержит по узлу с инстансингом на каждый тип деталей
+        data = stair_glb(calculate_metal(1200, 2550, 15, 'ДПК+1 ПВЛ', True, 900, 2))
+        magic, version, length, gltf, bin_length = read_glb(data)
+        self.assertEqual((magic, version, length), (b'glTF', 2, len(data)))
+        self.assertEqual(gltf['buffers'][0]['byteLength'], bin_length)
+        self.assertEqual([node['name'] for node in gltf['nodes']], ['profile', 'board', 'pvl', 'bolt'])
+        for node in gltf['nodes']:
+            attributes = node['extensions']['EXT_mesh_gpu_instancing']['attributes']
+            self.assertEqual(gltf['accessors'][attributes['TRANSLATION']]['count'], node['extras']['count'])
+
+    def test_api_model(self):
+        # API возвращает GLB и кэширует его по параметрам
+        client = app.test_client()
+        payload = {'width': 900, 'height': 1200, 'steps': 7, 'material': 'ДПК', 'has_platform': False}
+        first = client.post('/api/model', json=payload)
+        second = client.post('/api/model', json=payload)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.mimetype, 'model/gltf-binary')
+        self.assertEqual(first.get_data()[:4], b'glTF')
+        self.assertEqual(first.get_data(), second.get_data())
+        # Модель лестницы входит в ключ кэша, неизвестная модель - ошибка 400
+        optima = client.post('/api/model', json=dict(payload, model='optima'))
+        self.assertEqual(optima.status_code, 200)
+        self.assertNotEqual(optima.get_data(), first.get_data())
+        self.assertEqual(client.post('/api/model', json=dict(payload, model='lux')).status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, live_event, live_hub  # Импорт приложения и канала живого пересчета
+from live import LiveHub, LiveSession  # Сессии живого пересчета
+
+PARAMS = {'width': 1000, 'height': 3400, 'steps': 20, 'material': 'ДПК', 'has_platform': False}
+
+class TestLive(unittest.TestCase):
+    def test_session_coalesces_updates(self):
+        # Необработанное изменение заменяется новым, устаревшее отбрасывается
+        session = LiveSession("1.test")
+        self.assertEqual(session.offer(1, {'width': 900}), "accepted")
+        self.assertEqual(session.offer(3, {'width': 1100}), "coalesced")
+        self.assertEqual(session.offer(2, {'width': 1000}), "stale")
+        self.assertEqual(session.take(0), (3, {'width': 1100}, 1))
+        self.assertIsNone(session.take(0))
+
+    def test_stream_and_forward(self):
+        # Изменение из другого процесса приходит через сокет владельца, поток отдает результат
+        with tempfile.TemporaryDirectory() as socket_dir:
+            owner = LiveHub(socket_dir)
+            session = owner.open()
+            events = owner.stream(session, live_event, 5.0, 10.0)
+            self.assertIn(session.id, next(events))
+            other = LiveHub(socket_dir)
+            other.pid = -1  # Другой процесс
+            self.assertEqual(other.deliver(session.id, 1, PARAMS), "forwarded")
+            name, data = next(events).splitlines()[:2]
+            self.assertEqual(name, "event: result")
+            message = json.loads(data[len("data: "):])
+            self.assertEqual(message['seq'], 1)
+            self.assertIn('dimensions', message['result'])
+            events.close()
+            self.assertNotIn(session.id, owner.sessions)
+            owner._socket.close()
+
+    def test_idle_stream_and_session_limit(self):
+        # Простаивающий поток завершается событием idle; сессий меньше, чем потоков воркера
+        hub = LiveHub(max_sessions=1)
+        session = hub.open()
+        with self.assertRaises(OverflowError):
+            hub.open()
+        events = list(hub.stream(session, live_event, 0.01, 0.02))
+        self.assertEqual(events[-1], "event: idle\ndata: {}\n\n")
+        self.assertEqual(hub.sessions, {})
+        self.assertLess(app.config['LIVE_MAX_SESSIONS'], app.config['WEB_THREADS'])
+
+    def test_update_validation(self):
+        # Неизвестная сессия - 404, неверное тело - 400, принятое изменение - 202
+        client = app.test_client()
+        self.assertEqual(client.post('/api/live/0.missing', json={'seq': 1, 'params': PARAMS}).status_code, 404)
+        session = live_hub.open()
+        try:
+            url = f'/api/live/{session.id}'
+            self.assertEqual(client.post(url, json={'params': PARAMS}).status_code, 400)
+            response = client.post(url, json={'seq': 1, 'params': PARAMS})
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(response.get_json()['status'], "accepted")
+            self.assertEqual(client.post(url, json={'seq': 1, 'params': PARAMS}).get_json()['status'], "stale")
+        finally:
+            live_hub.close(session)
+
+if __name__ == '__main__':
+    unittest.main()
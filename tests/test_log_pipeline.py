@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+import json
+import logging
+import tempfile
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app  # Импорт приложения
+from log_pipeline import LogPipeline, SizeTimeRotatingFileHandler, truncate_payload  # Логирование
+
+def read_lines(path):
+    # Читает записи лога в формате JSON Lines
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+class TestLogPipeline(unittest.TestCase):
+    def test_json_lines_per_process(self):
+        # Запись попадает в файл текущего процесса одной строкой JSON с дополнительными полями
+        with tempfile.TemporaryDirectory() as directory:
+            pipeline = LogPipeline(directory, 1 << 20, 2, 0, 100)
+            logger = logging.getLogger('test_log_pipeline')
+            logger.addHandler(pipeline.handler)
+            logger.warning("Проверка %s", 1, extra={"fields": {"status": 400}})
+            pipeline.stop()
+            logger.removeHandler(pipeline.handler)
+            self.assertEqual(os.path.basename(pipeline.path), f"app-{os.getpid()}.log")
+            entry = read_lines(pipeline.path)[-1]
+            self.assertEqual((entry['message'], entry['level'], entry['status']), ("Проверка 1", "WARNING", 400))
+
+    def test_stale_files_removed(self):
+        # Старые файлы завершившихся процессов удаляются при запуске; свежие и файлы живых процессов остаются
+        with tempfile.TemporaryDirectory() as directory:
+            dead = 999999999  # Номер процесса, которого нет
+            names = [f"app-{dead}.log", f"app-{dead}.log.1", f"app-{dead + 1}.log", f"app-{os.getppid()}.log"]
+            for name in names:
+                open(os.path.join(directory, name), 'w').close()
+            for name in names[:2] + names[3:]:
+                os.utime(os.path.join(directory, name), (0, 0))
+            pipeline = LogPipeline(directory, 1 << 20, 2, 0, 100, orphan_max_age=3600)
+            pipeline.stop()
+            self.assertEqual(sorted(os.listdir(directory)), sorted(names[2:]))
+
+    def test_rotation_by_time(self):
+        # Истекший интервал приводит к ротации даже при малом размере файла
+        with tempfile.TemporaryDirectory() as directory:
+            handler = SizeTimeRotatingFileHandler(os.path.join(directory, 'app.log'), 1 << 20, 2, 3600)
+            handler.emit(logging.makeLogRecord({'msg': 'first'}))
+            handler.rollover_at = 0
+            handler.emit(logging.makeLogRecord({'msg': 'second'}))
+            handler.close()
+            self.assertEqual(sorted(os.listdir(directory)), ['app.log', 'app.log.1'])
+
+    def test_request_sampling_and_truncation(self):
+        # При нулевой доле выборки успешные запросы не логируются, ошибочные - всегда, тело обрезается
+        pipeline = app.extensions['log_pipeline']
+        rate, limit = app.config['LOG_REQUEST_SAMPLE_RATE'], app.config['LOG_PAYLOAD_MAX_CHARS']
+        app.config.update(LOG_REQUEST_SAMPLE_RATE=0.0, LOG_PAYLOAD_MAX_CHARS=20)
+        pipeline.flush()
+        before = len(read_lines(pipeline.path)) if os.path.exists(pipeline.path) else 0
+        try:
+            client = app.test_client()
+            client.post('/api/calculate', json={'width': 1000, 'height': 1700, 'steps': 10,
+                                                'material': 'ДПК', 'has_platform': False})
+            client.post('/api/calculate', json={'width': 'abc', 'padding': 'x' * 100})
+            pipeline.flush()
+        finally:
+            app.config.update(LOG_REQUEST_SAMPLE_RATE=rate, LOG_PAYLOAD_MAX_CHARS=limit)
+        requests = [e for e in read_lines(pipeline.path)[before:] if e['message'] == "Запрос обработан"]
+        self.assertEqual([e['status'] for e in requests], [400])
+        self.assertTrue(requests[0]['payload'].endswith('...(+111)'))
+        self.assertLess(len(requests[0]['payload']), 40)
+        self.assertEqual(truncate_payload('abc', 0), '')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import sys
+import os
+from dataclasses import FrozenInstanceError
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, calculate_metal  # Импорт приложения и функции расчета
+from materials import BOARDS, MATERIALS, SHEET, MaterialSpec, StepSpec, compile_plan, material_plans  # Реестр материалов
+
+class TestMaterials(unittest.TestCase):
+    def test_plans_from_table(self):
+        # Планы содержат константы из настроек и отличия первой ступени
+        plans = material_plans(app.config)
+        self.assertEqual(tuple(plans), MATERIALS)
+        mixed = plans["ДПК+1 ПВЛ"]
+        self.assertEqual(mixed.step_depth, app.config['DPK_DEPTH'])
+        self.assertEqual((mixed.step_reduction(0), mixed.step_reduction(1)), (0, app.config['DPK_REDUCTION']))
+        self.assertEqual((mixed.step_boards(0), mixed.step_boards(1)), (False, True))
+        self.assertEqual(plans["ДПК"].back_reduction, app.config['DPK_REDUCTION'])
+        self.assertEqual(plans["ПВЛ"].back_reduction, 0)
+        with self.assertRaises(FrozenInstanceError):
+            mixed.reduction = 0
+
+    def test_plans_follow_config(self):
+        # При изменении настроек планы компилируются заново
+        original = app.config['DPK_REDUCTION']
+        app.config['DPK_REDUCTION'] = original + 5
+        try:
+            self.assertEqual(material_plans(app.config)["ДПК"].reduction, original + 5)
+            result = calculate_metal(1000, 1700, 10, "ДПК", False)
+            self.assertEqual(result['dimensions']['frame_height'], 1700 - original - 5)
+        finally:
+            app.config['DPK_REDUCTION'] = original
+        self.assertEqual(material_plans(app.config)["ДПК"].reduction, original)
+
+    def test_new_material_row(self):
+        # Новый материал описывается строкой таблицы: например, резиновая накладка на каждой ступени
+        rubber = StepSpec(reduced=True, board_elevation=5, boards=False, painted=False)
+        plan = compile_plan(MaterialSpec("Резина", "DPK_DEPTH", rubber, bolts_per_step=6), 3, app.config)
+        self.assertEqual((plan.reduction, plan.board_elevation, plan.has_boards, plan.has_painted),
+                         (app.config['DPK_REDUCTION'], 5, False, False))
+        self.assertEqual((plan.bolts_per_step, plan.unbolted_steps, plan.bare_steps), (6, 0, 0))
+        # Строки существующих материалов собраны из тех же покрытий
+        self.assertEqual(compile_plan(MaterialSpec("x", "PVL_DEPTH", SHEET, first_step=BOARDS), 0,
+                                      app.config).first_boards, True)
+
+if __name__ == '__main__':
+    unittest.main()
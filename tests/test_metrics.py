@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app  # Импорт приложения
+from metrics import Metrics, SlowRequestProfiler  # Метрики и профилирование
+
+class TestMetrics(unittest.TestCase):
+    def test_aggregation_across_processes(self):
+        # Значения текущего процесса суммируются со снимками других процессов
+        with tempfile.TemporaryDirectory() as directory:
+            metrics = Metrics(directory)
+            metrics.inc('dpk_requests_total', endpoint='calculate', status=200)
+            metrics.observe('dpk_stage_seconds', 0.003, stage='geometry')
+            other = Metrics(None)
+            other.inc('dpk_requests_total', 2, endpoint='calculate', status=200)
+            other.observe('dpk_stage_seconds', 0.3, stage='geometry')
+            # Снимок "другого воркера" (pid 1 всегда существует, поэтому не считается устаревшим)
+            with open(os.path.join(directory, 'metrics-1.json'), 'w') as f:
+                json.dump(other.snapshot(), f)
+            text = metrics.render()
+        self.assertIn('dpk_requests_total{endpoint="calculate",status="200"} 3', text)
+        self.assertIn('dpk_stage_seconds_bucket{stage="geometry",le="0.005"} 1', text)
+        self.assertIn('dpk_stage_seconds_bucket{stage="geometry",le="+Inf"} 2', text)
+        self.assertIn('dpk_stage_seconds_count{stage="geometry"} 2', text)
+
+    def test_metrics_endpoint(self):
+        # После расчета в /metrics есть время этапов, счетчик по материалу и ошибки
+        client = app.test_client()
+        client.post('/api/calculate', json={'width': 1000, 'height': 1700, 'steps': 10,
+                                            'material': 'ДПК', 'has_platform': True, 'platform_depth': 777})
+        client.post('/api/calculate', json={'width': 1000})
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        text = response.get_data(as_text=True)
+        for stage in ('parse', 'validate', 'geometry', 'materials', 'serialize', 'logging'):
+            self.assertIn(f'dpk_stage_seconds_count{{stage="{stage}"}}', text)
+        self.assertIn('dpk_calculations_total{material="ДПК"}', text)
+        self.assertIn('dpk_errors_total{endpoint="calculate",type="KeyError"}', text)
+
+    def test_slow_request_profile(self):
+        # Профиль сохраняется только для запроса медленнее порога
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = SlowRequestProfiler(directory, threshold_ms=50)
+            self.assertIsNone(profiler.finish(profiler.start(), 0.01, 'calculate'))
+            path = profiler.finish(profiler.start(), 0.2, 'calculate')
+            self.assertTrue(os.path.exists(path))
+            self.assertTrue(path.endswith('-calculate-200ms.prof'))
+
+if __name__ == '__main__':
+    unittest.main()
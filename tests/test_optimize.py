@@ -0,0 +1,100 @@
+import unittest
+import sys
+import os
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np  # Для проверки отбора Парето
+from app import app, calculate_metal  # Импорт приложения и функции расчета
+from optimize import pareto_mask  # Отбор Парето-оптимальных вариантов
+
+class TestOptimize(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_options_match_calculate(self):
+        # Критерии вариантов совпадают с поштучным расчетом, варианты не доминируют друг друга
+        response = self.client.post('/api/optimize', json={
+            'width': 1200, 'height': 2000, 'step_height_min': 120, 'step_height_max': 250,
+            'platform_depths': [700, 900], 'reinforcements_counts': [3, 2]})
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertGreater(body['evaluated'], len(body['options']))
+        for option in body['options']:
+            result = calculate_metal(**option['params'])
+            self.assertEqual(option['total_length_mm'], result['total_length']['mm'])
+            self.assertEqual(option['paint_weight'], result['paint']['total_weight'])
+            self.assertEqual(option['dpk_boards'], result['additional_materials']['dpk_boards'])
+            # Наименьшее из допустимых или наименьшее прочное
+            required = result['structure']['reinforcements_required']
+            self.assertEqual(option['params']['reinforcements_count'], max(2, required))
+            self.assertTrue(result['structure']['ok'])
+            self.assertEqual(option['structure_utilization'], result['structure']['utilization'])
+            self.assertTrue(120 <= option['step_height'] <= 250)
+        values = [(o['total_length_mm'], o['paint_weight'], o['dpk_boards']) for o in body['options']]
+        self.assertTrue(pareto_mask(np.array(values, dtype=float)).all())
+
+    def test_constraints(self):
+        # Материалы, платформа и глубина лестницы ограничивают перебор
+        body = self.client.post('/api/optimize', json={
+            'width': 1000, 'height': 1700, 'materials': ['ДПК'], 'has_platform': True,
+            'platform_depths': [600, 1200], 'max_footprint': 3100}).get_json()
+        self.assertTrue(body['options'])
+        for option in body['options']:
+            self.assertEqual(option['params']['material'], 'ДПК')
+            self.assertTrue(option['params']['has_platform'])
+            self.assertLessEqual(option['footprint_depth'], 3100)
+            self.assertEqual(option['params']['platform_depth'], 600)
+        # Пример доминирования: второй вариант хуже первого по всем критериям
+        self.assertEqual(pareto_mask(np.array([[1, 1, 0], [2, 1, 0], [0, 5, 0]])).tolist(), [True, False, True])
+
+    def test_structure_check(self):
+        # Площадка, не проходящая проверку прочности, не предлагается; прочной добавляются усиления
+        body = {'width': 2000, 'height': 1700, 'has_platform': True, 'platform_depths': [1500]}
+        response = self.client.post('/api/optimize', json=body).get_json()
+        self.assertGreater(response['evaluated'], 0)
+        self.assertEqual(response['options'], [])
+        response = self.client.post('/api/optimize', json=dict(body, platform_depths=[900])).get_json()
+        self.assertTrue(response['options'])
+        for option in response['options']:
+            result = calculate_metal(**option['params'])
+            self.assertTrue(result['structure']['ok'])
+            self.assertEqual(option['params']['reinforcements_count'], result['structure']['reinforcements_required'])
+        # Количество усилений берется только из разрешенных запросом; если подходящего нет - вариант отбрасывается
+        response = self.client.post('/api/optimize', json=dict(body, platform_depths=[900],
+                                                                reinforcements_counts=[1, 9])).get_json()
+        self.assertTrue(response['options'])
+        for option in response['options']:
+            self.assertEqual(option['params']['reinforcements_count'], 9)
+            self.assertTrue(calculate_metal(**option['params'])['structure']['ok'])
+        response = self.client.post('/api/optimize', json=dict(body, platform_depths=[900],
+                                                                reinforcements_counts=[1, 2])).get_json()
+        self.assertEqual(response['options'], [])
+
+    def test_pareto_matches_pairwise_and_bounded(self):
+        # Отбор сортировкой совпадает с попарным сравнением, включая одинаковые строки
+        rng = np.random.default_rng(1)
+        for _ in range(100):
+            n = int(rng.integers(1, 40))
+            values = np.column_stack([rng.integers(0, 6, n), rng.integers(0, 6, n) / 2, rng.integers(0, 3, n)])
+            no_worse = (values[:, None, :] >= values[None, :, :]).all(axis=2)
+            better = (values[:, None, :] > values[None, :, :]).any(axis=2)
+            self.assertEqual(pareto_mask(values).tolist(), (~(no_worse & better).any(axis=1)).tolist())
+        # Диапазон высоты ступени ограничивается MIN_STEP_HEIGHT..MAX_STEP_HEIGHT
+        body = self.client.post('/api/optimize', json={
+            'width': 1000, 'height': 3400, 'step_height_min': 1, 'step_height_max': 5000}).get_json()
+        steps = [option['params']['steps'] for option in body['options']]
+        self.assertTrue(all(3400 / 300 <= s <= 3400 / 110 for s in steps))
+        self.assertEqual(self.client.post('/api/optimize', json={
+            'width': 1000, 'height': 1700, 'step_height_min': 400, 'step_height_max': 500}).status_code, 400)
+
+    def test_validation(self):
+        # Некорректные запросы отклоняются с кодом 400
+        for body in ({'width': 1000}, {'width': 1000, 'height': 1700, 'materials': ['Дерево']},
+                     {'width': 10, 'height': 1700}, {'width': 1000, 'height': 1700, 'step_height_min': 300,
+                                                     'step_height_max': 200}):
+            self.assertEqual(self.client.post('/api/optimize', json=body).status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module  # Модуль приложения (для подмены кэша превью)
+from app import calculate_metal
+from geometry import COLOR_MAPPING
+from preview import BACKGROUND, PreviewCache, encode_png, render
+
+class TestPreview(unittest.TestCase):
+    def test_render_draws_frame_color(self):
+        # Превью содержит лестницу: каркас RAL8017 виден оттенками его цвета, поля остаются фоном
+        result = calculate_metal(1500, 1800, 9, 'ДПК', False, 0, 1, 110, 'RAL8017')
+        image = render(result['dimensions'], 240, 180)
+        self.assertEqual(image.shape, (180, 240, 3))
+        self.assertTrue((image[0, 0] == BACKGROUND).all())
+        frame = COLOR_MAPPING['RAL8017']['frame']
+        rgb = np.array([(frame >> 16) & 255, (frame >> 8) & 255, frame & 255])
+        # Правый бок профиля осветлен на 10% - цвет каркаса после растеризации
+        side = (rgb + (255 - rgb) * 0.1).astype(np.uint8)
+        self.assertGreater((image == side).all(axis=2).sum(), 100)
+        png = encode_png(image)
+        self.assertTrue(png.startswith(b"\x89PNG\r\n\x1a\n"))
+        length = int.from_bytes(png[33:37], 'big')  # Размер блока IDAT после IHDR
+        self.assertEqual(len(zlib.decompress(png[41:41 + length])), 180 * (240 * 3 + 1))
+
+    def test_endpoint_uses_cache_and_etag(self):
+        # Повторное превью отдается из дискового кэша; ссылка котировки дает то же превью и 304 по ETag
+        client = app_module.app.test_client()
+        payload = {'width': 1210, 'height': 1500, 'steps': 7, 'material': 'ДПК+1 ПВЛ', 'has_platform': False}
+        previous = app_module.preview_cache
+        with tempfile.TemporaryDirectory() as directory:
+            app_module.preview_cache = PreviewCache(directory, 1 << 20)
+            try:
+                first = client.post('/api/preview?width=200&height=150', json=payload)
+                self.assertEqual(first.status_code, 200)
+                self.assertEqual(first.mimetype, 'image/png')
+                self.assertGreater(app_module.preview_cache.size, 0)
+                self.assertEqual(client.post('/api/preview?width=200&height=150', json=payload).data, first.data)
+                self.assertEqual(client.post('/api/preview?width=5000', json=payload).status_code, 400)
+                self.assertEqual(client.post('/api/preview?format=gif', json=payload).status_code, 400)
+
+                since = time.time()
+                client.post('/api/calculate', json=payload)
+                app_module.quote_store.flush()
+                quote_id = client.get(f'/api/quotes?from={since}').get_json()['quotes'][0]['id']
+                url = f'/api/quotes/{quote_id}/preview?width=200&height=150'
+                linked = client.get(url)
+                self.assertEqual(linked.headers['ETag'], first.headers['ETag'])
+                self.assertEqual(client.get(url, headers={'If-None-Match': linked.headers['ETag']}).status_code, 304)
+            finally:
+                app_module.preview_cache = previous
+        self.assertGreaterEqual(app_module.metrics.counters[('dpk_previews_total', (('outcome', 'hit'),))], 2)
+        self.assertEqual(client.get('/api/quotes/0/preview').status_code, 404)
+
+    def test_cache_evicts_least_recently_used(self):
+        # При превышении объема удаляются давно не использованные файлы, недавно прочитанные остаются
+        with tempfile.TemporaryDirectory() as directory:
+            cache = PreviewCache(directory, 2500)
+            for i, key in enumerate(("aa01", "bb02")):
+                cache.put(key, "png", bytes(1000))
+                os.utime(cache.path(key, "png"), (i, i))  # Время использования по порядку записи
+            cache.get("aa01", "png")  # Первый файл прочитан последним
+            cache.put("cc03", "png", bytes(1000))
+            self.assertIsNotNone(cache.get("aa01", "png"))
+            self.assertIsNone(cache.get("bb02", "png"))
+            self.assertIsNotNone(cache.get("cc03", "png"))
+            self.assertLessEqual(cache.size, 2500 * 0.9)
+
+if __name__ == '__main__':
+    unittest.main()
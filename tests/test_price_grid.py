@@ -0,0 +1,89 @@
+import unittest
+import sys
+import os
+import tempfile
+import importlib
+from unittest import mock
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, calculate_metal  # Импорт приложения и функции расчета
+from params import MATERIALS, CalcParams  # Параметры расчета
+from price_grid import PriceGrid, build_grid, load_grid, summarize  # Сетка цен
+
+class TestPriceGrid(unittest.TestCase):
+    def setUp(self):
+        # Небольшая сетка во временной папке
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = dict(app.config)
+        self.config.update({
+            'PRICE_GRID_PATH': os.path.join(self.tmp.name, 'grid.bin'),
+            'PRICE_GRID_AUTOBUILD': False,
+            'GRID_RESOLUTION': 700,
+            'GRID_MAX_STEPS': 3,
+            'GRID_PLATFORM_DEPTHS': (650,),
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_grid_matches_calculate_metal(self):
+        # Каждый узел сетки совпадает с ключевыми величинами живого расчета
+        build_grid(self.config, self.config['PRICE_GRID_PATH'])
+        grid = PriceGrid(self.config['PRICE_GRID_PATH'])
+        for width in range(300, 6001, 700):
+            for height in range(100, 3401, 700):
+                for steps in range(1, 4):
+                    for material in MATERIALS:
+                        for has_platform in (False, True):
+                            params = CalcParams(float(width), float(height), steps, material, has_platform,
+                                                650.0 if has_platform else 0, 1, 110.0, 'RAL9005')
+                            self.assertEqual(grid.lookup(params), summarize(calculate_metal(*params)))
+
+    def test_off_grid_parameters(self):
+        # Набор вне узлов сетки не находится
+        build_grid(self.config, self.config['PRICE_GRID_PATH'])
+        grid = PriceGrid(self.config['PRICE_GRID_PATH'])
+        self.assertIsNone(grid.lookup(CalcParams(1050.0, 800.0, 2, 'ДПК', False, 0, 1, 110.0, 'RAL9005')))
+        self.assertIsNone(grid.lookup(CalcParams(1000.0, 800.0, 2, 'ДПК', False, 0, 2, 110.0, 'RAL9005')))
+        self.assertIsNone(grid.lookup(CalcParams(1000.0, 800.0, 4, 'ДПК', False, 0, 1, 110.0, 'RAL9005')))
+
+    def test_stale_grid_is_rebuilt(self):
+        # Сетка, построенная для других констант, не используется или перестраивается
+        build_grid(self.config, self.config['PRICE_GRID_PATH'])
+        self.config['DPK_DEPTH'] += 5
+        self.assertIsNone(load_grid(self.config))
+        self.config['PRICE_GRID_AUTOBUILD'] = True
+        grid = load_grid(self.config)
+        self.assertTrue(grid.matches(self.config))
+
+    def test_resolution_from_environment(self):
+        # Шаг сетки задается переменной окружения и для сборки, и для приложения: сетка с шагом 50 подходит
+        import config as config_module
+        with mock.patch.dict(os.environ, {'GRID_RESOLUTION': '50'}):
+            self.assertEqual(importlib.reload(config_module).Config.GRID_RESOLUTION, 50)
+        importlib.reload(config_module)
+        self.assertEqual(config_module.Config.GRID_RESOLUTION, 100)
+        # Пути к данным отсчитываются от папки проекта, а не от рабочей папки
+        self.assertEqual(config_module.Config.PRICE_GRID_PATH,
+                         os.path.join(config_module.BASE_DIR, os.getenv('PRICE_GRID_PATH', 'data/price_grid.bin')))
+        self.config.update(GRID_RESOLUTION=50, GRID_MAX_STEPS=1, GRID_PLATFORM_DEPTHS=())
+        build_grid(self.config, self.config['PRICE_GRID_PATH'])
+        grid = PriceGrid(self.config['PRICE_GRID_PATH'])
+        self.assertTrue(grid.matches(self.config))
+        self.assertFalse(grid.matches(dict(self.config, GRID_RESOLUTION=100)))
+
+    def test_api_price(self):
+        # API возвращает ключевые величины и источник ответа
+        client = app.test_client()
+        response = client.post('/api/price', json={
+            'width': 800, 'height': 2000, 'steps': 10, 'material': 'ДПК', 'has_platform': False
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertIn(data['source'], ('grid', 'live'))
+        self.assertIn('total', data['lengths_mm'])
+
+if __name__ == '__main__':
+    unittest.main()
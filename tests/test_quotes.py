@@ -0,0 +1,73 @@
+import unittest
+import sys
+import os
+import json
+import time
+import tempfile
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, calculate_metal, quote_store  # Импорт приложения и истории расчетов
+from params import parse_params  # Разбор параметров запроса
+from quotes import QuoteStore, decode_cursor  # История расчетов
+
+PAYLOAD = {'width': 1000, 'height': 1700, 'steps': 9, 'material': 'ДПК', 'has_platform': False}
+
+class TestQuotes(unittest.TestCase):
+    def test_store_pages_and_filters(self):
+        # Пачка записывается фоновым потоком, страницы идут от новых к старым без повторов
+        with tempfile.TemporaryDirectory() as directory:
+            store = QuoteStore(os.path.join(directory, 'quotes.db'), app.config, batch_size=4)
+            for width in range(600, 1600, 100):
+                material = 'ПВЛ' if width % 200 else 'ДПК'
+                store.record(parse_params(dict(PAYLOAD, width=width, material=material)))
+            store.flush()
+            first = store.history(limit=4)
+            second = store.history(limit=4, before=decode_cursor(first['next']))
+            ids = [q['id'] for q in first['quotes'] + second['quotes']]
+            self.assertEqual(ids, sorted(set(ids), reverse=True))
+            self.assertEqual(len(store.history(material='ДПК', limit=100)['quotes']), 5)
+            widths = [q['params']['width'] for q in store.history(width_min=800, width_max=1000)['quotes']]
+            self.assertEqual(sorted(widths), [800.0, 900.0, 1000.0])
+            self.assertIsNone(store.history(limit=100)['next'])
+            store.stop()
+
+    def test_bad_quote_does_not_drop_batch(self):
+        # Котировка, которую не считает пакетный движок, теряется одна, остальные пачки записываются
+        with tempfile.TemporaryDirectory() as directory:
+            store = QuoteStore(os.path.join(directory, 'quotes.db'), app.config, batch_size=5)
+            for count in (1, 2, 10 ** 20, 3, 4):
+                store.record(parse_params(dict(PAYLOAD, reinforcements_count=count)))
+            store.flush()
+            counts = [q['params']['reinforcements_count'] for q in store.history(limit=10)['quotes']]
+            self.assertEqual(sorted(counts), [1, 2, 3, 4])
+            store.stop()
+
+    def test_calculate_is_recorded(self):
+        # Успешный расчет /api/calculate попадает в историю с полным результатом
+        client = app.test_client()
+        since = time.time()
+        client.post('/api/calculate', json=PAYLOAD)
+        client.post('/api/calculate', json=dict(PAYLOAD, material='Неизвестный'))  # Ошибка не сохраняется
+        quote_store.flush()
+        page = client.get(f'/api/quotes?from={since}&material=ДПК').get_json()
+        self.assertEqual(len(page['quotes']), 1)
+        quote = page['quotes'][0]
+        self.assertEqual(quote['params']['width'], 1000.0)
+        expected = calculate_metal(*parse_params(PAYLOAD))
+        self.assertEqual(quote['totals']['total_length_mm'], expected['total_length']['mm'])
+        detail = client.get(f"/api/quotes/{quote['id']}").get_json()
+        self.assertEqual(detail['result'], json.loads(json.dumps(expected)))
+
+    def test_validation(self):
+        # Неверные фильтры - 400, неизвестная котировка - 404
+        client = app.test_client()
+        self.assertEqual(client.get('/api/quotes?from=вчера').status_code, 400)
+        self.assertEqual(client.get('/api/quotes?limit=0').status_code, 400)
+        self.assertEqual(client.get('/api/quotes?before=abc').status_code, 400)
+        self.assertEqual(client.get('/api/quotes?from=2024-01-01&to=2024-01-02T12:00').status_code, 200)
+        self.assertEqual(client.get('/api/quotes/0').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, calculate_metal  # Импорт приложения и функции расчета
+from batch import calculate_metal_batch  # Пакетный расчет
+
+class TestStructure(unittest.TestCase):
+    def test_step_frame_by_hand(self):
+        # Рама ступени 800 мм с ДПК: пролет (800 - 40) / 2, напряжение от силы 750 Н в середине пролета
+        structure = calculate_metal(800, 1700, 10, 'ДПК', False, 0, 1)['structure']
+        span = (800 - 2 * 20) / 2
+        inertia = (20 ** 4 - 17 ** 4) / 12
+        stress = 750 * span / 4 / (inertia / 10)
+        self.assertEqual(structure['step_frame']['span_mm'], span)
+        self.assertEqual(structure['step_frame']['stress_mpa'], round(stress, 2))
+        self.assertEqual(structure['stand']['length_mm'], 170)
+        self.assertTrue(structure['ok'])
+        self.assertEqual(structure['reinforcements_required'], 1)
+
+    def test_required_reinforcements_pass(self):
+        # Широкая лестница и площадка не проходят с одним усилением, а с рекомендованным количеством - проходят
+        for args in ((3000, 1800, 9, 'ПВЛ', False, 0), (1500, 1800, 9, 'ДПК', True, 900)):
+            structure = calculate_metal(*args, 1)['structure']
+            self.assertFalse(structure['ok'])
+            required = structure['reinforcements_required']
+            self.assertGreater(required, 1)
+            self.assertTrue(calculate_metal(*args, required)['structure']['ok'])
+            self.assertFalse(calculate_metal(*args, required - 1)['structure']['ok'])
+        # Если не хватает и максимума усилений, рекомендация пустая
+        with app.app_context():
+            app.config['STRUCT_MAX_REINFORCEMENTS'] = 2
+            try:
+                self.assertIsNone(calculate_metal(3000, 1800, 9, 'ПВЛ', False, 0, 1)['structure']['reinforcements_required'])
+            finally:
+                app.config['STRUCT_MAX_REINFORCEMENTS'] = 10
+
+    def test_batch_matches_calculate_metal(self):
+        # Пакетный движок дает тот же блок structure, включая пустую рекомендацию
+        items = [{'width': width, 'height': 2400, 'steps': 12, 'material': material, 'has_platform': platform > 0,
+                  'platform_depth': platform, 'reinforcements_count': count}
+                 for width in (400, 1250.5, 6000) for material in ('ПВЛ', 'ДПК+1 ПВЛ')
+                 for platform in (0, 600, 900) for count in (1, 4)]
+        results = calculate_metal_batch(items, app.config)
+        self.assertIn(None, [result['structure']['reinforcements_required'] for result in results])
+        for item, result in zip(items, results):
+            expected = calculate_metal(item['width'], item['height'], item['steps'], item['material'],
+                                       item['has_platform'], item['platform_depth'], item['reinforcements_count'])
+            self.assertEqual(result['structure'], expected['structure'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import sys
+import os
+from unittest import mock
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, calculate_metal  # Поштучный расчет для сверки найденных нарушений
+import sweep as sweep_module  # Для подмены пакетного движка
+from sweep import sweep  # Проверка инвариантов
+
+CONFIG = dict(app.config)
+
+class TestSweep(unittest.TestCase):
+    def test_negative_lengths_match_calculate_metal(self):
+        # Отрицательное переднее усиление при низкой лестнице с ДПК воспроизводится calculate_metal
+        report = sweep(CONFIG, resolution=100, max_steps=3)
+        self.assertEqual(report["combinations"], 58 * 34 * 3 * 3 * 4)
+        record = next(r for r in report["anomalies"]
+                      if r["check"] == "negative:front" and r["material"] == "ДПК" and r["steps"] == 2)
+        example = record["example"]
+        result = calculate_metal(example["width"], example["height"], 2, "ДПК", record["platform_depth"] > 0,
+                                 record["platform_depth"], 1)
+        self.assertEqual(result["reinforcements"]["front"]["mm"], round(example["value"]))
+        self.assertLess(result["reinforcements"]["front"]["mm"], 0)
+        # Лестница обычной высоты нарушений не дает
+        self.assertTrue(all(r["height"][0] < 1000 for r in report["anomalies"] if r["check"].startswith("negative:")))
+
+    def test_rounded_totals_match_calculate_metal(self):
+        # Расхождение итога и суммы составляющих после округления видно и в ответе calculate_metal
+        report = sweep(CONFIG, resolution=10, max_steps=1)
+        record = next(r for r in report["anomalies"] if r["check"] == "sum:total_paint_area")
+        example = record["example"]
+        paint = calculate_metal(example["width"], example["height"], 1, record["material"],
+                                record["platform_depth"] > 0, record["platform_depth"], 1,
+                                CONFIG['GRID_PAINT_CONSUMPTION'])["paint"]
+        difference = round(paint["total_area"] * 100) - round(paint["frame_area"] * 100) - round(paint["pvl_area"] * 100)
+        self.assertEqual(abs(difference), example["value"])
+
+    def test_material_rules_and_cross_check(self):
+        # ДПК+1 ПВЛ с одной ступенью остается без досок, у ПВЛ болты без досок; сверка с calculate_metal чистая
+        report = sweep(CONFIG, resolution=500, max_steps=2)
+        rules = {(r["check"], r["material"], r["steps"]) for r in report["anomalies"] if r["check"].startswith("rule:")}
+        self.assertEqual(rules, {("rule:boards_missing", "ДПК+1 ПВЛ", 1), ("rule:bolts_per_board", "ПВЛ", 2)})
+        self.assertFalse([r for r in report["anomalies"] if r["check"].startswith("calc:")])
+        self.assertEqual(report["space"]["samples"], sweep_module.SAMPLES)
+
+        # Расхождение пакетного движка с calculate_metal попадает в отчет
+        compute_arrays = sweep_module.compute_arrays
+
+        def shifted(*args):
+            columns = compute_arrays(*args)
+            return dict(columns, total_length=columns["total_length"] + 1)
+
+        with mock.patch.object(sweep_module, 'compute_arrays', shifted):
+            report = sweep(CONFIG, resolution=500, max_steps=1, samples=3)
+        records = [r for r in report["anomalies"] if r["check"] == "calc:total_length"]
+        self.assertEqual(len(records), 3 * 4)  # Каждая задача: материал x платформа
+        self.assertTrue(all(r["count"] == 3 and r["example"]["value"] == 1 for r in records))
+
+    def test_process_pool_gives_same_report(self):
+        # Распределение задач по процессам не меняет отчет
+        single = sweep(CONFIG, resolution=200, max_steps=4, max_reinforcements=2)
+        pooled = sweep(CONFIG, resolution=200, max_steps=4, max_reinforcements=2, workers=2)
+        self.assertEqual(pooled["anomalies"], single["anomalies"])
+        self.assertEqual(pooled["checks"], single["checks"])
+        self.assertEqual(pooled["combinations"], single["combinations"])
+
+if __name__ == '__main__':
+    unittest.main()